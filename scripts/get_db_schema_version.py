@@ -7,6 +7,7 @@ import logging
 
 from irods.configuration import IrodsConfig
 import irods.log
+import irods.profiling
 
 
 def get_current_schema_version(irods_config=None, cursor=None):
@@ -14,7 +15,7 @@ def get_current_schema_version(irods_config=None, cursor=None):
         irods_config = IrodsConfig()
     return irods_config.get_schema_version_in_database()
 
-if __name__ == '__main__':
+def main():
     logging.getLogger().setLevel(logging.NOTSET)
     l = logging.getLogger(__name__)
     irods.log.register_tty_handler(sys.stdout, logging.INFO, logging.WARNING)
@@ -24,3 +25,6 @@ if __name__ == '__main__':
     irods.log.register_file_handler(irods_config.control_log_path)
 
     print(get_current_schema_version(irods_config))
+
+if __name__ == '__main__':
+    sys.exit(irods.profiling.profile_main(main, 'get_db_schema_version'))
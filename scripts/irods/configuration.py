@@ -9,22 +9,34 @@ import pprint
 import shutil
 import sys
 import tempfile
+import threading
 import time
 
 from . import six
 
 from .exceptions import IrodsError, IrodsWarning
 from . import lib
-from . import json_validation
 from .password_obfuscation import encode, decode
 from . import paths
 
 class IrodsConfig(object):
+    # cached property -> the inputs (files, settings, or other cached properties) it is derived from
+    cache_dependencies = {
+        'server_config': ['server_config_file'],
+        'version': ['version_file'],
+        'hosts_config': ['hosts_config_file'],
+        'host_access_control_config': ['host_access_control_config_file'],
+        'execution_environment': ['server_config', 'injected_environment', 'insert_behavior'],
+        'client_environment': ['client_environment_file', 'execution_environment'],
+        'schema_uri_prefix': ['server_config', 'version'],
+    }
+
     def __init__(self,
                  injected_environment={},
                  insert_behavior=True):
-        self._injected_environment = lib.callback_on_change_dict(self.clear_cache, injected_environment)
+        self._injected_environment = lib.callback_on_change_dict(self._on_injected_environment_change, injected_environment)
         self._insert_behavior = insert_behavior
+        self.reload_counts = dict((name, 0) for name in self.cache_dependencies)
         self.clear_cache()
 
     @property
@@ -44,10 +56,8 @@ class IrodsConfig(object):
 
     @property
     def server_config(self):
-        if self._server_config is None:
-            self._server_config = load_json_config(paths.server_config_path(),
-                    template_filepath=paths.get_template_filepath(paths.server_config_path()))
-        return self._server_config
+        return self._get_cached('server_config', lambda: load_json_config(paths.server_config_path(),
+                template_filepath=paths.get_template_filepath(paths.server_config_path())))
 
     @property
     def is_catalog(self):
@@ -91,7 +101,7 @@ class IrodsConfig(object):
             if self.catalog_database_type in odbc_ini_contents.keys() and 'Driver' in odbc_ini_contents[self.catalog_database_type].keys():
                 database_config['db_odbc_driver'] = odbc_ini_contents[self.catalog_database_type]['Driver']
                 l.debug('Adding driver "%s" to database_config', database_config['db_odbc_driver'])
-                self.commit(self._server_config, paths.server_config_path(), clear_cache=False)
+                self.commit(self.server_config, paths.server_config_path(), clear_cache=False)
             else:
                 l.debug('Unable to retrieve "Driver" field from odbc ini file')
 
@@ -112,23 +122,17 @@ class IrodsConfig(object):
 
     @property
     def version(self):
-        if self._version is None:
-            self._version = load_json_config(paths.version_path())
-        return self._version
+        return self._get_cached('version', lambda: load_json_config(paths.version_path()))
 
     @property
     def hosts_config(self):
-        if self._hosts_config is None:
-            self._hosts_config = load_json_config(paths.hosts_config_path(),
-                    template_filepath=paths.get_template_filepath(paths.hosts_config_path()))
-        return self._hosts_config
+        return self._get_cached('hosts_config', lambda: load_json_config(paths.hosts_config_path(),
+                template_filepath=paths.get_template_filepath(paths.hosts_config_path())))
 
     @property
     def host_access_control_config(self):
-        if self._host_access_control_config is None:
-            self._host_access_control_config = load_json_config(paths.host_access_control_config_path(),
-                    template_filepath=paths.get_template_filepath(paths.host_access_control_config_path()))
-        return self._host_access_control_config
+        return self._get_cached('host_access_control_config', lambda: load_json_config(paths.host_access_control_config_path(),
+                template_filepath=paths.get_template_filepath(paths.host_access_control_config_path())))
 
     @property
     def client_environment_path(self):
@@ -139,9 +143,7 @@ class IrodsConfig(object):
 
     @property
     def client_environment(self):
-        if self._client_environment is None:
-            self._client_environment = load_json_config(self.client_environment_path)
-        return self._client_environment
+        return self._get_cached('client_environment', lambda: load_json_config(self.client_environment_path))
 
     @property
     def server_environment(self):
@@ -152,16 +154,18 @@ class IrodsConfig(object):
 
     @property
     def execution_environment(self):
-        if self._execution_environment is None:
-            if self.insert_behavior:
-                self._execution_environment = dict(self.server_environment)
-                self._execution_environment.update(os.environ)
-                self._execution_environment['irodsConfigDir'] = paths.config_directory()
-                self._execution_environment['PWD'] = paths.server_bin_directory()
-                self._execution_environment.update(self.injected_environment)
-            else:
-                self._execution_environment = dict(self.injected_environment)
-        return self._execution_environment
+        return self._get_cached('execution_environment', self._load_execution_environment)
+
+    def _load_execution_environment(self):
+        if self.insert_behavior:
+            execution_environment = dict(self.server_environment)
+            execution_environment.update(os.environ)
+            execution_environment['irodsConfigDir'] = paths.config_directory()
+            execution_environment['PWD'] = paths.server_bin_directory()
+            execution_environment.update(self.injected_environment)
+        else:
+            execution_environment = dict(self.injected_environment)
+        return execution_environment
 
     @property
     def insert_behavior(self):
@@ -170,7 +174,7 @@ class IrodsConfig(object):
     @insert_behavior.setter
     def insert_behavior(self, value):
         self._insert_behavior = value
-        self.clear_cache()
+        self.invalidate('insert_behavior')
 
     @property
     def injected_environment(self):
@@ -178,38 +182,43 @@ class IrodsConfig(object):
 
     @injected_environment.setter
     def injected_environment(self, value):
-        self._injected_environment = lib.callback_on_change_dict(self.clear_cache, value if value is not None else {})
-        self.clear_cache()
+        self._injected_environment = lib.callback_on_change_dict(self._on_injected_environment_change, value if value is not None else {})
+        self.invalidate('injected_environment')
+
+    def _on_injected_environment_change(self):
+        self.invalidate('injected_environment')
 
     @property
     def schema_uri_prefix(self):
-        if self._schema_uri_prefix is None:
-            l = logging.getLogger(__name__)
-            l.debug('Attempting to construct schema URI...')
+        return self._get_cached('schema_uri_prefix', self._load_schema_uri_prefix)
 
-            key = 'schema_validation_base_uri'
-            try:
-                base_uri = self.server_config[key]
-            except KeyError:
-                base_uri = None
-                raise IrodsWarning(
-                        '%s did not contain \'%s\'' %
-                        (paths.server_config_path(), key))
-
-            key = 'configuration_schema_version'
-            try:
-                uri_version = self.version[key]
-            except KeyError:
-                uri_version = None
-                raise IrodsWarning(
-                        '%s did not contain \'%s\'' %
-                        (paths.version_path(), key))
+    def _load_schema_uri_prefix(self):
+        l = logging.getLogger(__name__)
+        l.debug('Attempting to construct schema URI...')
+
+        key = 'schema_validation_base_uri'
+        try:
+            base_uri = self.server_config[key]
+        except KeyError:
+            base_uri = None
+            raise IrodsWarning(
+                    '%s did not contain \'%s\'' %
+                    (paths.server_config_path(), key))
+
+        key = 'configuration_schema_version'
+        try:
+            uri_version = self.version[key]
+        except KeyError:
+            uri_version = None
+            raise IrodsWarning(
+                    '%s did not contain \'%s\'' %
+                    (paths.version_path(), key))
 
-            self._schema_uri_prefix = '/'.join([
-                    base_uri,
-                    'v%s' % (uri_version)])
-            l.debug('Successfully constructed schema URI.')
-        return self._schema_uri_prefix
+        schema_uri_prefix = '/'.join([
+                base_uri,
+                'v%s' % (uri_version)])
+        l.debug('Successfully constructed schema URI.')
+        return schema_uri_prefix
 
     @property
     def admin_password(self):
@@ -254,9 +263,10 @@ class IrodsConfig(object):
         if self.server_config['schema_validation_base_uri'] == 'off':
             l.warn('Schema validation is disabled; json files will not be validated against schemas. To re-enable schema validation, supply a URL to a set of iRODS schemas in the field "schema_validation_base_uri" and a valid version in the field "schema_version" in the server configuration file (located in %s).', paths.server_config_path())
             return
-        for schema_uri_suffix, config_file in configuration_schema_mapping.items():
+        schema_uris = {}
+        for schema_uri_suffix in configuration_schema_mapping:
             try:
-                schema_uri = '%s/%s.json' % (
+                schema_uris[schema_uri_suffix] = '%s/%s.json' % (
                         self.schema_uri_prefix,
                         schema_uri_suffix)
             except IrodsError as e:
@@ -266,6 +276,14 @@ class IrodsConfig(object):
                         lib.indent('JSON Configuration Validation failed.'))),
                     sys.exc_info()[2])
 
+        # jsonschema and requests are only needed here, so they are not loaded by every IrodsConfig user
+        from . import json_validation
+
+        # retrieving the schemas is I/O bound, so fetch them all at once before validating
+        json_validation.prefetch_schemas(schema_uris.values())
+
+        for schema_uri_suffix, config_file in configuration_schema_mapping.items():
+            schema_uri = schema_uris[schema_uri_suffix]
             l.debug('Attempting to validate %s against %s', config_file['path'], schema_uri)
             try:
                 json_validation.validate_dict(
@@ -294,17 +312,45 @@ class IrodsConfig(object):
             if make_backup:
                 shutil.copyfile(path, '.'.join([path, 'prev', str(time.time())]))
         shutil.move(f.name, path)
+        json_config_cache.invalidate(path)
         if clear_cache:
-            self.clear_cache()
+            self.invalidate(*self._inputs_for_path(path))
+
+    def _inputs_for_path(self, path):
+        path_to_input = {
+            paths.server_config_path(): 'server_config_file',
+            paths.version_path(): 'version_file',
+            paths.hosts_config_path(): 'hosts_config_file',
+            paths.host_access_control_config_path(): 'host_access_control_config_file'}
+        path = os.path.realpath(path)
+        inputs = [i for p, i in path_to_input.items() if os.path.realpath(p) == path]
+        if 'client_environment' in self._cache and path == os.path.realpath(self.client_environment_path):
+            inputs.append('client_environment_file')
+        if not inputs:
+            # the file may still be read under a name we do not know about
+            inputs = list(path_to_input.values()) + ['client_environment_file']
+        return inputs
+
+    def _get_cached(self, name, loader):
+        try:
+            return self._cache[name]
+        except KeyError:
+            pass
+        value = loader()
+        self._cache[name] = value
+        self.reload_counts[name] += 1
+        return value
+
+    def invalidate(self, *inputs):
+        pending = list(inputs)
+        while pending:
+            changed = pending.pop()
+            self._cache.pop(changed, None)
+            pending.extend(name for name, dependencies in self.cache_dependencies.items()
+                    if changed in dependencies and name in self._cache)
 
     def clear_cache(self):
-        self._server_config = None
-        self._version = None
-        self._hosts_config = None
-        self._host_access_control_config = None
-        self._client_environment = None
-        self._schema_uri_prefix = None
-        self._execution_environment = None
+        self._cache = {}
 
     #provide accessors for all the paths
     @property
@@ -423,14 +469,64 @@ class IrodsConfig(object):
     def irods_gid(self):
         return paths.irods_gid()
 
+class JsonConfigCache(object):
+    # files modified this recently may change again within the same mtime tick
+    racy_interval = 1.0
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, path, loader):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return loader(path)
+        key = (getattr(st, 'st_mtime_ns', int(st.st_mtime * 1e9)), st.st_size, st.st_ino)
+        real_path = os.path.realpath(path)
+        with self._lock:
+            entry = self._entries.get(real_path)
+            if entry is not None and entry[0] == key:
+                self.hits += 1
+                return copy_json(entry[1])
+            self.misses += 1
+        value = loader(path)
+        with self._lock:
+            if time.time() - st.st_mtime > self.racy_interval:
+                self._entries[real_path] = (key, value)
+            else:
+                self._entries.pop(real_path, None)
+        return copy_json(value)
+
+    def invalidate(self, path=None):
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.realpath(path), None)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+json_config_cache = JsonConfigCache()
+
+def copy_json(value):
+    if isinstance(value, dict):
+        return dict((k, copy_json(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return [copy_json(v) for v in value]
+    return value
+
 def load_json_config(path, template_filepath=None):
     l = logging.getLogger(__name__)
     if not os.path.exists(path) and template_filepath is not None:
         l.debug('%s does not exist, copying from template file %s', path, template_filepath)
         shutil.copyfile(template_filepath, path)
-    l.debug('Loading %s into dictionary', path)
     try :
-        return lib.open_and_load_json(path)
+        return json_config_cache.load(path, load_json_file)
     except ValueError as e:
         six.reraise(IrodsError,
                 IrodsError('%s\n%s' % (
@@ -438,3 +534,8 @@ def load_json_config(path, template_filepath=None):
                     lib.indent('Invalid JSON.',
                         '%s: %s' % (e.__class__.__name__, e)))),
                 sys.exc_info()[2])
+
+def load_json_file(path):
+    l = logging.getLogger(__name__)
+    l.debug('Loading %s into dictionary', path)
+    return lib.open_and_load_json(path)
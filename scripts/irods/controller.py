@@ -1,7 +1,6 @@
 from __future__ import print_function
 import contextlib
 import copy
-import glob
 import itertools
 import json
 import logging
@@ -13,19 +12,22 @@ import sys
 import tempfile
 import time
 
-import psutil
 from . import six
 
 from .configuration import IrodsConfig
 from . import lib
 from . import paths
-from . import upgrade_configuration
+from . import preflight
+from . import process_index
+from . import shared_memory
+from . import startup
 
 from .exceptions import IrodsError, IrodsWarning
 
 class IrodsController(object):
     def __init__(self, irods_config=IrodsConfig()):
         self.config = irods_config
+        self.startup_timeline = None
 
     def check_config(self):
         # load the configuration to ensure it exists
@@ -55,21 +57,16 @@ class IrodsController(object):
                 }
             })
 
-    def start(self, write_to_stdout=False, test_mode=False):
+    def start(self, write_to_stdout=False, test_mode=False, full_preflight=False):
         l = logging.getLogger(__name__)
         l.debug('Calling start on IrodsController')
 
-        if upgrade_configuration.requires_upgrade(self.config):
-            upgrade_configuration.upgrade(self.config)
+        timeline = startup.StartupTimeline()
+        self.startup_timeline = timeline
 
-        self.define_log_levels(l)
+        skip_preflight, validated = self.run_preflight_checks(timeline, full_preflight)
 
-        try:
-            self.config.validate_configuration()
-        except IrodsWarning:
-            l.warn('Warning encountered in validation:', exc_info=True)
-
-        if self.get_binary_to_pids_dict():
+        if self.get_binary_to_pids_dict(refresh=True):
             raise IrodsError('iRODS already running')
 
         self.config.clear_cache()
@@ -99,20 +96,40 @@ class IrodsController(object):
 
         try:
             irods_port = int(self.config.server_config['zone_port'])
-            l.debug('Attempting to bind socket %s', irods_port)
-            with contextlib.closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as s:
-                try:
-                    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-                    s.bind(('127.0.0.1', irods_port))
-                except socket.error:
-                    six.reraise(IrodsError,
-                            IrodsError('Could not bind port {0}.'.format(irods_port)),
-                            sys.exc_info()[2])
-            l.debug('Socket %s bound and released successfully.', irods_port)
+            with timeline.phase('port_bind_check'):
+                l.debug('Attempting to bind socket %s', irods_port)
+                with contextlib.closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as s:
+                    try:
+                        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                        s.bind(('127.0.0.1', irods_port))
+                    except socket.error:
+                        six.reraise(IrodsError,
+                                IrodsError('Could not bind port {0}.'.format(irods_port)),
+                                sys.exc_info()[2])
+                l.debug('Socket %s bound and released successfully.', irods_port)
+
+            catalog_schema_version = None
+            if not self.config.is_catalog:
+                timeline.skip('server_launch_hook', 'not a catalog provider')
+            elif skip_preflight:
+                timeline.skip('server_launch_hook', 'preflight fingerprint unchanged')
+                from . import database_interface
+                database_interface.set_server_database_environment(self.config)
+            else:
+                with timeline.phase('server_launch_hook'):
+                    from . import database_interface
+                    catalog_schema_version = database_interface.server_launch_hook(self.config)
+
+            fingerprint = None
+            if validated:
+                # taken before the spawn, so it records the files that were just validated
+                fingerprint = preflight.compute_fingerprint(self.config, catalog_schema_version)
 
             if self.config.is_catalog:
-                from . import database_interface
-                database_interface.server_launch_hook(self.config)
+                # the server makes its own connections; an idle pooled one would outlive this start by as long
+                # as the server runs in the foreground
+                from . import database_connect
+                database_connect.close_pooled_database_connection()
 
             cmd = [self.config.server_executable]
 
@@ -125,10 +142,16 @@ class IrodsController(object):
                 if test_mode or (env_var_name in os.environ and os.environ[env_var_name] == '1'):
                     cmd.append('-t')
 
-                lib.execute_command(cmd,
-                                    foreground=True,
-                                    cwd=self.config.server_bin_directory,
-                                    env=self.config.execution_environment)
+                # the server only returns once it stops, so the next start (e.g. a container restart) needs it now
+                if fingerprint is not None:
+                    preflight.write_fingerprint(fingerprint)
+
+                timeline.skip('first_heartbeat', 'server running in foreground')
+                with timeline.phase('spawn'):
+                    lib.execute_command(cmd,
+                                        foreground=True,
+                                        cwd=self.config.server_bin_directory,
+                                        env=self.config.execution_environment)
             else:
                 l.info('Starting iRODS server ...')
 
@@ -136,64 +159,88 @@ class IrodsController(object):
                 if test_mode or (env_var_name in os.environ and os.environ[env_var_name] == '1'):
                     cmd.append('-t')
 
-                lib.execute_command(cmd,
-                                    cwd=self.config.server_bin_directory,
-                                    env=self.config.execution_environment)
-
-                try_count = 1
-                max_retries = 100
-                while True:
-                    l.debug('Attempting to connect to iRODS server on port %s. Attempt #%s',
-                            irods_port, try_count)
-                    with contextlib.closing(socket.socket(
-                            socket.AF_INET, socket.SOCK_STREAM)) as s:
-                        if s.connect_ex(('127.0.0.1', irods_port)) == 0:
-                            l.debug('Successfully connected to port %s.', irods_port)
-                            if len(lib.get_pids_executing_binary_file(self.config.server_executable)) == 0:
-                                raise IrodsError('iRODS port is bound, but server is not started.')
-                            s.send(b'\x00\x00\x00\x33<MsgHeader_PI><type>HEARTBEAT</type></MsgHeader_PI>')
-                            message = s.recv(256)
-                            if message != b'HEARTBEAT':
-                                raise IrodsError('iRODS port returned non-heartbeat message:\n{0}'.format(message))
-                            break
-                    if try_count >= max_retries:
-                        raise IrodsError('iRODS server failed to start.')
-                    try_count += 1
-                    time.sleep(1)
+                with timeline.phase('spawn'):
+                    lib.execute_command(cmd,
+                                        cwd=self.config.server_bin_directory,
+                                        env=self.config.execution_environment)
+
+                with timeline.phase('first_heartbeat') as phase:
+                    phase['attempts'] = startup.wait_for_server_ready(
+                        irods_port,
+                        lambda: bool(self.get_binary_to_pids_dict([self.config.server_executable], refresh=True)))
+
+                if fingerprint is not None:
+                    preflight.write_fingerprint(fingerprint)
 
                 l.info('Success')
 
         except IrodsError as e:
             l.info('Failure')
             six.reraise(IrodsError, e, sys.exc_info()[2])
+        finally:
+            l.debug('Startup timeline:\n%s', timeline.format())
 
-    def irods_grid_shutdown(self, timeout=20, **kwargs):
+    def run_preflight_checks(self, timeline, full_preflight=False):
+        # returns (skipped, validated)
         l = logging.getLogger(__name__)
-        args = ['irods-grid', 'shutdown', '--hosts={0}'.format(lib.get_hostname())]
+        with timeline.phase('preflight_fingerprint'):
+            skip_preflight = not full_preflight and preflight.fingerprint_unchanged(self.config)
+
+        if skip_preflight:
+            l.debug('Installation unchanged since the last start, skipping preflight checks.')
+            for name in ['upgrade_check', 'validation']:
+                timeline.skip(name, 'preflight fingerprint unchanged')
+            return True, False
+
+        preflight.invalidate_fingerprint()
+
+        with timeline.phase('upgrade_check'):
+            self.upgrade_if_required()
+            self.define_log_levels(l)
+
+        with timeline.phase('validation'):
+            try:
+                self.config.validate_configuration()
+            except IrodsWarning:
+                l.warn('Warning encountered in validation:', exc_info=True)
+                return False, False
+        return False, True
+
+    def upgrade_if_required(self):
+        from . import upgrade_configuration
+        if upgrade_configuration.requires_upgrade(self.config):
+            upgrade_configuration.upgrade(self.config)
+
+    def irods_grid_command(self, command, timeout=20, **kwargs):
+        args = ['irods-grid', command, '--hosts={0}'.format(lib.get_hostname())]
         if 'IRODS_ENVIRONMENT_FILE' in self.config.execution_environment:
             kwargs['env'] = copy.copy(os.environ)
             kwargs['env']['IRODS_ENVIRONMENT_FILE'] = self.config.execution_environment['IRODS_ENVIRONMENT_FILE']
-        start_time = time.time()
         lib.execute_command_timeout(args, timeout=timeout, **kwargs)
 
+    def irods_grid_shutdown(self, timeout=20, **kwargs):
+        l = logging.getLogger(__name__)
+        from . import shutdown
+        server_pids = self.get_binary_to_pids_dict([self.config.server_executable]).get(self.config.server_executable, [])
+        start_time = time.time()
+        self.irods_grid_command('shutdown', timeout=timeout, **kwargs)
+
         # "irods-grid shutdown" is non-blocking
-        while time.time() < start_time + timeout:
-            if self.get_binary_to_pids_dict([self.config.server_executable]):
-                time.sleep(0.3)
-            else:
-                break
-        else:
+        remaining_pids = shutdown.wait_for_pids(server_pids, max(start_time + timeout - time.time(), 0))
+        process_index.invalidate()
+        if remaining_pids:
             raise IrodsError(
                 'The iRODS server did not stop within {0} seconds of '
                 'receiving the "shutdown" command.'.format(timeout))
 
-    def stop(self, timeout=20):
+    def stop(self, timeout=20, grace_period=10, kill_timeout=5):
         l = logging.getLogger(__name__)
+        from . import shutdown
         self.config.clear_cache()
         l.debug('Calling stop on IrodsController')
         l.info('Stopping iRODS server...')
         try:
-            if self.get_binary_to_pids_dict([self.config.server_executable]):
+            if self.get_binary_to_pids_dict([self.config.server_executable], refresh=True):
                 try:
                     self.irods_grid_shutdown(timeout=timeout)
                 except Exception as e:
@@ -202,67 +249,155 @@ class IrodsController(object):
             else:
                     l.warning('No iRODS servers running.')
 
-            # kill servers first to stop spawning of other processes
-            server_pids_dict = self.get_binary_to_pids_dict([self.config.server_executable])
-            if server_pids_dict:
-                l.warning('iRODS server processes remain after "irods-grid shutdown".')
-                l.warning(format_binary_to_pids_dict(server_pids_dict))
-                l.warning('Killing forcefully...')
-                for pid in server_pids_dict[self.config.server_executable]:
-                    l.warning('Killing %s, pid %s', self.config.server_executable, pid)
-                    try:
-                        lib.kill_pid(pid)
-                    except (psutil.NoSuchProcess, psutil.AccessDenied):
-                        pass
-                    delete_cache_files_by_pid(pid)
-
-            binary_to_pids_dict = self.get_binary_to_pids_dict()
-            if binary_to_pids_dict:
-                l.warning('iRODS child processes remain after "irods-grid shutdown".')
+            process_exits = []
+            attempted_pids = set()
+
+            # servers may spawn children while they are being terminated, so rescan
+            for _ in range(3):
+                binary_to_pids_dict = dict((binary, [pid for pid in pids if pid not in attempted_pids])
+                        for binary, pids in self.get_binary_to_pids_dict(refresh=True).items())
+                binary_to_pids_dict = dict((binary, pids) for binary, pids in binary_to_pids_dict.items() if pids)
+                if not binary_to_pids_dict:
+                    break
+                l.warning('iRODS processes remain after "irods-grid shutdown".')
                 l.warning(format_binary_to_pids_dict(binary_to_pids_dict))
-                l.warning('Killing forcefully...')
-                for binary, pids in binary_to_pids_dict.items():
-                    for pid in pids:
-                        l.warning('Killing %s, pid %s', binary, pid)
-                        try:
-                            lib.kill_pid(pid)
-                        except psutil.NoSuchProcess:
-                            pass
-                        delete_cache_files_by_pid(pid)
+                l.warning('Terminating...')
+                pid_to_label_dict = dict((pid, os.path.basename(binary))
+                        for binary, pids in binary_to_pids_dict.items()
+                        for pid in pids)
+                attempted_pids.update(pid_to_label_dict.keys())
+                process_exits.extend(shutdown.terminate_processes(pid_to_label_dict,
+                        grace_period=grace_period,
+                        kill_timeout=kill_timeout))
+
+            if process_exits:
+                l.debug('Process exit report:\n%s', lib.indent(shutdown.format_process_exits(process_exits)))
+                delete_cache_files_by_pid(*[e.pid for e in process_exits])
+                survivors = [e for e in process_exits if e.status != 'exited']
+                if survivors:
+                    l.warning('The following iRODS processes could not be stopped:\n%s',
+                            lib.indent(shutdown.format_process_exits(survivors)))
+            process_index.invalidate()
         except IrodsError as e:
             l.info('Failure')
             six.reraise(IrodsError, e, sys.exc_info()[2])
 
         l.info('Success')
 
-    def restart(self, write_to_stdout=False, test_mode=False):
+    def restart(self, write_to_stdout=False, test_mode=False, full_preflight=False):
         l = logging.getLogger(__name__)
         l.debug('Calling restart on IrodsController')
         self.stop()
-        self.start(write_to_stdout, test_mode)
+        self.start(write_to_stdout, test_mode, full_preflight)
 
-    def status(self):
+    def graceful_restart(self, write_to_stdout=False, test_mode=False,
+            agent_threshold=0, drain_timeout=300, progress_interval=5, full_preflight=False):
+        l = logging.getLogger(__name__)
+        l.debug('Calling graceful_restart on IrodsController')
+        self.config.clear_cache()
+        if self.get_binary_to_pids_dict([self.config.server_executable], refresh=True):
+            l.info('Pausing iRODS server...')
+            self.irods_grid_command('pause')
+            try:
+                self.wait_for_agents_to_drain(agent_threshold, drain_timeout, progress_interval)
+            finally:
+                # a paused server refuses every control plane command except resume
+                l.info('Resuming iRODS server for shutdown...')
+                self.irods_grid_command('resume')
+        self.stop()
+        self.start(write_to_stdout, test_mode, full_preflight)
+
+    def wait_for_agents_to_drain(self, agent_threshold=0, timeout=300, progress_interval=5, poll_interval=0.5):
+        l = logging.getLogger(__name__)
+        start_time = time.time()
+        last_report_time = None
+        while True:
+            agent_count = len(self.get_server_process_roles(refresh=True)['agent'])
+            elapsed = time.time() - start_time
+            if agent_count <= agent_threshold:
+                l.info('%s agents remaining after %.1f seconds; proceeding with restart.', agent_count, elapsed)
+                return agent_count
+            if elapsed >= timeout:
+                l.warning('%s agents remaining after the %s second drain timeout; proceeding with restart.', agent_count, timeout)
+                return agent_count
+            if last_report_time is None or time.time() - last_report_time >= progress_interval:
+                l.info('Waiting for %s agents to finish (%.1f seconds elapsed)...', agent_count, elapsed)
+                last_report_time = time.time()
+            time.sleep(min(poll_interval, max(timeout - elapsed, 0)))
+
+    def get_server_process_roles(self, refresh=False):
+        return get_server_process_roles(process_index.snapshot(refresh=refresh), self.config.server_executable)
+
+    def status(self, json_output=False):
         l = logging.getLogger(__name__)
         l.debug('Calling status on IrodsController')
         self.config.clear_cache()
-        binary_to_pids_dict = self.get_binary_to_pids_dict()
-        if not binary_to_pids_dict:
+        binary_to_pids_dict = self.get_binary_to_pids_dict(refresh=True)
+        if json_output:
+            print(json.dumps(self.get_status(), indent=4, sort_keys=True))
+        elif not binary_to_pids_dict:
             l.info('No iRODS servers running.')
         else:
             l.info(format_binary_to_pids_dict(binary_to_pids_dict))
         return binary_to_pids_dict
 
-    def get_binary_to_pids_dict(self, binaries=None):
+    def get_status(self, refresh=False):
+        snapshot = process_index.snapshot(refresh=refresh)
+        pid_to_binary_and_role = {}
+        for role, pids in get_server_process_roles(snapshot, self.config.server_executable).items():
+            for pid in pids:
+                pid_to_binary_and_role[pid] = (self.config.server_executable, role)
+        for pid in snapshot.get_pids_executing_binary_file(self.config.rule_engine_executable):
+            pid_to_binary_and_role[pid] = (self.config.rule_engine_executable, 'rule_engine_server')
+
+        metrics = snapshot.get_process_metrics(sorted(pid_to_binary_and_role.keys()))
+        processes = []
+        for pid in sorted(metrics.keys()):
+            process = dict(metrics[pid])
+            process['binary'] = os.path.basename(pid_to_binary_and_role[pid][0])
+            process['role'] = pid_to_binary_and_role[pid][1]
+            processes.append(process)
+
+        return {
+            'timestamp': snapshot.timestamp,
+            'processes': processes,
+            'aggregates': {
+                'process_count': len(processes),
+                'agent_count': len([p for p in processes if p['role'] == 'agent']),
+                'total_rss': sum(p['rss'] for p in processes),
+                'total_cpu_time': sum(p['cpu_time'] for p in processes),
+                'total_open_fds': sum(p['open_fds'] for p in processes if p['open_fds'] is not None),
+                'total_threads': sum(p['threads'] for p in processes)}}
+
+    def shared_memory_status(self, reclaim_orphaned=False):
+        l = logging.getLogger(__name__)
+        l.debug('Calling shared_memory_status on IrodsController')
+        report = shared_memory.get_segment_report(owner_binaries=[self.config.server_executable])
+        l.info(shared_memory.format_segment_report(report))
+        if reclaim_orphaned and report['orphaned_count']:
+            deleted = shared_memory.reclaim_orphaned_segments(report)
+            l.info('Reclaimed %s orphaned segments.', len(deleted))
+        return report
+
+    def get_binary_to_pids_dict(self, binaries=None, refresh=False):
         if binaries is None:
             binaries = [
                 self.config.server_executable,
                 self.config.rule_engine_executable]
-        d = {}
-        for b in binaries:
-            pids = lib.get_pids_executing_binary_file(b)
-            if pids:
-                d[b] = pids
-        return d
+        return process_index.get_binary_to_pids_dict(binaries, refresh=refresh)
+
+def get_server_process_roles(snapshot, server_executable):
+    server_pids = set(snapshot.get_pids_executing_binary_file(server_executable))
+    roles = {'server': [], 'agent_factory': [], 'agent': []}
+    role_by_depth = ['server', 'agent_factory', 'agent']
+    for pid in sorted(server_pids):
+        depth = 0
+        ppid = snapshot.get_ppid(pid)
+        while ppid in server_pids and depth < len(role_by_depth) - 1:
+            depth += 1
+            ppid = snapshot.get_ppid(ppid)
+        roles[role_by_depth[depth]].append(pid)
+    return roles
 
 def format_binary_to_pids_dict(d):
     text_list = []
@@ -272,28 +407,10 @@ def format_binary_to_pids_dict(d):
             lib.indent(*['Process {0}'.format(pid) for pid in pids])))
     return '\n'.join(text_list)
 
-def delete_cache_files_by_pid(pid):
+def delete_cache_files_by_pid(*pids):
     l = logging.getLogger(__name__)
-    l.debug('Deleting cache files for pid %s...', pid)
-    ubuntu_cache = glob.glob(os.path.join(
-        paths.root_directory(),
-        'var',
-        'run',
-        'shm',
-        '*irods_re_cache*pid{0}_*'.format(pid)))
-    delete_cache_files_by_name(*ubuntu_cache)
-    other_linux_cache = glob.glob(os.path.join(
-        paths.root_directory(),
-        'dev',
-        'shm',
-        '*irods_re_cache*pid{0}_*'.format(pid)))
-    delete_cache_files_by_name(*other_linux_cache)
+    l.debug('Deleting cache files for pids %s...', list(pids))
+    shared_memory.delete_segments_by_pid(*pids)
 
 def delete_cache_files_by_name(*filepaths):
-    l = logging.getLogger(__name__)
-    for path in filepaths:
-        try:
-            l.debug('Deleting %s', path)
-            os.unlink(path)
-        except (IOError, OSError):
-            l.warning(lib.indent('Error deleting cache file: %s'), path)
+    shared_memory.delete_segments(filepaths)
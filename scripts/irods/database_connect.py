@@ -1,5 +1,7 @@
 from __future__ import print_function
 
+import atexit
+import contextlib
 import itertools
 import json
 import logging
@@ -7,6 +9,7 @@ import os
 import pprint
 import sys
 import tempfile
+import threading
 import time
 
 try:
@@ -16,9 +19,16 @@ except ImportError:
 from . import six
 
 from . import lib
+from . import log as irods_log
 from . import password_obfuscation
+from . import shared_objects
 from .exceptions import IrodsError, IrodsWarning
 
+STREAM_BATCH_SIZE = 1000
+ORACLE_STREAM_FETCH_BUFFER_SIZE = 1024 * 1024
+
+_stream_cursor_ids = itertools.count()
+
 def load_odbc_ini(f):
     odbc_dict = {}
     section = None
@@ -130,23 +140,7 @@ def unique_list(it):
     return [x for x in it if not (x in seen or seen_add(x))]
 
 def is_64_bit_ELF(path):
-    try:
-        out, err, returncode = lib.execute_command_permissive(['readelf', '-h', path])
-    except IrodsError as e:
-        l = logging.getLogger(__name__)
-        l.debug('Could not call readelf on %s, unable to ensure it is an ELF64 file.\nException:\n%s', path, lib.indent(str(e)))
-        return True
-    if returncode != 0:
-        return False
-    else:
-        for line in out.splitlines():
-            key, _, value = [e.strip() for e in line.partition(':')]
-            if key == 'Class':
-                if value == 'ELF64':
-                    return True
-                else:
-                    return False
-    return False
+    return shared_objects.get_elf_class(path) == 64
 
 def get_default_port_for_database_type(catalog_database_type):
     if catalog_database_type == 'postgres':
@@ -167,7 +161,16 @@ def get_two_task_for_oracle(db_config):
             db_config['db_port'],
             db_config['db_name'])
 
-def get_connection_string(db_config, irods_config):
+def get_streaming_connection_options(catalog_database_type):
+    if catalog_database_type == 'mysql':
+        # forward-only cursors then read rows from the server as they are fetched
+        # instead of the driver caching the whole result set on execute
+        return {'NO_CACHE': '1', 'FORWARD_CURSOR': '1'}
+    elif catalog_database_type == 'oracle':
+        return {'FBS': str(ORACLE_STREAM_FETCH_BUFFER_SIZE)}
+    return {}
+
+def get_connection_string(db_config, irods_config, streaming=False):
     odbc_dict = {}
     odbc_dict['Password'] = db_config['db_password']
     odbc_dict['PWD'] = db_config['db_password']
@@ -178,18 +181,20 @@ def get_connection_string(db_config, irods_config):
         odbc_dict['sslrootcert'] = irods_config.database_config['sslrootcert']
         odbc_dict['sslmode'] = 'require'
         odbc_dict['ssl'] = 'true'
+    if streaming:
+        odbc_dict.update(get_streaming_connection_options(irods_config.catalog_database_type))
 
     keys = [k for k in odbc_dict.keys()]
 
     return ';'.join(itertools.chain(['DSN=iRODS Catalog'], ['%s=%s' % (k, odbc_dict[k]) for k in keys]))
 
-def get_database_connection(irods_config):
+def get_database_connection(irods_config, streaming=False):
     l = logging.getLogger(__name__)
     if irods_config.catalog_database_type == 'oracle':
         os.environ['TWO_TASK'] = get_two_task_for_oracle(irods_config.database_config)
         l.debug('set TWO_TASK For oracle to "%s"', os.environ['TWO_TASK'])
 
-    connection_string = get_connection_string(irods_config.database_config, irods_config)
+    connection_string = get_connection_string(irods_config.database_config, irods_config, streaming)
     sync_odbc_ini(irods_config)
     os.environ['ODBCINI'] = irods_config.odbc_ini_path
     os.environ['ODBCSYSINI'] = '/etc'
@@ -222,7 +227,7 @@ def execute_sql_statement(cursor, statement, *params, **kwargs):
     log_params = kwargs.get('log_params', True)
     l.debug('Executing SQL statement:\n%s\nwith the following parameters:\n%s',
             statement,
-            pprint.pformat(params) if log_params else '<hidden>')
+            irods_log.deferred_pformat(params) if log_params else '<hidden>')
     try:
         return cursor.execute(statement, params)
     except pypyodbc.Error as e:
@@ -230,6 +235,82 @@ def execute_sql_statement(cursor, statement, *params, **kwargs):
                 IrodsError('pypyodbc encountered an error executing the statement:\n\t%s\n%s' % (statement, str(e))),
             sys.exc_info()[2])
 
+def execute_sql_statement_many(cursor, statement, params_list, **kwargs):
+    l = logging.getLogger(__name__)
+    log_params = kwargs.get('log_params', True)
+    params_list = list(params_list)
+    l.debug('Executing SQL statement:\n%s\nfor each of the following parameters:\n%s',
+            statement,
+            irods_log.deferred_pformat(params_list) if log_params else '<hidden>')
+    if not params_list:
+        return cursor
+    try:
+        cursor.executemany(statement, params_list)
+        return cursor
+    except pypyodbc.Error as e:
+        failed = [params for params, status in zip(params_list, cursor.param_status) if status == pypyodbc.SQL_PARAM_ERROR]
+        six.reraise(IrodsError,
+                IrodsError('pypyodbc encountered an error executing the statement:\n\t%s\n%s%s' % (statement, str(e),
+                    '\nfor the parameters:\n%s' % '\n'.join(str(p) for p in failed) if failed and log_params else '')),
+            sys.exc_info()[2])
+
+def fetch_batch(cursor, statement, batch_size):
+    try:
+        return cursor.fetchmany(batch_size)
+    except pypyodbc.Error as e:
+        six.reraise(IrodsError,
+                IrodsError('pypyodbc encountered an error fetching the results of the statement:\n\t%s\n%s' % (statement, str(e))),
+            sys.exc_info()[2])
+
+def stream_sql_statement_batches(cursor, statement, *params, **kwargs):
+    l = logging.getLogger(__name__)
+    batch_size = kwargs.get('batch_size', STREAM_BATCH_SIZE)
+    database_type = kwargs.get('database_type')
+    log_params = kwargs.get('log_params', True)
+    cursor.arraysize = batch_size
+    if database_type == 'postgres' and not cursor.connection.autocommit:
+        # psqlodbc otherwise reads the whole result set into the driver on execute.
+        # declared cursors only live inside a transaction, hence the autocommit check.
+        name = 'irods_stream_%d' % (next(_stream_cursor_ids))
+        execute_sql_statement(cursor,
+                'declare %s no scroll cursor for %s' % (name, statement.strip().rstrip(';')),
+                *params, log_params=log_params)
+        fetch_statement = 'fetch forward %d from %s' % (batch_size, name)
+        try:
+            while True:
+                try:
+                    cursor.execute(fetch_statement)
+                except pypyodbc.Error as e:
+                    six.reraise(IrodsError,
+                            IrodsError('pypyodbc encountered an error fetching the results of the statement:\n\t%s\n%s' % (statement, str(e))),
+                        sys.exc_info()[2])
+                rows = fetch_batch(cursor, statement, batch_size)
+                if rows:
+                    yield rows
+                if len(rows) < batch_size:
+                    break
+        finally:
+            try:
+                cursor.execute('close %s' % (name))
+            except pypyodbc.Error:
+                # an aborted transaction has already discarded the cursor
+                l.debug('Could not close the declared cursor %s', name, exc_info=True)
+    else:
+        if database_type == 'mysql' and 'NO_CACHE=1' not in cursor.connection.connectString:
+            l.debug('Streaming from a mysql connection opened without streaming=True, '
+                    'the driver will cache the whole result set.')
+        execute_sql_statement(cursor, statement, *params, log_params=log_params)
+        while True:
+            rows = fetch_batch(cursor, statement, batch_size)
+            if not rows:
+                break
+            yield rows
+
+def stream_sql_statement(cursor, statement, *params, **kwargs):
+    for rows in stream_sql_statement_batches(cursor, statement, *params, **kwargs):
+        for row in rows:
+            yield row
+
 def execute_sql_file(filepath, cursor, by_line=False):
     l = logging.getLogger(__name__)
     l.debug('Executing SQL in %s', filepath)
@@ -258,8 +339,11 @@ def execute_sql_file(filepath, cursor, by_line=False):
 def list_database_tables(cursor):
     l = logging.getLogger(__name__)
     l.info('Listing database tables...')
-    table_names = [row[2] for row in cursor.tables()]
-    l.debug('List of tables:\n%s', pprint.pformat(table_names))
+    cursor.tables()
+    table_names = []
+    for rows in iter(lambda: fetch_batch(cursor, 'SQLTables', STREAM_BATCH_SIZE), []):
+        table_names.extend(row[2] for row in rows)
+    l.debug('List of tables:\n%s', irods_log.deferred_pformat(table_names))
     return table_names
 
 def irods_tables_in_database(irods_config, cursor):
@@ -295,9 +379,23 @@ def get_schema_version_in_database(cursor):
 
     return schema_version
 
+def odbc_ini_section_matches(odbc_ini_path, section, odbc_dict):
+    try:
+        with open(odbc_ini_path) as f:
+            current = load_odbc_ini(f)
+    except (IOError, OSError, IrodsError):
+        return False
+    return current.get(section) == odbc_dict
+
 def sync_odbc_ini(irods_config):
+    l = logging.getLogger(__name__)
     odbc_dict = get_odbc_entry(irods_config.database_config, irods_config.catalog_database_type)
 
+    # spawning odbcinst dominates connecting when the file is already up to date
+    if odbc_ini_section_matches(irods_config.odbc_ini_path, 'iRODS Catalog', odbc_dict):
+        l.debug('[iRODS Catalog] in %s is up to date, skipping odbcinst.', irods_config.odbc_ini_path)
+        return False
+
     #The 'Driver' keyword must be first
     keys = [k for k in odbc_dict.keys()]
     keys[keys.index('Driver')] = keys[0]
@@ -307,6 +405,129 @@ def sync_odbc_ini(irods_config):
     lib.execute_command(['odbcinst', '-i', '-s', '-h', '-r'],
             input=template,
             env={'ODBCINI': irods_config.odbc_ini_path, 'ODBCSYSINI': '/etc'})
+    return True
+
+def get_health_check_statement(catalog_database_type):
+    if catalog_database_type == 'oracle':
+        return 'select 1 from dual'
+    return 'select 1'
+
+def connection_is_healthy(connection, catalog_database_type):
+    if not connection.connected:
+        return False
+    try:
+        with contextlib.closing(connection.cursor()) as cursor:
+            cursor.execute(get_health_check_statement(catalog_database_type)).fetchall()
+        if not connection.autocommit:
+            connection.rollback()
+        return True
+    except pypyodbc.Error:
+        logging.getLogger(__name__).debug('Pooled database connection failed its health check.', exc_info=True)
+        return False
+
+def close_connection_quietly(connection):
+    try:
+        if connection.connected:
+            connection.close()
+    except pypyodbc.Error:
+        logging.getLogger(__name__).debug('Error closing database connection.', exc_info=True)
+
+class ConnectionManager(object):
+    # one catalog connection per process, handed out again while its settings are unchanged
+    def __init__(self):
+        self._pid = None
+        self._key = None
+        self._connection = None
+        self._autocommit = None
+        self._in_use = False
+        self._inherited = []
+        self._lock = threading.Lock()
+
+    def _get_key(self, irods_config, streaming):
+        return (irods_config.catalog_database_type,
+                get_connection_string(irods_config.database_config, irods_config, streaming),
+                tuple(sorted(get_odbc_entry(irods_config.database_config, irods_config.catalog_database_type).items())),
+                irods_config.odbc_ini_path)
+
+    def _checkout(self, irods_config, streaming):
+        l = logging.getLogger(__name__)
+        key = self._get_key(irods_config, streaming)
+        with self._lock:
+            if self._pid != os.getpid():
+                # a connection inherited across fork belongs to the parent. it is kept referenced,
+                # since closing it here (or in its destructor) would disconnect the parent.
+                if self._connection is not None:
+                    self._inherited.append(self._connection)
+                self._pid = os.getpid()
+                self._key = None
+                self._connection = None
+                self._in_use = False
+            if self._in_use:
+                return None
+            self._in_use = True
+            connection = self._connection
+            if connection is not None and (self._key != key or not connection_is_healthy(connection, irods_config.catalog_database_type)):
+                l.debug('Reconnecting the pooled database connection.')
+                close_connection_quietly(connection)
+                connection = None
+            self._connection = None
+        if connection is None:
+            try:
+                connection = get_database_connection(irods_config, streaming)
+            except:
+                with self._lock:
+                    self._in_use = False
+                raise
+            self._key = key
+            self._autocommit = connection.autocommit
+        return connection
+
+    def _checkin(self, connection, discard):
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            self._in_use = False
+            if discard or not connection.connected:
+                close_connection_quietly(connection)
+                self._key = None
+                return
+            connection.autocommit = self._autocommit
+            self._connection = connection
+
+    @contextlib.contextmanager
+    def connection(self, irods_config, streaming=False):
+        connection = self._checkout(irods_config, streaming)
+        if connection is None:
+            # already checked out further up the stack, which may have a transaction open
+            with contextlib.closing(get_database_connection(irods_config, streaming)) as connection:
+                yield connection
+            return
+        discard = False
+        try:
+            yield connection
+        finally:
+            try:
+                if connection.connected and not connection.autocommit:
+                    connection.rollback()
+            except pypyodbc.Error:
+                discard = True
+            self._checkin(connection, discard)
+
+    def close(self):
+        with self._lock:
+            if self._pid == os.getpid() and self._connection is not None:
+                close_connection_quietly(self._connection)
+            self._connection = None
+            self._key = None
+
+default_connection_manager = ConnectionManager()
+atexit.register(default_connection_manager.close)
+
+def pooled_database_connection(irods_config, streaming=False):
+    return default_connection_manager.connection(irods_config, streaming)
+
+def close_pooled_database_connection():
+    default_connection_manager.close()
 
 def create_database_tables(irods_config, cursor, default_resource_directory=None):
     l = logging.getLogger(__name__)
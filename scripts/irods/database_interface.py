@@ -16,7 +16,7 @@ from .exceptions import IrodsError, IrodsWarning
 def setup_catalog(irods_config, default_resource_directory=None):
     l = logging.getLogger(__name__)
 
-    with contextlib.closing(database_connect.get_database_connection(irods_config)) as connection:
+    with database_connect.pooled_database_connection(irods_config) as connection:
         if irods_config.catalog_database_type == "cockroachdb":
             connection.autocommit = True
         else:
@@ -59,18 +59,28 @@ def server_launch_hook(irods_config):
 
     database_connect.sync_odbc_ini(irods_config)
 
-    if irods_config.catalog_database_type == 'oracle':
-        two_task = database_connect.get_two_task_for_oracle(irods_config.database_config)
-        l.debug('Setting TWO_TASK for oracle...')
-        irods_config.execution_environment['TWO_TASK'] = two_task
+    set_server_database_environment(irods_config)
 
-    with contextlib.closing(database_connect.get_database_connection(irods_config)) as connection:
+    with database_connect.pooled_database_connection(irods_config) as connection:
         connection.autocommit = False
         with contextlib.closing(connection.cursor()) as cursor:
             update_catalog_schema(irods_config, cursor)
+            return database_connect.get_schema_version_in_database(cursor)
+
+def get_catalog_schema_version(irods_config):
+    with database_connect.pooled_database_connection(irods_config) as connection:
+        with contextlib.closing(connection.cursor()) as cursor:
+            return database_connect.get_schema_version_in_database(cursor)
+
+def set_server_database_environment(irods_config):
+    l = logging.getLogger(__name__)
+    if irods_config.catalog_database_type == 'oracle':
+        two_task = database_connect.get_two_task_for_oracle(irods_config.database_config)
+        l.debug('Setting TWO_TASK for oracle...')
+        irods_config.execution_environment['TWO_TASK'] = two_task
 
 def database_already_in_use_by_irods(irods_config):
-    with contextlib.closing(database_connect.get_database_connection(irods_config)) as connection:
+    with database_connect.pooled_database_connection(irods_config) as connection:
         with contextlib.closing(connection.cursor()) as cursor:
             if database_connect.irods_tables_in_database(irods_config, cursor):
                 return True
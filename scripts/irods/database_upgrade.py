@@ -40,31 +40,29 @@ def run_update(irods_config, cursor):
 
         database_connect.execute_sql_statement(cursor, "UPDATE R_SPECIFIC_QUERY SET sqlstr='WITH coll AS (SELECT coll_id, coll_name FROM R_COLL_MAIN WHERE R_COLL_MAIN.coll_name = ? OR R_COLL_MAIN.coll_name LIKE ?) SELECT DISTINCT d.data_id, (SELECT coll_name FROM coll WHERE coll.coll_id = d.coll_id) coll_name, d.data_name, d.data_repl_num, d.resc_name, d.data_path, d.resc_id FROM R_DATA_MAIN d WHERE d.coll_id = ANY(ARRAY(SELECT coll_id FROM coll)) ORDER BY coll_name, d.data_name, d.data_repl_num' where alias='DataObjInCollReCur';")
 
-        rows = database_connect.execute_sql_statement(cursor, "select resc_id, resc_name from R_RESC_MAIN;").fetchall()
-        for row in rows:
-            resc_id = row[0]
-            resc_name = row[1]
-            database_connect.execute_sql_statement(cursor, "update R_DATA_MAIN set resc_id=? where resc_hier=? or resc_hier like ?", int(resc_id), resc_name, ''.join(['%;', resc_name]))
+        resc_hier_params = [(int(resc_id), resc_name, ''.join(['%;', resc_name])) for resc_id, resc_name in
+                database_connect.stream_sql_statement(cursor, "select resc_id, resc_name from R_RESC_MAIN;",
+                    database_type=irods_config.catalog_database_type)]
+        database_connect.execute_sql_statement_many(cursor, "update R_DATA_MAIN set resc_id=? where resc_hier=? or resc_hier like ?",
+                resc_hier_params)
         if irods_config.catalog_database_type == 'postgres':
             database_connect.execute_sql_statement(cursor, "update r_resc_main as rdm set resc_parent = am.resc_id from ( select resc_name, resc_id from r_resc_main ) as am where am.resc_name = rdm.resc_parent;")
         elif irods_config.catalog_database_type == 'cockroachdb':
             rows = database_connect.execute_sql_statement(cursor, "select rdm.resc_id, am.resc_id from r_resc_main rdm, r_resc_main am where am.resc_name = rdm.resc_parent;").fetchall()
-            for row in rows:
-                resc_id = row[0]
-                resc_id2 = row[1]
-                database_connect.execute_sql_statement(cursor, "update r_resc_main set resc_parent = ? where resc_id = ?;", resc_id2, resc_id)
+            database_connect.execute_sql_statement_many(cursor, "update r_resc_main set resc_parent = ? where resc_id = ?;",
+                    [(resc_id2, resc_id) for resc_id, resc_id2 in rows])
         elif irods_config.catalog_database_type == 'mysql':
             database_connect.execute_sql_statement(cursor, "update R_RESC_MAIN as rdm, ( select resc_name, resc_id from R_RESC_MAIN ) as am set rdm.resc_parent = am.resc_id where am.resc_name = rdm.resc_parent;")
         else:
             database_connect.execute_sql_statement(cursor, "update R_RESC_MAIN rdm set resc_parent = ( select resc_id from ( select resc_name, resc_id from R_RESC_MAIN ) am where am.resc_name = rdm.resc_parent );")
 
-        rows = database_connect.execute_sql_statement(cursor, "select resc_id, resc_children from R_RESC_MAIN where resc_children is not null;").fetchall()
         context_expression = re.compile('^([^{}]*)\\{([^{}]*)\\}')
-        for row in rows:
-            resc_id = row[0]
-            child_contexts = [(m.group(1), m.group(2)) for m in [context_expression.match(s) for s in row[1].split(';')] if m]
-            for child_name, context in child_contexts:
-                database_connect.execute_sql_statement(cursor, "update R_RESC_MAIN set resc_parent_context=? where resc_name=?", context, child_name)
+        child_contexts = []
+        for row in database_connect.stream_sql_statement(cursor, "select resc_id, resc_children from R_RESC_MAIN where resc_children is not null;",
+                database_type=irods_config.catalog_database_type):
+            child_contexts.extend((m.group(1), m.group(2)) for m in [context_expression.match(s) for s in row[1].split(';')] if m)
+        database_connect.execute_sql_statement_many(cursor, "update R_RESC_MAIN set resc_parent_context=? where resc_name=?",
+                [(context, child_name) for child_name, context in child_contexts])
 
     elif new_schema_version == 6:
         database_connect.execute_sql_statement(cursor, "create index idx_data_main7 on R_DATA_MAIN (resc_id);")
@@ -75,9 +73,8 @@ def run_update(irods_config, cursor):
         sql = ("select distinct group_user_id from R_USER_GROUP "
                "where group_user_id not in (select distinct group_user_id from R_USER_GROUP where group_user_id = user_id);")
         rows = database_connect.execute_sql_statement(cursor, sql).fetchall()
-        for row in rows:
-            group_id = row[0]
-            database_connect.execute_sql_statement(cursor, "insert into R_USER_GROUP values (?,?,?,?);", group_id, group_id, timestamp, timestamp)
+        database_connect.execute_sql_statement_many(cursor, "insert into R_USER_GROUP values (?,?,?,?);",
+                [(row[0], row[0], timestamp, timestamp) for row in rows])
 
         # Add specific query that allows listing all groups a user is a member of.
         sql = ("insert into R_SPECIFIC_QUERY (alias, sqlStr, create_ts) "
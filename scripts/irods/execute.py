@@ -1,14 +1,18 @@
 from __future__ import print_function
+import codecs
+import collections
 import copy
 import errno
 import logging
-import pprint
+import os
+import select
 import subprocess
 import shlex
 import sys
 import time
 
 from . import six
+from . import log as irods_log
 
 from .exceptions import IrodsError, IrodsWarning
 
@@ -26,19 +30,126 @@ def safe_shlex_split_for_2_6(args):
         args = args.encode('ascii')
     return shlex.split(args)
 
-def communicate_and_log(p, args, input=None):
-    l = logging.getLogger(__name__)
-    out, err = [t.decode('utf_8') for t in p.communicate(input=(input.encode('ascii') if input is not None else None))]
-    message = ['Command %s returned with code %s.' % (args, p.returncode)]
+def format_command_result(args, returncode, out, err, input=None):
+    message = ['Command %s returned with code %s.' % (args, returncode)]
     if input:
         message.append('stdin:\n%s' % indent(input))
     if out:
         message.append('stdout:\n%s' % indent(out))
     if err:
         message.append('stderr:\n%s' % indent(err))
-    l.debug('\n'.join(message))
+    return message
+
+def log_command_result(args, returncode, out, err, input=None, duration=None, rusage=None):
+    l = logging.getLogger(__name__)
+    def format_message():
+        message = format_command_result(args, returncode, out, err, input)
+        if duration is not None:
+            message.append(format_process_usage(duration, rusage))
+        return '\n'.join(message)
+    l.debug('%s', irods_log.DeferredFormat(format_message),
+            extra={'command': args, 'returncode': returncode, 'duration': duration})
+
+def communicate_and_log(p, args, input=None, start_time=None):
+    out, err = [t.decode('utf_8') for t in p.communicate(input=(input.encode('ascii') if input is not None else None))]
+    log_command_result(args, p.returncode, out, err, input, time.time() - start_time if start_time is not None else None)
     return (out, err)
 
+class DeadlineExceeded(Exception):
+    pass
+
+def read_pipes(p, deadline=None, input=None):
+    names = {}
+    for name, pipe in [('stdout', p.stdout), ('stderr', p.stderr)]:
+        if pipe is not None:
+            names[pipe.fileno()] = name
+    readers = list(names)
+    writers = []
+    if p.stdin is not None:
+        if input:
+            writers.append(p.stdin.fileno())
+        else:
+            p.stdin.close()
+    while readers or writers:
+        wait = None
+        if deadline is not None:
+            wait = deadline - time.time()
+            if wait <= 0:
+                raise DeadlineExceeded()
+        try:
+            readable, writable, _ = select.select(readers, writers, [], wait)
+        except (select.error, OSError) as e:
+            if e.args[0] == errno.EINTR:
+                continue
+            raise
+        for fd in writable:
+            try:
+                input = input[os.write(fd, input[:select.PIPE_BUF]):]
+            except OSError as e:
+                if e.errno != errno.EPIPE:
+                    raise
+                input = None
+            if not input:
+                p.stdin.close()
+                writers = []
+        for fd in readable:
+            data = os.read(fd, 65536)
+            if data:
+                yield (names[fd], data)
+            else:
+                readers.remove(fd)
+
+def drain_pipes(p, deadline=None, input=None):
+    chunks = {'stdout': [], 'stderr': []}
+    for name, data in read_pipes(p, deadline, input):
+        chunks[name].append(data)
+    return [b''.join(chunks[name]) if pipe is not None else None
+            for name, pipe in [('stdout', p.stdout), ('stderr', p.stderr)]]
+
+def reap_process(p, deadline=None):
+    interval = 0.001
+    while True:
+        try:
+            pid, status, rusage = os.wait4(p.pid, 0 if deadline is None else os.WNOHANG)
+        except OSError as e:
+            if e.errno == errno.EINTR:
+                continue
+            if e.errno == errno.ECHILD:
+                p.wait()
+                return None
+            raise
+        if pid == p.pid:
+            p.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+            return rusage
+        # the pipes are closed, so the child is exiting; this is rarely more than one iteration
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            raise DeadlineExceeded()
+        time.sleep(min(interval, remaining))
+        interval = min(interval * 2, 0.05)
+
+def kill_process(p):
+    try:
+        if p.poll() is None:
+            p.kill()
+            p.wait()
+    except OSError:
+        pass
+
+def wait_for_process(p, deadline=None, input=None):
+    out, err = drain_pipes(p, deadline, input)
+    for pipe in [p.stdout, p.stderr]:
+        if pipe is not None:
+            pipe.close()
+    rusage = reap_process(p, deadline)
+    return (out, err, rusage)
+
+def format_process_usage(wall_time, rusage):
+    if rusage is None:
+        return 'Wall time: {0:.3f}s'.format(wall_time)
+    return 'Wall time: {0:.3f}s, user time: {1:.3f}s, system time: {2:.3f}s, max rss: {3} KiB'.format(
+        wall_time, rusage.ru_utime, rusage.ru_stime, rusage.ru_maxrss)
+
 def execute_command_nonblocking(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, use_unsafe_shell=False, **kwargs):
     l = logging.getLogger(__name__)
     if not use_unsafe_shell and isinstance(args, six.string_types):
@@ -50,8 +161,8 @@ def execute_command_nonblocking(args, stdout=subprocess.PIPE, stderr=subprocess.
         kwargs_without_env = copy.copy(kwargs)
         kwargs_without_env['env'] = 'HIDDEN'
     else :
-        kwargs_without_env = kwargs
-    l.debug('Calling %s with options:\n%s', args, pprint.pformat(kwargs_without_env))
+        kwargs_without_env = copy.copy(kwargs)
+    l.debug('Calling %s with options:\n%s', args, irods_log.deferred_pformat(kwargs_without_env))
     try :
         return subprocess.Popen(args, **kwargs)
     except OSError as e:
@@ -68,41 +179,170 @@ def execute_command_nonblocking(args, stdout=subprocess.PIPE, stderr=subprocess.
 def execute_command_timeout(args, timeout=10, **kwargs):
     p = execute_command_nonblocking(args, **kwargs)
     start_time = time.time()
-    while time.time() < start_time + timeout:
-        if p.poll() is not None:
-            out, err = communicate_and_log(p, args)
-            check_command_return(args, out, err, p.returncode, **kwargs)
-            break
-        time.sleep(0.3)
-    else:
-        try:
-            if p.poll() is None:
-                p.kill()
-        except OSError:
-            pass
+    try:
+        out, err, rusage = wait_for_process(p, start_time + timeout)
+    except DeadlineExceeded:
+        kill_process(p)
         raise IrodsError(
             'The call {0} did not complete within'
             ' {1} seconds.'.format(args, timeout))
+    out, err = [t.decode('utf_8') if t is not None else None for t in [out, err]]
+    log_command_result(args, p.returncode, out, err, duration=time.time() - start_time, rusage=rusage)
+    check_command_return(args, out, err, p.returncode, **kwargs)
+    return (out, err)
+
+MAX_PARTIAL_LINE_LENGTH = 64 * 1024
+
+def split_lines(partial, text):
+    lines = (partial + text).split('\n')
+    partial = lines.pop()
+    # output without newlines is passed on in pieces of bounded length rather than held
+    overflow = []
+    while len(partial) > MAX_PARTIAL_LINE_LENGTH:
+        overflow.append(partial[:MAX_PARTIAL_LINE_LENGTH])
+        partial = partial[MAX_PARTIAL_LINE_LENGTH:]
+    return lines, overflow, partial
+
+@six.python_2_unicode_compatible
+class OutputWindow(object):
+    def __init__(self, head_lines=100, tail_lines=100):
+        self.head = []
+        self.tail = collections.deque(maxlen=tail_lines)
+        self.head_lines = head_lines
+        self.line_count = 0
+        self.partial = ''
+
+    def write(self, text):
+        lines, overflow, self.partial = split_lines(self.partial, text)
+        for line in lines + overflow:
+            self.append(line)
+
+    def append(self, line):
+        self.line_count += 1
+        if len(self.head) < self.head_lines:
+            self.head.append(line)
+        else:
+            self.tail.append(line)
+
+    def close(self):
+        if self.partial:
+            self.append(self.partial)
+            self.partial = ''
+
+    @property
+    def omitted_line_count(self):
+        return self.line_count - len(self.head) - len(self.tail)
+
+    def __str__(self):
+        lines = list(self.head)
+        if self.omitted_line_count:
+            lines.append('[... {0} lines omitted ...]'.format(self.omitted_line_count))
+        lines.extend(self.tail)
+        return six.text_type('\n').join(lines)
+
+class StreamingCommand(object):
+    def __init__(self, args, input=None, lines=True, check=True, timeout=None,
+            head_lines=100, tail_lines=100, **kwargs):
+        if input is not None:
+            if 'stdin' in kwargs and kwargs['stdin'] != subprocess.PIPE:
+                raise IrodsError('\'input\' option is mutually exclusive with a \'stdin\' '
+                        'option that is not equal to \'subprocess.PIPE\'.')
+            kwargs['stdin'] = subprocess.PIPE
+        kwargs.setdefault('stdout', subprocess.PIPE)
+        kwargs.setdefault('stderr', subprocess.PIPE)
+        self.args = args
+        self.input = input
+        self.lines = lines
+        self.check = check
+        self.timeout = timeout
+        self.kwargs = kwargs
+        self.windows = {
+            'stdout': OutputWindow(head_lines, tail_lines),
+            'stderr': OutputWindow(head_lines, tail_lines)}
+        self.returncode = None
+        self.rusage = None
+        self.process = None
+
+    @property
+    def out(self):
+        return six.text_type(self.windows['stdout'])
+
+    @property
+    def err(self):
+        return six.text_type(self.windows['stderr'])
+
+    def __iter__(self):
+        start_time = time.time()
+        deadline = start_time + self.timeout if self.timeout is not None else None
+        decoders = dict((name, codecs.getincrementaldecoder('utf_8')(errors='replace')) for name in self.windows)
+        partial = dict((name, '') for name in self.windows)
+        p = execute_command_nonblocking(self.args, **self.kwargs)
+        self.process = p
+        try:
+            for name, data in read_pipes(p, deadline, self.input.encode('ascii') if self.input is not None else None):
+                text = decoders[name].decode(data)
+                if not text:
+                    continue
+                self.windows[name].write(text)
+                if not self.lines:
+                    yield (name, text)
+                    continue
+                lines, overflow, partial[name] = split_lines(partial[name], text)
+                for line in lines:
+                    yield (name, line + '\n')
+                for piece in overflow:
+                    yield (name, piece)
+            for name in self.windows:
+                final = decoders[name].decode(b'', final=True)
+                self.windows[name].write(final)
+                if partial[name] + final:
+                    yield (name, partial[name] + final)
+            for pipe in [p.stdout, p.stderr]:
+                if pipe is not None:
+                    pipe.close()
+            self.rusage = reap_process(p, deadline)
+        except DeadlineExceeded:
+            kill_process(p)
+            raise IrodsError(
+                'The call {0} did not complete within'
+                ' {1} seconds.'.format(self.args, self.timeout))
+        except GeneratorExit:
+            kill_process(p)
+            raise
+        self.returncode = p.returncode
+        for window in self.windows.values():
+            window.close()
+        log_command_result(self.args, self.returncode, self.out, self.err, self.input,
+                           time.time() - start_time, self.rusage)
+        if self.check:
+            check_command_return(self.args, self.out, self.err, self.returncode, **self.kwargs)
+
+    def run(self):
+        for _ in self:
+            pass
+        return (self.out, self.err, self.returncode)
+
+def stream_command(args, **kwargs):
+    return StreamingCommand(args, **kwargs)
 
 def execute_command_permissive(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, input=None, foreground=False, **kwargs):
+    if foreground == True:
+        command = StreamingCommand(args, input=input, check=False, stdout=stdout, stderr=stderr, **kwargs)
+        for name, line in command:
+            stream = sys.stderr if name == 'stderr' else sys.stdout
+            stream.write(line)
+            stream.flush()
+        return (command.out, command.err, command.returncode)
+
     if input is not None:
         if 'stdin' in kwargs and kwargs['stdin'] != subprocess.PIPE:
             raise IrodsError('\'input\' option is mutually exclusive with a \'stdin\' '
                     'option that is not equal to \'subprocess.PIPE\'.')
         kwargs['stdin'] = subprocess.PIPE
+    start_time = time.time()
     p = execute_command_nonblocking(args, stdout=stdout, stderr=stderr, **kwargs)
-
-    if foreground == True:
-        while True:
-            line = p.stdout.readline()
-            if line == '' and p.poll() is not None:
-                break
-            sys.stdout.write(line)
-            sys.stdout.flush()
-        return (p.stdout, p.stderr, p.returncode)
-    else:
-        out, err = communicate_and_log(p, args, input)
-        return (out, err, p.returncode)
+    out, err = communicate_and_log(p, args, input, start_time)
+    return (out, err, p.returncode)
 
 def check_command_return(args, out, err, returncode, **kwargs):
     if returncode is not None and returncode != 0:
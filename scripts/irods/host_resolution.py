@@ -0,0 +1,147 @@
+from __future__ import print_function
+import logging
+import os
+import socket
+import threading
+import time
+
+from .exceptions import IrodsError
+from . import paths
+
+DEFAULT_TTL = 60
+
+def pack_address(family, address):
+    # drop the scope id from link-local ipv6 addresses
+    return (family, socket.inet_pton(family, address.partition('%')[0]))
+
+def is_loopback(packed_address):
+    family, packed = packed_address
+    if family == socket.AF_INET:
+        return packed[:1] == b'\x7f'
+    return (packed == b'\x00' * 15 + b'\x01' or
+            packed[:12] == b'\x00' * 10 + b'\xff\xff' and packed[12:13] == b'\x7f')
+
+def get_local_addresses_with_psutil():
+    import psutil
+    addresses = set()
+    for interface_addresses in psutil.net_if_addrs().values():
+        for a in interface_addresses:
+            if a.family in (socket.AF_INET, socket.AF_INET6):
+                addresses.add(pack_address(a.family, a.address))
+    return frozenset(addresses)
+
+def getaddrinfo_with_retry(hostname, retries=50, interval=0.01):
+    for _ in range(retries - 1):
+        try:
+            return socket.getaddrinfo(hostname, None, socket.AF_UNSPEC, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+        except socket.gaierror as e:
+            if e.args[0] != socket.EAI_AGAIN:
+                raise
+        time.sleep(interval)
+    return socket.getaddrinfo(hostname, None, socket.AF_UNSPEC, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+
+class HostResolver(object):
+    def __init__(self, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key, loader, refresh=False):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if not refresh and entry is not None and now - entry[0] < self.ttl:
+                return entry[1]
+        value = loader()
+        with self._lock:
+            self._entries[key] = (now, value)
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._entries = {}
+
+    # get the fully qualified domain name
+    #(no, really, getfqdn() is insufficient)
+    def get_hostname(self, refresh=False):
+        return self._get(('hostname',), lambda: socket.getaddrinfo(
+            socket.gethostname(), 0, 0, 0, 0, socket.AI_CANONNAME)[0][3], refresh)
+
+    def get_local_addresses(self, refresh=False):
+        def load():
+            try:
+                return get_local_addresses_with_psutil()
+            except (ImportError, AttributeError):
+                # psutil too old for net_if_addrs
+                return None
+        return self._get(('local_addresses',), load, refresh)
+
+    def resolve(self, hostname, refresh=False):
+        def load():
+            try:
+                return frozenset(pack_address(family, sockaddr[0])
+                                 for family, _, _, _, sockaddr in getaddrinfo_with_retry(hostname)
+                                 if family in (socket.AF_INET, socket.AF_INET6))
+            except socket.gaierror as e:
+                raise IrodsError('Could not resolve hostname [{0}]: {1}'.format(hostname, e))
+        return self._get(('resolve', hostname), load, refresh)
+
+    def resolves_to_local_address(self, hostname, refresh=False):
+        return self._resolves_to(hostname, self.get_local_addresses(refresh), refresh)
+
+    def _resolves_to(self, hostname, local_addresses, refresh=False):
+        if local_addresses is None:
+            return self._get(('resolves_to_local_address', hostname),
+                             lambda: hostname_resolves_to_local_address_with_binary(hostname), refresh)
+        return any(is_loopback(a) or a in local_addresses for a in self.resolve(hostname, refresh))
+
+    def resolve_all(self, hostnames, refresh=False):
+        results = {}
+        # the local addresses are shared by every lookup, so load them once up front
+        local_addresses = self.get_local_addresses(refresh)
+        def resolve(hostname):
+            try:
+                results[hostname] = {'local': self._resolves_to(hostname, local_addresses, refresh)}
+            except IrodsError as e:
+                results[hostname] = {'error': str(e)}
+        threads = [threading.Thread(target=resolve, args=(h,)) for h in set(hostnames)]
+        for t in threads:
+            t.daemon = True
+            t.start()
+        for t in threads:
+            t.join()
+        return results
+
+def hostname_resolves_to_local_address_with_binary(hostname):
+    from . import execute
+    _, err, ret = execute.execute_command_permissive([
+        os.path.join( paths.server_bin_directory(), 'hostname_resolves_to_local_address'),
+        hostname])
+    if ret == 0:
+        return True
+    elif ret == 1:
+        return False
+    raise IrodsError('Error encountered in hostname_resolves_to_local_address for hostname [{0}]:\n{1}'.format(hostname, err))
+
+def get_configured_hostnames(irods_config):
+    hostnames = list(irods_config.server_config.get('catalog_provider_hosts', []))
+    for host_entry in irods_config.hosts_config.get('host_entries', []):
+        hostnames.extend(a['address'] for a in host_entry.get('addresses', []))
+    return hostnames
+
+default_host_resolver = HostResolver()
+
+def get_hostname(refresh=False):
+    return default_host_resolver.get_hostname(refresh)
+
+def resolves_to_local_address(hostname, refresh=False):
+    return default_host_resolver.resolves_to_local_address(hostname, refresh)
+
+def resolve_all(hostnames, refresh=False):
+    return default_host_resolver.resolve_all(hostnames, refresh)
+
+def resolve_configured_hosts(irods_config, refresh=False):
+    return resolve_all(get_configured_hostnames(irods_config), refresh)
+
+def invalidate():
+    default_host_resolver.invalidate()
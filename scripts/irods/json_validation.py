@@ -1,12 +1,17 @@
 from __future__ import print_function
+import hashlib
 import json
 import logging
-import pprint
+import os
 import sys
+import tempfile
+import threading
+import time
 
 from . import six
 
 from . import lib
+from . import paths
 from . import log as irods_log
 from .exceptions import IrodsError, IrodsWarning
 
@@ -20,6 +25,9 @@ try:
 except ImportError:
     pass
 
+# the published schemas that this installation ships copies of in configuration_schemas
+OFFICIAL_SCHEMA_BASE_URIS = ['https://schemas.irods.org/configuration', 'http://schemas.irods.org/configuration']
+
 def load_and_validate(config_file, schema_uri):
     l = logging.getLogger(__name__)
     try:
@@ -52,10 +60,9 @@ def validate_dict(config_dict, schema_uri, name=None):
             sys.exc_info()[2])
 
     try:
-        schema = get_initial_schema(schema_uri)
-        l.debug('Validating %s against json schema:', name)
-        l.debug(pprint.pformat(schema))
-        jsonschema.validate(config_dict, schema)
+        validator = get_validator(schema_uri)
+        l.debug('Validating %s against json schema %s', name, schema_uri)
+        validator.validate(config_dict)
 
     except (jsonschema.exceptions.RefResolutionError,   # could not resolve recursive schema $ref
             ValueError,                                 # 404s and bad JSON
@@ -78,45 +85,222 @@ def validate_dict(config_dict, schema_uri, name=None):
 
     l.info("Validating [%s]... Success", name)
 
-def get_initial_schema(schema_uri):
-    l = logging.getLogger(__name__)
-    l.debug('Loading schema from %s', schema_uri)
-    url_scheme = six.moves.urllib.parse.urlparse(schema_uri).scheme
-    l.debug('Parsed URL: %s', schema_uri)
-    scheme_dispatch = {
-        'file': get_initial_schema_from_file,
-        'http': get_initial_schema_from_web,
-        'https': get_initial_schema_from_web,
-    }
+def prefetch_schemas(schema_uris):
+    errors = {}
+    def fetch(schema_uri):
+        try:
+            get_validator(schema_uri)
+        except Exception as e:
+            # reported again by validate_dict, which retries the fetch
+            errors[schema_uri] = e
+    threads = [threading.Thread(target=fetch, args=(u,)) for u in set(schema_uris)]
+    for t in threads:
+        t.daemon = True
+        t.start()
+    for t in threads:
+        t.join()
+    return errors
 
-    try:
-        return scheme_dispatch[url_scheme](schema_uri)
-    except KeyError:
-        raise IrodsError('ERROR: Invalid schema url: {}'.format(schema_uri))
+_validators = {}
+_validators_lock = threading.Lock()
 
-def get_initial_schema_from_web(schema_uri):
-    try:
-        response = requests.get(schema_uri, timeout=5)
-    except NameError:
-        six.reraise(IrodsError, IrodsError(
-            'WARNING: Validation failed for {0} -- requests not installed'.format(
-                name)),
-                          sys.exc_info()[2])
+def get_validator(schema_uri):
+    store = get_schema_store()
+    schema = store.get(schema_uri)
+    with _validators_lock:
+        cached = _validators.get(schema_uri)
+        if cached is not None and cached[0] is schema:
+            return cached[1]
+    validator_class = jsonschema.validators.validator_for(schema)
+    validator_class.check_schema(schema)
+    resolver = jsonschema.RefResolver(schema_uri, schema,
+            handlers=dict((scheme, store.get) for scheme in ['file', 'http', 'https']))
+    validator = validator_class(schema, resolver=resolver)
+    with _validators_lock:
+        _validators[schema_uri] = (schema, validator)
+    return validator
 
-    # check response values
-    try:
-        # modern requests
-        schema = json.loads(response.text)
-    except AttributeError:
-        # requests pre-v1.0.0
-        response.encoding = 'utf8'
-        schema = json.loads(response.content)
-    return schema
-
-def get_initial_schema_from_file(schema_uri):
-    with open(schema_uri[7:], 'rt') as f:
-        schema = json.load(f)
-    return schema
+class SchemaStore(object):
+    def __init__(self, cache_directory=None, seed_directory=None, seed_base_uris=OFFICIAL_SCHEMA_BASE_URIS,
+                 max_age=24 * 60 * 60, timeout=3, retry_interval=60 * 60):
+        self.cache_directory = cache_directory
+        self.seed_directory = seed_directory
+        self.seed_base_uris = seed_base_uris
+        self.max_age = max_age
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self.network_unavailable = False
+        self._schemas = {}
+        self._lock = threading.Lock()
+
+    def get(self, schema_uri):
+        url_scheme = six.moves.urllib.parse.urlparse(schema_uri).scheme
+        if url_scheme == 'file':
+            return self.get_from_file(schema_uri)
+        if url_scheme in ['http', 'https']:
+            return self.get_from_web(schema_uri)
+        raise IrodsError('ERROR: Invalid schema url: {0}'.format(schema_uri))
+
+    def get_from_file(self, schema_uri):
+        path = six.moves.urllib.parse.urlparse(schema_uri.partition('#')[0]).path
+        st = os.stat(path)
+        key = (st.st_mtime, st.st_size, st.st_ino)
+        with self._lock:
+            cached = self._schemas.get(schema_uri)
+            if cached is not None and cached[0] == key:
+                return cached[1]
+        logging.getLogger(__name__).debug('Loading schema from %s', path)
+        with open(path, 'rt') as f:
+            schema = json.load(f)
+        with self._lock:
+            self._schemas[schema_uri] = (key, schema)
+        return schema
+
+    def get_from_web(self, schema_uri):
+        l = logging.getLogger(__name__)
+        schema_uri = schema_uri.partition('#')[0]
+        with self._lock:
+            cached = self._schemas.get(schema_uri)
+        if cached is None:
+            cached = self.load_cache_entry(schema_uri) or self.load_seed_entry(schema_uri)
+        if cached is not None and self.is_fresh(cached):
+            return cached['schema']
+        if cached is not None and self.network_unavailable:
+            l.debug('Network previously unavailable, using cached schema for %s', schema_uri)
+            return cached['schema']
+
+        headers = {}
+        if cached is not None and cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached is not None and cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+        l.debug('Loading schema from %s', schema_uri)
+        try:
+            response = requests.get(schema_uri, timeout=self.timeout, headers=headers)
+        except NameError:
+            if cached is not None:
+                return cached['schema']
+            six.reraise(IrodsWarning, IrodsWarning(
+                'WARNING: Could not retrieve {0} -- requests not installed'.format(
+                    schema_uri)),
+                              sys.exc_info()[2])
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            self.network_unavailable = True
+            if cached is None:
+                raise
+            l.debug('Could not reach %s, using cached schema', schema_uri, exc_info=True)
+            return self.record_failed_refresh(cached)['schema']
+
+        if response.status_code == 304 and cached is not None:
+            entry = dict(cached, fetched_at=time.time())
+        elif response.status_code != 200:
+            if cached is not None:
+                l.debug('Received HTTP %s for %s, using cached schema', response.status_code, schema_uri)
+                return self.record_failed_refresh(cached)['schema']
+            raise ValueError('HTTP status {0} retrieving {1}'.format(response.status_code, schema_uri))
+        else:
+            try:
+                # modern requests
+                schema = json.loads(response.text)
+            except AttributeError:
+                # requests pre-v1.0.0
+                response.encoding = 'utf8'
+                schema = json.loads(response.content)
+            entry = {
+                'uri': schema_uri,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'fetched_at': time.time(),
+                'schema': schema}
+        self.store_cache_entry(entry)
+        return entry['schema']
+
+    def is_fresh(self, entry):
+        now = time.time()
+        if now - entry['fetched_at'] < self.max_age:
+            return True
+        # the on-disk record of a failed refresh keeps other processes from each waiting on the network
+        return now - entry.get('failed_at', 0) < self.retry_interval
+
+    def record_failed_refresh(self, entry):
+        entry = dict(entry, failed_at=time.time())
+        self.store_cache_entry(entry)
+        return entry
+
+    def cache_entry_path(self, schema_uri):
+        if self.cache_directory is None:
+            return None
+        return os.path.join(self.cache_directory,
+                hashlib.sha1(schema_uri.encode('utf8')).hexdigest() + '.json')
+
+    def load_cache_entry(self, schema_uri):
+        path = self.cache_entry_path(schema_uri)
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rt') as f:
+                entry = json.load(f)
+        except (IOError, OSError, ValueError):
+            logging.getLogger(__name__).debug('Ignoring unreadable schema cache entry %s', path, exc_info=True)
+            return None
+        with self._lock:
+            self._schemas[schema_uri] = entry
+        return entry
+
+    def load_seed_entry(self, schema_uri):
+        # the schemas shipped with this installation, matched by version directory and file name
+        if self.seed_directory is None:
+            return None
+        # a site serving its own schemas may have changed them, so only the official location is seeded
+        if not any(schema_uri.startswith(base_uri.rstrip('/') + '/') for base_uri in self.seed_base_uris):
+            return None
+        components = six.moves.urllib.parse.urlparse(schema_uri).path.rstrip('/').split('/')
+        if len(components) < 2:
+            return None
+        path = os.path.join(self.seed_directory, components[-2], components[-1])
+        if not os.path.exists(path):
+            return None
+        # shipped with this version, so as fresh as a download; written through so later processes find it cached
+        with open(path, 'rt') as f:
+            entry = {'uri': schema_uri, 'fetched_at': time.time(), 'schema': json.load(f)}
+        self.store_cache_entry(entry)
+        return entry
+
+    def store_cache_entry(self, entry):
+        with self._lock:
+            self._schemas[entry['uri']] = entry
+        path = self.cache_entry_path(entry['uri'])
+        if path is None:
+            return
+        try:
+            lib.make_dir_p(os.path.dirname(path))
+            with tempfile.NamedTemporaryFile(mode='wt', dir=os.path.dirname(path), delete=False) as f:
+                json.dump(entry, f)
+            os.rename(f.name, path)
+        except (IOError, OSError):
+            logging.getLogger(__name__).debug('Could not write schema cache entry %s', path, exc_info=True)
+
+_schema_store = None
+_schema_store_lock = threading.Lock()
+
+def get_schema_store():
+    global _schema_store
+    with _schema_store_lock:
+        if _schema_store is None:
+            try:
+                cache_directory = paths.schema_cache_directory()
+            except (IOError, OSError, KeyError):
+                logging.getLogger(__name__).debug('No service account home directory, schemas will not be cached on disk', exc_info=True)
+                cache_directory = None
+            _schema_store = SchemaStore(
+                    cache_directory=cache_directory,
+                    seed_directory=os.path.join(paths.irods_directory(), 'configuration_schemas'))
+        return _schema_store
+
+def get_initial_schema(schema_uri):
+    l = logging.getLogger(__name__)
+    l.debug('Loading schema from %s', schema_uri)
+    return get_schema_store().get(schema_uri)
 
 logging.getLogger('requests.packages.urllib3.connectionpool').addFilter(irods_log.DeferInfoToDebugFilter())
 logging.getLogger('urllib3.connectionpool').addFilter(irods_log.DeferInfoToDebugFilter())
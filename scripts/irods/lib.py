@@ -10,32 +10,31 @@ import hashlib
 import itertools
 import json
 import logging
-import mmap
 import os
 import platform
 import pprint
-import psutil
 import pwd
 import re
 import shlex
 import shutil
-import socket
 import subprocess
 import sys
 import tempfile
+import threading
 import time
 
 from . import six
 
 from .exceptions import IrodsError, IrodsWarning
 from . import execute
+from . import host_resolution
+from . import log_tailer
 from . import paths
+from . import process_index
+from . import shared_objects
 
-# get the fully qualified domain name
-#(no, really, getfqdn() is insufficient)
-def get_hostname():
-    return socket.getaddrinfo(
-        socket.gethostname(), 0, 0, 0, 0, socket.AI_CANONNAME)[0][3]
+def get_hostname(refresh=False):
+    return host_resolution.get_hostname(refresh)
 
 indent = execute.indent
 safe_shlex_split_for_2_6 = execute.safe_shlex_split_for_2_6
@@ -43,69 +42,133 @@ execute_command_nonblocking = execute.execute_command_nonblocking
 execute_command_timeout = execute.execute_command_timeout
 execute_command_permissive = execute.execute_command_permissive
 execute_command = execute.execute_command
-
-def get_pids_executing_binary_file(binary_file_path):
-    def get_exe(process):
-        if psutil.version_info >= (2,0):
-            return process.exe()
-        return process.exe
-    abspath = os.path.abspath(binary_file_path)
-    pids = []
-    for p in psutil.process_iter():
+stream_command = execute.stream_command
+
+class CommandResult(object):
+    __slots__ = ('index', 'args', 'out', 'err', 'returncode', 'start_time', 'end_time', 'skipped')
+
+    def __init__(self, index, args):
+        self.index = index
+        self.args = args
+        self.out = None
+        self.err = None
+        self.returncode = None
+        self.start_time = None
+        self.end_time = None
+        self.skipped = False
+
+    @property
+    def duration(self):
+        if self.start_time is None or self.end_time is None:
+            return None
+        return self.end_time - self.start_time
+
+    @property
+    def succeeded(self):
+        return self.returncode == 0
+
+    def __repr__(self):
+        return 'CommandResult(args={0!r}, returncode={1}, duration={2}, skipped={3})'.format(
+            self.args, self.returncode, self.duration, self.skipped)
+
+def get_dependents_in_topological_order(command_count, dependencies):
+    dependents = dict((i, []) for i in range(command_count))
+    remaining = dict((i, 0) for i in range(command_count))
+    for i, prerequisites in dependencies.items():
+        for prerequisite in set(prerequisites):
+            if i not in remaining or prerequisite not in remaining:
+                raise IrodsError('Dependency {0} -> {1} refers to a command that does not exist.'.format(i, prerequisite))
+            dependents[prerequisite].append(i)
+            remaining[i] += 1
+    ready = [i for i in range(command_count) if remaining[i] == 0]
+    unvisited = dict(remaining)
+    visited = 0
+    while ready:
+        i = ready.pop()
+        visited += 1
+        for dependent in dependents[i]:
+            unvisited[dependent] -= 1
+            if unvisited[dependent] == 0:
+                ready.append(dependent)
+    if visited != command_count:
+        raise IrodsError('The command dependencies contain a cycle.')
+    return dependents, remaining
+
+def execute_commands_parallel(commands, dependencies=None, max_workers=8, skip_dependents_of_failures=True, **kwargs):
+    l = logging.getLogger(__name__)
+    if max_workers < 1:
+        raise IrodsError('max_workers must be at least 1, not {0}.'.format(max_workers))
+    results = [CommandResult(i, args) for i, args in enumerate(commands)]
+    dependents, remaining = get_dependents_in_topological_order(len(results), dependencies or {})
+    ready = collections.deque(i for i in range(len(results)) if remaining[i] == 0)
+    condition = threading.Condition()
+    state = {'finished': 0}
+    start_time = time.time()
+
+    def finish(i):
+        finished = [i]
+        while finished:
+            i = finished.pop()
+            state['finished'] += 1
+            for dependent in dependents[i]:
+                if results[dependent].skipped:
+                    continue
+                if skip_dependents_of_failures and (results[i].skipped or not results[i].succeeded):
+                    results[dependent].skipped = True
+                    finished.append(dependent)
+                    continue
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    ready.append(dependent)
+
+    def run(i):
+        result = results[i]
+        result.start_time = time.time()
         try:
-            if abspath == get_exe(p):
-                pids.append(p.pid)
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            pass
-    return pids
+            result.out, result.err, result.returncode = execute_command_permissive(result.args, **kwargs)
+        except Exception as e:
+            result.err = str(e)
+        finally:
+            result.end_time = time.time()
+            with condition:
+                finish(i)
+                condition.notify_all()
+
+    def work():
+        while True:
+            with condition:
+                while not ready and state['finished'] < len(results):
+                    condition.wait()
+                if not ready:
+                    return
+                i = ready.popleft()
+            run(i)
+
+    workers = [threading.Thread(target=work) for _ in range(min(max_workers, len(results)))]
+    for t in workers:
+        t.daemon = True
+        t.start()
+    for t in workers:
+        t.join()
+
+    l.debug('Ran %s commands with %s workers in %.3f seconds:\n%s',
+            len(results), max_workers, time.time() - start_time,
+            indent(*['{0}: returncode {1}, {2}'.format(r.args, r.returncode,
+                'skipped' if r.skipped else '{0:.3f}s'.format(r.duration)) for r in results]))
+    return results
+
+def get_pids_executing_binary_file(binary_file_path, refresh=True):
+    return process_index.snapshot(refresh=refresh).get_pids_executing_binary_file(binary_file_path)
 
 def kill_pid(pid):
+    import psutil
     p = psutil.Process(pid)
     p.suspend()
     p.terminate()
     p.kill()
 
 def find_shared_object(so_name, regex=False, additional_directories=[]):
-    paths = []
-    if regex:
-        so_regex = re.compile(so_name)
-
-    if 'LD_PRELOAD' in os.environ:
-        for path in os.environ['LD_PRELOAD'].split(':'):
-            if path not in paths and os.path.exists(path) and (
-                    (regex and so_regex.match(os.path.basename(path))) or
-                    (not regex and os.path.basename(path) == so_name)):
-                paths.append(path)
-
-    if 'LD_LIBRARY_PATH' in os.environ:
-        for directory in os.environ['LD_LIBRARY_PATH'].split(':'):
-            if regex and os.path.exists(directory):
-                for name in os.listdir(directory):
-                    if so_regex.match(name) and os.path.join(directory, name) not in paths:
-                        paths.append(os.path.join(directory, name))
-            elif os.path.exists(os.path.join(directory, so_name)) and os.path.join(directory, so_name) not in paths:
-                paths.append(os.path.join(directory, so_name))
-
-    env = os.environ.copy()
-    env['PATH'] = ':'.join([env['PATH'], '/sbin'])
-    out, _ = execute_command(['ldconfig', '-vNX'], env=env)
-    for directory in [d.rstrip(':') for d in out.splitlines() if d and d[0] == '/']:
-        if regex and os.path.exists(directory):
-            for name in os.listdir(directory):
-                if so_regex.match(name) and os.path.join(directory, name) not in paths:
-                    paths.append(os.path.join(directory, name))
-        elif os.path.exists(os.path.join(directory, so_name)) and os.path.join(directory, so_name) not in paths:
-            paths.append(os.path.join(directory, so_name))
-
-    for (directory, _, names) in itertools.chain(*[os.walk(d) for d in itertools.chain(additional_directories, ['/usr/lib/'])]):
-        if regex:
-            for name in names:
-                if so_regex.match(os.path.basename(name)) and os.path.join(directory, name) not in paths:
-                    paths.append(os.path.join(directory, name))
-        elif os.path.exists(os.path.join(directory, so_name)) and os.path.join(directory, so_name) not in paths:
-            paths.append(os.path.join(directory, so_name))
-
-    return paths
+    return shared_objects.find_shared_object(so_name, regex, additional_directories)
 
 def file_digest(filename, hash_type, encoding='hex'):
     block_size = pow(2, 20)
@@ -126,15 +189,10 @@ def file_digest(filename, hash_type, encoding='hex'):
 
 
 def re_shm_exists():
-    possible_shm_locations = ['/var/run/shm', '/dev/shm']
-    for l in possible_shm_locations:
-        try:
-            files = os.listdir(l)
-            for f in files:
-                if 'irods' in f.lower():
-                    return os.path.join(l, f)
-        except OSError:
-            pass
+    from . import shared_memory
+    segments = shared_memory.scan_re_cache_segments()
+    if segments:
+        return segments[0].path
     return False
 
 def json_object_hook_list(l):
@@ -349,46 +407,21 @@ def get_file_size_by_path(path):
 def write_to_log(log_path, message):
     pass
 
+# both scan only what has been appended to the log since the previous call with the same arguments
 def count_occurrences_of_regexp_in_log(log_path, pattern, start_index=0):
-    occurrences = []
-    target = None
-    if isinstance(pattern,(tuple,list)):
-        pattern = [pattern[0].encode('ascii')] + list(pattern[1:])
-    elif isinstance(pattern,re._pattern_type):
-        target = pattern
-    else:
-        pattern = [pattern.encode('ascii')]  # assume string-like
-    if target is None: target=re.compile(*pattern)
-    with open(log_path) as f:
-        m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
-        occurrences.extend(j for j in target.finditer(m[start_index:]))
-        m.close()
-    return occurrences
+    return log_tailer.find_occurrences_of_regexp(log_path, pattern, start_index)
 
 def count_occurrences_of_string_in_log(log_path, string, start_index=0):
-    with open(log_path) as f:
-        m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
-        n = 0
-        target = string.encode('ascii')
-        i = m.find(target, start_index)
-        while i != -1:
-            n += 1
-            i = m.find(target, i + 1)
-        m.close()
-        return n
+    return log_tailer.count_occurrences_of_string(log_path, string, start_index)
+
+def wait_for_occurrences_of_string_in_log(log_path, string, count=1, start_index=0, timeout=100):
+    return log_tailer.wait_for_occurrences_of_string(log_path, string, count, start_index, timeout)
 
 def version_string_to_tuple(version_string):
     return tuple(map(int, version_string.split('.')))
 
-def hostname_resolves_to_local_address(hostname):
-    _, err, ret = execute_command_permissive([
-        os.path.join( paths.server_bin_directory(), 'hostname_resolves_to_local_address'),
-        hostname])
-    if ret == 0:
-        return True
-    elif ret == 1:
-        return False
-    raise IrodsError('Error encountered in hostname_resolves_to_local_address for hostname [{0}]:\n{1}'.format(hostname, err))
+def hostname_resolves_to_local_address(hostname, refresh=False):
+    return host_resolution.resolves_to_local_address(hostname, refresh)
 
 def get_header(message):
     lines = [l.strip() for l in message.splitlines()]
@@ -1,7 +1,14 @@
+import copy
+import json
 import logging
+import os
+import pprint
 import sys
+import threading
 import time
 
+from . import six
+
 class ColorFormatter(logging.Formatter):
     BLACK, RED, GREEN, YELLOW, BLUE, MAGENTA, CYAN, WHITE = range(8)
 
@@ -21,6 +28,85 @@ class ColorFormatter(logging.Formatter):
             color_seq = self.COLOR_SEQ_TEMPLATE.format(fore_color_int=fore_color_int)
         return '{0}{1}{2}'.format(color_seq, message, self.RESET_SEQ)
 
+class JsonLinesFormatter(logging.Formatter):
+    extra_fields = ['duration', 'command', 'returncode']
+
+    def format(self, record):
+        d = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + '.{0:03d}Z'.format(int(record.msecs)),
+            'level': record.levelname,
+            'logger': record.name,
+            'filename': record.filename,
+            'lineno': record.lineno,
+            'message': record.getMessage()}
+        for field in self.extra_fields:
+            if hasattr(record, field):
+                d[field] = getattr(record, field)
+        if record.exc_info:
+            d['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            d['exception'] = record.exc_text
+        return json.dumps(d, default=str, sort_keys=True)
+
+class DeferredFormat(object):
+    # passed as a logging argument so the work is only done if a handler emits the record
+    def __init__(self, function, *args, **kwargs):
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+
+    def __str__(self):
+        return self.function(*self.args, **self.kwargs)
+
+def deferred_pformat(o):
+    return DeferredFormat(pprint.pformat, o)
+
+class AsynchronousHandler(logging.Handler):
+    def __init__(self, handler):
+        super(AsynchronousHandler, self).__init__(handler.level)
+        self.handler = handler
+        self.queue = six.moves.queue.Queue()
+        self.thread = threading.Thread(target=self._process_records)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _process_records(self):
+        while True:
+            record = self.queue.get()
+            try:
+                if record is None:
+                    return
+                self.handler.handle(record)
+            finally:
+                self.queue.task_done()
+
+    def setFormatter(self, fmt):
+        self.handler.setFormatter(fmt)
+
+    def emit(self, record):
+        # the caller may change its arguments and extras once this returns, so the message is rendered
+        # and mutable extras are copied now; only the formatting and the write are left to the thread
+        record.msg, record.args = record.getMessage(), None
+        for name, value in record.__dict__.items():
+            if isinstance(value, (list, dict, set)):
+                record.__dict__[name] = copy.deepcopy(value)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        self.queue.put(record)
+
+    def flush(self):
+        if self.thread.is_alive():
+            self.queue.join()
+        self.handler.flush()
+
+    def close(self):
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        self.handler.close()
+        super(AsynchronousHandler, self).close()
+
 class NullHandler(logging.Handler):
     def emit(self, record):
         pass
@@ -54,10 +140,19 @@ def register_tty_handler(stream, minlevel, maxlevel):
         logging_handler.addFilter(LessThanFilter(maxlevel))
     logging.getLogger().addHandler(logging_handler)
 
-def register_file_handler(log_file_path, level=logging.DEBUG):
+def register_file_handler(log_file_path, level=logging.DEBUG, asynchronous=True, log_format=None):
     logging.Formatter.converter = time.gmtime
 
+    if log_format is None:
+        log_format = os.environ.get('IRODS_PYTHON_LOG_FORMAT', 'text')
+
     logging_handler = logging.FileHandler(log_file_path)
-    logging_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)7s - %(filename)30s:%(lineno)4d - %(message)s'))
-    logging_handler.setLevel(logging.DEBUG)
+    if log_format == 'json':
+        logging_handler.setFormatter(JsonLinesFormatter())
+    else:
+        logging_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)7s - %(filename)30s:%(lineno)4d - %(message)s'))
+    logging_handler.setLevel(level)
+    if asynchronous:
+        logging_handler = AsynchronousHandler(logging_handler)
     logging.getLogger().addHandler(logging_handler)
+    return logging_handler
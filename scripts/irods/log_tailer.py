@@ -0,0 +1,324 @@
+from __future__ import print_function
+import collections
+import errno
+import logging
+import os
+import select
+import threading
+import time
+
+from . import six
+
+READ_SIZE = 1024 * 1024
+SIGNATURE_SIZE = 64
+MAX_CACHED_TAILERS = 64
+DEFAULT_POLL_INTERVAL = 0.1
+
+# from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+def encode_pattern(pattern):
+    if isinstance(pattern, six.text_type):
+        return pattern.encode('ascii')
+    return pattern
+
+class StringPattern(object):
+    def __init__(self, string):
+        self.target = encode_pattern(string)
+        self.count = 0
+        self._carry = b''
+
+    @property
+    def key(self):
+        return ('string', self.target)
+
+    def reset(self):
+        self.count = 0
+        self._carry = b''
+
+    def scan(self, data, position):
+        buf = self._carry + data
+        # occurrences may overlap, as with the previous whole-file search
+        i = buf.find(self.target)
+        while i != -1:
+            self.count += 1
+            i = buf.find(self.target, i + 1)
+        # anything shorter than the target that could still begin an occurrence
+        self._carry = buf[len(buf) - len(self.target) + 1:] if len(self.target) > 1 else b''
+
+class LogMatch(object):
+    # the parts of a match that callers use, copied so that the chunk it was found in can be freed
+    def __init__(self, m, position):
+        self._groups = (m.group(0),) + m.groups()
+        self._spans = [(s + position if s != -1 else -1, e + position if e != -1 else -1)
+                       for s, e in [m.span(i) for i in range(len(self._groups))]]
+
+    def group(self, *indices):
+        if not indices:
+            return self._groups[0]
+        if len(indices) == 1:
+            return self._groups[indices[0]]
+        return tuple(self._groups[i] for i in indices)
+
+    def groups(self):
+        return self._groups[1:]
+
+    def span(self, index=0):
+        return self._spans[index]
+
+    def start(self, index=0):
+        return self._spans[index][0]
+
+    def end(self, index=0):
+        return self._spans[index][1]
+
+class RegexpPattern(object):
+    def __init__(self, pattern):
+        import re
+        if isinstance(pattern, (tuple, list)):
+            pattern = re.compile(encode_pattern(pattern[0]), *pattern[1:])
+        elif hasattr(pattern, 'finditer'):
+            if isinstance(pattern.pattern, six.text_type):
+                pattern = re.compile(encode_pattern(pattern.pattern), pattern.flags & ~re.UNICODE)
+        else:
+            pattern = re.compile(encode_pattern(pattern))
+        self.target = pattern
+        self.reset()
+
+    @property
+    def key(self):
+        return ('regexp', self.target.pattern, self.target.flags)
+
+    def reset(self):
+        self._chunks = []
+        self._length = 0
+        self._position = None
+        self._matches = []
+        self._matched_length = 0
+
+    def scan(self, data, position):
+        # anchors, a last line without a newline and matches spanning reads all depend on the whole text,
+        # so it is kept and searched when asked for, as the log was searched from start_index before
+        if self._position is None:
+            self._position = position
+        self._chunks.append(data)
+        self._length += len(data)
+
+    @property
+    def matches(self):
+        if self._matched_length != self._length:
+            text = b''.join(self._chunks)
+            self._chunks = [text]
+            self._matches = [LogMatch(m, self._position) for m in self.target.finditer(text)]
+            self._matched_length = self._length
+        return self._matches
+
+def make_pattern(pattern, regexp=False):
+    if regexp:
+        return RegexpPattern(pattern)
+    return StringPattern(pattern)
+
+class FileWatcher(object):
+    # wakes on changes to the directory containing a file, so rotation is seen as well as writes
+    def __init__(self, path):
+        self.fd = None
+        try:
+            import ctypes
+            import ctypes.util
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+            directory = os.path.dirname(os.path.abspath(path))
+            if libc.inotify_add_watch(fd, directory.encode('utf-8'),
+                                      IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE) < 0:
+                os.close(fd)
+                raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+            self.fd = fd
+        except (OSError, AttributeError):
+            logging.getLogger(__name__).debug('inotify unavailable, polling %s', path, exc_info=True)
+
+    def wait(self, timeout, poll_interval=DEFAULT_POLL_INTERVAL):
+        if self.fd is None:
+            time.sleep(min(timeout, poll_interval))
+            return
+        try:
+            readable, _, _ = select.select([self.fd], [], [], timeout)
+        except select.error as e:
+            if e.args[0] != errno.EINTR:
+                raise
+            return
+        if readable:
+            try:
+                while os.read(self.fd, 4096):
+                    pass
+            except OSError as e:
+                if e.errno != errno.EAGAIN:
+                    raise
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def get_identity(st):
+    return (st.st_dev, st.st_ino)
+
+class LogTailer(object):
+    def __init__(self, path, patterns=[], start_index=0):
+        self.path = path
+        self.start_index = start_index
+        self.offset = start_index
+        self.patterns = collections.OrderedDict()
+        self._file = None
+        self._identity = None
+        # match offsets are relative to where reading began, as they were when the log was sliced at start_index
+        self._origin = start_index
+        # the last bytes read, to recognise a file truncated and rewritten past the offset
+        self._signature = b''
+        self._lock = threading.RLock()
+        for pattern in patterns:
+            self.add_pattern(pattern)
+
+    def add_pattern(self, pattern):
+        with self._lock:
+            if self.offset != self.start_index:
+                raise ValueError('Patterns must be added to a LogTailer before it reads from {0}'.format(self.path))
+            return self.patterns.setdefault(pattern.key, pattern)
+
+    def _scan(self, data):
+        for pattern in self.patterns.values():
+            pattern.scan(data, self.offset - self._origin)
+
+    def _drain(self):
+        n = 0
+        while True:
+            data = self._file.read(READ_SIZE)
+            if not data:
+                return n
+            self._scan(data)
+            self.offset += len(data)
+            n += len(data)
+            self._signature = (self._signature + data)[-SIGNATURE_SIZE:]
+
+    def _restart(self):
+        # counts describe the file now at the path, as when the whole log was searched on every call
+        self.offset = 0
+        self._origin = 0
+        self._signature = b''
+        for pattern in self.patterns.values():
+            pattern.reset()
+
+    def _truncated(self):
+        if os.fstat(self._file.fileno()).st_size < self.offset:
+            return True
+        if not self._signature:
+            return False
+        self._file.seek(self.offset - len(self._signature))
+        rewritten = self._file.read(len(self._signature)) != self._signature
+        self._file.seek(self.offset)
+        return rewritten
+
+    def _open(self, rotated=False):
+        try:
+            f = open(self.path, 'rb')
+        except (IOError, OSError) as e:
+            if e.errno == errno.ENOENT:
+                return False
+            raise
+        st = os.fstat(f.fileno())
+        if rotated or st.st_size < self.offset:
+            # a rotated log is read from the start of the new file
+            self._restart()
+        f.seek(self.offset)
+        self._file = f
+        self._identity = get_identity(st)
+        return True
+
+    def update(self):
+        with self._lock:
+            if self._file is None and not self._open():
+                return 0
+            try:
+                st = os.stat(self.path)
+            except OSError:
+                st = None
+            if st is not None and get_identity(st) != self._identity:
+                self.close()
+                if not self._open(rotated=True):
+                    return 0
+            elif self._truncated():
+                self._restart()
+                self._file.seek(0)
+            return self._drain()
+
+    def count(self, string):
+        self.update()
+        return self.patterns[StringPattern(string).key].count
+
+    def matches(self, pattern):
+        self.update()
+        return list(self.patterns[RegexpPattern(pattern).key].matches)
+
+    def wait_for(self, predicate, timeout, poll_interval=DEFAULT_POLL_INTERVAL):
+        deadline = time.time() + timeout
+        # watch before reading so that nothing written in between is missed
+        with FileWatcher(self.path) as watcher:
+            while True:
+                self.update()
+                if predicate(self):
+                    return True
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                watcher.wait(remaining, poll_interval)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+_tailers = collections.OrderedDict()
+_tailers_lock = threading.Lock()
+
+def get_tailer(path, pattern, start_index=0, regexp=False):
+    pattern = make_pattern(pattern, regexp)
+    key = (os.path.abspath(path), start_index, pattern.key)
+    with _tailers_lock:
+        tailer = _tailers.pop(key, None)
+        if tailer is None:
+            tailer = LogTailer(path, [pattern], start_index)
+        _tailers[key] = tailer
+        while len(_tailers) > MAX_CACHED_TAILERS:
+            _, evicted = _tailers.popitem(last=False)
+            evicted.close()
+    return tailer
+
+def clear_tailers():
+    with _tailers_lock:
+        for tailer in _tailers.values():
+            tailer.close()
+        _tailers.clear()
+
+def count_occurrences_of_string(path, string, start_index=0):
+    return get_tailer(path, string, start_index).count(string)
+
+def find_occurrences_of_regexp(path, pattern, start_index=0):
+    return get_tailer(path, pattern, start_index, regexp=True).matches(pattern)
+
+def wait_for_occurrences_of_string(path, string, count=1, start_index=0, timeout=100):
+    key = StringPattern(string).key
+    return get_tailer(path, string, start_index).wait_for(
+        lambda tailer: tailer.patterns[key].count >= count, timeout)
@@ -1,10 +1,28 @@
 import grp
-import inspect
 import os
 import pwd
+import threading
+
+_registry = {}
+_registry_lock = threading.RLock()
+
+def _resolve_once(name, resolver):
+    try:
+        return _registry[name]
+    except KeyError:
+        pass
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = resolver()
+        return _registry[name]
+
+def invalidate():
+    with _registry_lock:
+        _registry.clear()
 
 def root_directory():
-    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(scripts_directory()))))
+    return _resolve_once('root_directory', lambda:
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(scripts_directory())))))
 
 def irods_directory():
     return os.path.join(root_directory(), 'var', 'lib', 'irods')
@@ -22,8 +40,8 @@ def core_re_directory():
     return config_directory()
 
 def scripts_directory():
-    return os.path.dirname(os.path.dirname(os.path.abspath(
-        inspect.stack()[0][1])))
+    return _resolve_once('scripts_directory', lambda:
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 def test_directory():
     return os.path.join(scripts_directory(), 'irods', 'test')
@@ -65,6 +83,17 @@ def default_client_environment_path():
         '.irods',
         'irods_environment.json')
 
+def preflight_fingerprint_path():
+    return os.path.join(
+        irods_directory(),
+        '.preflight_fingerprint.json')
+
+def schema_cache_directory():
+    return os.path.join(
+        home_directory(),
+        '.irods',
+        'schema_cache')
+
 def log_directory():
     return os.path.join(
         irods_directory(),
@@ -133,6 +162,21 @@ def genosauth_path():
     return os.path.join(irods_directory(), 'clients', 'bin', 'genOSAuth')
 
 def irods_user_and_group_entries():
+    # re-resolve whenever the service account file is created, replaced, or edited
+    try:
+        st = os.stat(service_account_file_path())
+        key = (st.st_mtime, st.st_size, st.st_ino)
+    except OSError:
+        key = None
+    cached = _registry.get('irods_user_and_group_entries')
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    entries = _load_irods_user_and_group_entries()
+    with _registry_lock:
+        _registry['irods_user_and_group_entries'] = (key, entries)
+    return entries
+
+def _load_irods_user_and_group_entries():
     try:
         with open(service_account_file_path()) as f:
             service_account_dict = dict([(l.partition('=')[0].strip(), l.partition('=')[2].strip()) for l in f.readlines()])
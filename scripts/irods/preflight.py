@@ -0,0 +1,98 @@
+from __future__ import print_function
+import errno
+import json
+import logging
+import os
+import tempfile
+
+from . import lib
+from . import paths
+
+FINGERPRINT_FORMAT_VERSION = 2
+
+def get_fingerprinted_files(irods_config):
+    files = [
+        paths.server_config_path(),
+        paths.version_path(),
+        '.'.join([paths.version_path(), 'dist']),
+        paths.hosts_config_path(),
+        paths.host_access_control_config_path(),
+        irods_config.client_environment_path]
+    if irods_config.is_catalog:
+        files.append(irods_config.odbc_ini_path)
+    return files
+
+def compute_fingerprint(irods_config, catalog_schema_version=None):
+    digests = {}
+    for path in get_fingerprinted_files(irods_config):
+        digests[path] = lib.file_digest(path, 'sha256') if os.path.exists(path) else None
+    # the schema version in the database, which can change without any local file changing
+    return {
+        'format_version': FINGERPRINT_FORMAT_VERSION,
+        'files': digests,
+        'catalog_schema_version': catalog_schema_version}
+
+def get_catalog_schema_version(irods_config):
+    if not irods_config.is_catalog:
+        return None
+    from . import database_interface
+    return database_interface.get_catalog_schema_version(irods_config)
+
+def load_fingerprint(path=None):
+    if path is None:
+        path = paths.preflight_fingerprint_path()
+    try:
+        with open(path, 'rt') as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+
+def save_fingerprint(irods_config, path=None, catalog_schema_version=None):
+    return write_fingerprint(compute_fingerprint(irods_config, catalog_schema_version), path)
+
+def write_fingerprint(fingerprint, path=None):
+    l = logging.getLogger(__name__)
+    if path is None:
+        path = paths.preflight_fingerprint_path()
+    try:
+        with tempfile.NamedTemporaryFile(mode='wt', dir=os.path.dirname(path), delete=False) as f:
+            json.dump(fingerprint, f, indent=4, sort_keys=True)
+        os.rename(f.name, path)
+    except (IOError, OSError):
+        l.debug('Could not write preflight fingerprint %s', path, exc_info=True)
+        return None
+    l.debug('Wrote preflight fingerprint %s', path)
+    return fingerprint
+
+def invalidate_fingerprint(path=None):
+    l = logging.getLogger(__name__)
+    if path is None:
+        path = paths.preflight_fingerprint_path()
+    try:
+        os.unlink(path)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            l.warning('Could not remove preflight fingerprint %s: %s', path, e)
+
+def fingerprint_unchanged(irods_config, path=None):
+    l = logging.getLogger(__name__)
+    saved = load_fingerprint(path)
+    if saved is None:
+        l.debug('No preflight fingerprint from a previous start')
+        return False
+    current = compute_fingerprint(irods_config, saved.get('catalog_schema_version'))
+    if saved != current:
+        changed = [p for p in set(saved.get('files', {})) | set(current['files'])
+                   if saved.get('files', {}).get(p) != current['files'].get(p)]
+        l.debug('Preflight fingerprint changed:\n%s', lib.indent(*(changed or ['format version'])))
+        return False
+    # only consulted once the files match, since it needs a database connection
+    try:
+        catalog_schema_version = get_catalog_schema_version(irods_config)
+    except Exception:
+        l.debug('Could not read the catalog schema version for the preflight fingerprint', exc_info=True)
+        return False
+    if catalog_schema_version != saved.get('catalog_schema_version'):
+        l.debug('Preflight fingerprint changed:\n%s', lib.indent('catalog schema version'))
+        return False
+    return True
@@ -0,0 +1,225 @@
+from __future__ import print_function
+import errno
+import os
+import threading
+import time
+
+PROC_DIRECTORY = '/proc'
+DEFAULT_MAX_AGE = 0.5
+
+class ProcessEntry(object):
+    __slots__ = ('pid', 'exe', 'device_and_inode', 'ppid')
+
+    def __init__(self, pid, exe, device_and_inode, ppid=None):
+        self.pid = pid
+        self.exe = exe
+        self.device_and_inode = device_and_inode
+        self.ppid = ppid
+
+class ProcessSnapshot(object):
+    def __init__(self, entries, timestamp=None):
+        self.entries = entries
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+    @property
+    def age(self):
+        return time.time() - self.timestamp
+
+    @property
+    def pids(self):
+        return sorted(self.entries.keys())
+
+    def is_alive(self, pid):
+        return pid in self.entries
+
+    def get_ppid(self, pid):
+        entry = self.entries.get(pid)
+        if entry is None:
+            return None
+        if entry.ppid is None:
+            entry.ppid = read_ppid(pid)
+        return entry.ppid
+
+    def get_process_metrics(self, pids):
+        if os.path.isdir(PROC_DIRECTORY):
+            boot_time = read_boot_time()
+            clock_ticks, page_size = get_clock_ticks_and_page_size()
+            read = lambda pid: read_process_metrics(pid, boot_time, clock_ticks, page_size)
+        else:
+            read = read_process_metrics_with_psutil
+        metrics = {}
+        for pid in pids:
+            m = read(pid)
+            if m is not None:
+                metrics[pid] = m
+        return metrics
+
+    def get_pids_executing_binary_file(self, binary_file_path):
+        return self.get_binary_to_pids_dict([binary_file_path]).get(binary_file_path, [])
+
+    def get_binary_to_pids_dict(self, binaries):
+        path_to_binary = {}
+        identity_to_binary = {}
+        for b in binaries:
+            abspath = os.path.abspath(b)
+            path_to_binary[abspath] = b
+            identity = get_device_and_inode(abspath)
+            if identity is not None:
+                identity_to_binary[identity] = b
+
+        d = {}
+        for pid in self.pids:
+            entry = self.entries[pid]
+            binary = path_to_binary.get(entry.exe)
+            if binary is None and entry.device_and_inode is not None:
+                binary = identity_to_binary.get(entry.device_and_inode)
+            if binary is not None:
+                d.setdefault(binary, []).append(pid)
+        return d
+
+class ProcessIndex(object):
+    def __init__(self, max_age=DEFAULT_MAX_AGE):
+        self.max_age = max_age
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def snapshot(self, refresh=False):
+        with self._lock:
+            if refresh or self._snapshot is None or self._snapshot.age > self.max_age:
+                self._snapshot = take_snapshot()
+            return self._snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+    def get_binary_to_pids_dict(self, binaries, refresh=False):
+        return self.snapshot(refresh=refresh).get_binary_to_pids_dict(binaries)
+
+def pid_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError as e:
+        return e.errno == errno.EPERM
+    return True
+
+def read_ppid(pid, proc_directory=PROC_DIRECTORY):
+    try:
+        with open(os.path.join(proc_directory, str(pid), 'stat')) as f:
+            stat = f.read()
+    except (IOError, OSError):
+        return None
+    # the command name may contain spaces and parentheses
+    return int(stat[stat.rindex(')') + 2:].split()[1])
+
+def get_clock_ticks_and_page_size():
+    return (os.sysconf(os.sysconf_names['SC_CLK_TCK']),
+            os.sysconf(os.sysconf_names['SC_PAGE_SIZE']))
+
+def read_boot_time(proc_directory=PROC_DIRECTORY):
+    with open(os.path.join(proc_directory, 'stat')) as f:
+        for line in f:
+            if line.startswith('btime'):
+                return float(line.split()[1])
+    return None
+
+def read_process_metrics(pid, boot_time, clock_ticks, page_size, proc_directory=PROC_DIRECTORY):
+    pid_directory = os.path.join(proc_directory, str(pid))
+    try:
+        with open(os.path.join(pid_directory, 'stat')) as f:
+            stat = f.read()
+        fields = stat[stat.rindex(')') + 2:].split()
+        try:
+            open_fds = len(os.listdir(os.path.join(pid_directory, 'fd')))
+        except OSError:
+            open_fds = None
+    except (IOError, OSError):
+        return None
+    # field numbers from proc(5), offset by the pid and command name
+    return {
+        'pid': pid,
+        'ppid': int(fields[1]),
+        'age': time.time() - (boot_time + float(fields[19]) / clock_ticks),
+        'cpu_time': (float(fields[11]) + float(fields[12])) / clock_ticks,
+        'rss': int(fields[21]) * page_size,
+        'open_fds': open_fds,
+        'threads': int(fields[17])}
+
+def read_process_metrics_with_psutil(pid):
+    import psutil
+    try:
+        p = psutil.Process(pid)
+        cpu_times = p.cpu_times()
+        try:
+            open_fds = p.num_fds()
+        except psutil.AccessDenied:
+            open_fds = None
+        return {
+            'pid': pid,
+            'ppid': p.ppid(),
+            'age': time.time() - p.create_time(),
+            'cpu_time': cpu_times.user + cpu_times.system,
+            'rss': p.memory_info().rss,
+            'open_fds': open_fds,
+            'threads': p.num_threads()}
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return None
+
+def get_device_and_inode(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_dev, st.st_ino)
+
+def take_snapshot():
+    if os.path.isdir(PROC_DIRECTORY):
+        return ProcessSnapshot(scan_proc_directory())
+    return ProcessSnapshot(scan_with_psutil())
+
+def scan_proc_directory(proc_directory=PROC_DIRECTORY):
+    entries = {}
+    for name in os.listdir(proc_directory):
+        if not name.isdigit():
+            continue
+        pid = int(name)
+        exe_link = os.path.join(proc_directory, name, 'exe')
+        try:
+            exe = os.readlink(exe_link)
+        except OSError as e:
+            # kernel threads, vanished processes, and processes owned by other users
+            if e.errno in (errno.ENOENT, errno.EACCES, errno.EPERM, errno.ESRCH):
+                continue
+            raise
+        if exe.endswith(' (deleted)'):
+            exe = exe[:-len(' (deleted)')]
+        entries[pid] = ProcessEntry(pid, exe, get_device_and_inode(exe_link))
+    return entries
+
+def scan_with_psutil():
+    import psutil
+    def get_exe(process):
+        if psutil.version_info >= (2,0):
+            return process.exe()
+        return process.exe
+    entries = {}
+    for p in psutil.process_iter():
+        try:
+            exe = get_exe(p)
+            ppid = p.ppid() if psutil.version_info >= (2,0) else p.ppid
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+        if exe:
+            entries[p.pid] = ProcessEntry(p.pid, exe, get_device_and_inode(exe), ppid)
+    return entries
+
+default_process_index = ProcessIndex()
+
+def snapshot(refresh=False):
+    return default_process_index.snapshot(refresh=refresh)
+
+def invalidate():
+    default_process_index.invalidate()
+
+def get_binary_to_pids_dict(binaries, refresh=False):
+    return default_process_index.get_binary_to_pids_dict(binaries, refresh=refresh)
@@ -0,0 +1,156 @@
+from __future__ import print_function
+import json
+import logging
+import os
+import sys
+import time
+
+from . import paths
+
+PROFILE_MODES = ['cpu', 'memory']
+PROFILE_ENVIRONMENT_VARIABLE = 'IRODS_PYTHON_PROFILE'
+THRESHOLD_ENVIRONMENT_VARIABLE = 'IRODS_PYTHON_PROFILE_THRESHOLD'
+MEMORY_STATISTICS_LIMIT = 100
+
+def add_options(parser):
+    parser.add_option('--profile',
+                      dest='profile', type='choice', choices=PROFILE_MODES, metavar='<cpu|memory>',
+                      help='Profile this run with cProfile (cpu) or tracemalloc (memory) and '
+                           'write the results to the log directory; also set by ' + PROFILE_ENVIRONMENT_VARIABLE)
+
+    parser.add_option('--profile-threshold',
+                      dest='profile_threshold', type='float', metavar='SECONDS',
+                      help='With --profile=cpu, only record functions whose cumulative time is at least SECONDS; '
+                           'also set by ' + THRESHOLD_ENVIRONMENT_VARIABLE)
+
+def add_arguments(parser):
+    # the argparse counterpart of add_options, for the scripts that use argparse
+    parser.add_argument('--profile',
+                        dest='profile', choices=PROFILE_MODES, metavar='<cpu|memory>',
+                        help='Profile this run with cProfile (cpu) or tracemalloc (memory) and '
+                             'write the results to the log directory; also set by ' + PROFILE_ENVIRONMENT_VARIABLE)
+
+    parser.add_argument('--profile-threshold',
+                        dest='profile_threshold', type=float, metavar='SECONDS',
+                        help='With --profile=cpu, only record functions whose cumulative time is at least SECONDS; '
+                             'also set by ' + THRESHOLD_ENVIRONMENT_VARIABLE)
+
+def get_profile_settings(argv=None, environ=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if environ is None:
+        environ = os.environ
+    settings = {
+        'profile': environ.get(PROFILE_ENVIRONMENT_VARIABLE) or None,
+        'profile_threshold': environ.get(THRESHOLD_ENVIRONMENT_VARIABLE) or None}
+    # the entry points parse their options inside main(), which is what is being profiled
+    args = iter(argv)
+    for arg in args:
+        if arg == '--':
+            break
+        for option in ['--profile', '--profile-threshold']:
+            if arg == option:
+                settings[option[2:].replace('-', '_')] = next(args, None)
+            elif arg.startswith(option + '='):
+                settings[option[2:].replace('-', '_')] = arg.partition('=')[2]
+    if settings['profile'] not in PROFILE_MODES:
+        if settings['profile'] is not None:
+            logging.getLogger(__name__).warning('Unknown profile mode %s, profiling disabled.', settings['profile'])
+        settings['profile'] = None
+    try:
+        settings['profile_threshold'] = float(settings['profile_threshold']) if settings['profile_threshold'] is not None else None
+    except ValueError:
+        settings['profile_threshold'] = None
+    return settings
+
+def get_output_path_prefix(name, mode):
+    directory = paths.log_directory()
+    if not os.access(directory, os.W_OK):
+        import tempfile
+        directory = tempfile.gettempdir()
+    return os.path.join(directory, 'profile_{0}_{1}_{2}_{3}'.format(
+        name, mode, time.strftime('%Y%m%dT%H%M%SZ', time.gmtime()), os.getpid()))
+
+def filter_stats(stats, threshold):
+    # pstats keeps one (primitive calls, calls, total time, cumulative time, callers) tuple per function
+    stats.stats = dict((f, s) for f, s in stats.stats.items() if s[3] >= threshold)
+    return stats
+
+def get_stats_summary(stats):
+    rows = []
+    for (filename, lineno, function), (primitive_calls, calls, total_time, cumulative_time, _) in stats.stats.items():
+        rows.append({
+            'function': function,
+            'filename': filename,
+            'lineno': lineno,
+            'calls': calls,
+            'primitive_calls': primitive_calls,
+            'total_time': total_time,
+            'cumulative_time': cumulative_time})
+    return sorted(rows, key=lambda r: r['cumulative_time'], reverse=True)
+
+def write_json(path, d):
+    with open(path, 'wt') as f:
+        json.dump(d, f, indent=4, sort_keys=True)
+
+def run_with_cpu_profile(main, args, kwargs, name, threshold=None):
+    import cProfile
+    import pstats
+    profile = cProfile.Profile()
+    start_time = time.time()
+    try:
+        return profile.runcall(main, *args, **kwargs)
+    finally:
+        duration = time.time() - start_time
+        prefix = get_output_path_prefix(name, 'cpu')
+        stats = pstats.Stats(profile)
+        if threshold is not None:
+            filter_stats(stats, threshold)
+        stats.dump_stats(prefix + '.prof')
+        write_json(prefix + '.json', {
+            'name': name,
+            'mode': 'cpu',
+            'argv': sys.argv,
+            'duration': duration,
+            'threshold': threshold,
+            'functions': get_stats_summary(stats)})
+        logging.getLogger(__name__).info('Wrote cpu profile to %s.prof', prefix)
+
+def run_with_memory_profile(main, args, kwargs, name):
+    try:
+        import tracemalloc
+    except ImportError:
+        logging.getLogger(__name__).warning('tracemalloc requires Python 3.4 or later, memory profiling disabled.')
+        return main(*args, **kwargs)
+    tracemalloc.start(25)
+    start_time = time.time()
+    try:
+        return main(*args, **kwargs)
+    finally:
+        duration = time.time() - start_time
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        prefix = get_output_path_prefix(name, 'memory')
+        snapshot.dump(prefix + '.tracemalloc')
+        write_json(prefix + '.json', {
+            'name': name,
+            'mode': 'memory',
+            'argv': sys.argv,
+            'duration': duration,
+            'current_size': current,
+            'peak_size': peak,
+            'allocations': [{
+                    'size': s.size,
+                    'count': s.count,
+                    'traceback': [str(frame) for frame in s.traceback]}
+                for s in snapshot.statistics('traceback')[:MEMORY_STATISTICS_LIMIT]]})
+        logging.getLogger(__name__).info('Wrote memory profile to %s.json', prefix)
+
+def profile_main(main, name, *args, **kwargs):
+    settings = get_profile_settings()
+    if settings['profile'] == 'cpu':
+        return run_with_cpu_profile(main, args, kwargs, name, settings['profile_threshold'])
+    if settings['profile'] == 'memory':
+        return run_with_memory_profile(main, args, kwargs, name)
+    return main(*args, **kwargs)
@@ -27,12 +27,18 @@ paramstyle = 'qmark'
 threadsafety = 1
 version = '1.3.3'
 lowercase=True
+# rows fetched per round trip by block cursors when cursor.arraysize is left at 1,
+# and the most memory the column arrays of one cursor may take
+block_fetch_size = 256
+block_fetch_buffer_limit = 16 * 1024 * 1024
+# parameter tuples sent per round trip by executemany
+param_array_size = 1000
 
 DEBUG = 0
 # Comment out all "if DEBUG:" statements like below for production
 #if DEBUG:print 'DEBUGGING'
 
-import sys, os, datetime, ctypes, threading
+import sys, os, datetime, ctypes, threading, collections
 from decimal import Decimal
 
 
@@ -111,6 +117,14 @@ SQL_RESET_PARAMS = 3
 SQL_UNBIND = 2
 SQL_CLOSE = 0
 
+SQL_ATTR_ROW_BIND_TYPE = 5; SQL_BIND_BY_COLUMN = 0
+SQL_ATTR_ROW_STATUS_PTR = 25; SQL_ATTR_ROWS_FETCHED_PTR = 26; SQL_ATTR_ROW_ARRAY_SIZE = 27
+SQL_ROW_SUCCESS = 0; SQL_ROW_NOROW = 3; SQL_ROW_ERROR = 5; SQL_ROW_SUCCESS_WITH_INFO = 6
+SQL_ATTR_PARAM_BIND_TYPE = 18; SQL_PARAM_BIND_BY_COLUMN = 0
+SQL_ATTR_PARAM_STATUS_PTR = 20; SQL_ATTR_PARAMS_PROCESSED_PTR = 21; SQL_ATTR_PARAMSET_SIZE = 22
+SQL_PARAM_SUCCESS = 0; SQL_PARAM_DIAG_UNAVAILABLE = 1; SQL_PARAM_ERROR = 5
+SQL_PARAM_SUCCESS_WITH_INFO = 6; SQL_PARAM_UNUSED = 7
+
 
 
 
@@ -1146,6 +1160,104 @@ def get_type(v):
     return type(v)
 
 
+# Parameters of these types can share one array buffer per column in executemany.
+# Strings and binaries of different lengths are widened to the longest,
+# integers to big integers, and NULLs fit any type.
+def merge_param_type(a, b):
+    if a[0] == 'N':
+        return b
+    if b[0] == 'N' or a == b:
+        return a
+    for short_type, long_type in (('s','S'), ('u','U'), ('BN','bi')):
+        if a[0] in (short_type, long_type) and b[0] in (short_type, long_type):
+            if long_type not in (a[0], b[0]):
+                return a
+            return (long_type, max(t[1] for t in (a, b) if t[0] == long_type))
+    if set((a[0], b[0])) == set(('i','l')):
+        return ('l',)
+    return None
+
+def merge_param_types(a, b):
+    if len(a) != len(b) or not all(isinstance(t, tuple) for t in a + b):
+        return None
+    merged = [merge_param_type(x, y) for x, y in zip(a, b)]
+    if None in merged:
+        return None
+    return merged
+
+
+# A statement handle left prepared for one query, together with the
+# parameter buffers last bound to it, so that running the query again
+# needs neither SQLPrepare nor SQLBindParameter.
+class PreparedStatement:
+    def __init__(self, stmt_h, statement, param_sql_type_list, last_param_types, param_buffer_list):
+        self.stmt_h = stmt_h
+        self.statement = statement
+        self.param_sql_type_list = param_sql_type_list
+        self.last_param_types = last_param_types
+        self.param_buffer_list = param_buffer_list
+
+    def free(self):
+        ODBC_API.SQLFreeHandle(SQL_HANDLE_STMT, self.stmt_h)
+
+
+# Least recently used prepared statements of one connection, keyed by their SQL text.
+# A cursor takes a statement out of the cache while it uses it and puts it back
+# when it moves on to another query or is closed. Queries without parameters are
+# executed directly the first time, and only prepared when they are run again.
+class StatementCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._statements = collections.OrderedDict()
+        self._executed_directly = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def checkout(self, statement):
+        prepared = self._statements.pop(statement, None)
+        if prepared is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return prepared
+
+    def checkin(self, prepared):
+        previous = self._statements.pop(prepared.statement, None)
+        if previous is not None:
+            # another cursor prepared the same query in the meantime
+            previous.free()
+        self._statements[prepared.statement] = prepared
+        self.resize(self.maxsize)
+
+    def repeated(self, statement):
+        if self._executed_directly.pop(statement, None) is not None:
+            return True
+        self._executed_directly[statement] = True
+        while len(self._executed_directly) > max(self.maxsize, 0):
+            self._executed_directly.popitem(last=False)
+        return False
+
+    def resize(self, maxsize):
+        self.maxsize = maxsize
+        while len(self._statements) > max(maxsize, 0):
+            self._statements.popitem(last=False)[1].free()
+            self.evictions += 1
+
+    def clear(self):
+        for prepared in self._statements.values():
+            prepared.free()
+        self._statements.clear()
+        self._executed_directly.clear()
+
+    def info(self):
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'maxsize': self.maxsize,
+                'currsize': len(self._statements)}
+
+
 # The Cursor Class.
 class Cursor:
     def __init__(self, conx, row_type_callable=None):
@@ -1169,15 +1281,67 @@ class Cursor:
         self._outputsize = {}
         self._inputsizers = []
         self.arraysize = 1
+        self.param_status = []
+        self.block_fetch = True
+        self._fetch_mode = None
+        self._BlockBufferList = []
+        self._block_row_status = None
+        self._block_rows_fetched = ctypes.c_size_t()
+        self._rowset = []
+        self._rowset_index = 0
+        self.timeout = conx.timeout
+        self._alloc_stmt()
+        
+        self._PARAM_SQL_TYPE_LIST = []
+        self.closed = False      
+
+    def _alloc_stmt(self):
+        self.stmt_h = ctypes.c_void_p()
         ret = ODBC_API.SQLAllocHandle(SQL_HANDLE_STMT, self.connection.dbc_h, ADDR(self.stmt_h))
         check_success(self, ret)
-    
-        self.timeout = conx.timeout
         if self.timeout != 0:
             self.set_timeout(self.timeout)
-        
+
+    def _checkin_statement(self):
+        """Hand the prepared statement handle to the connection's statement cache"""
+        self._reset_block_fetch()
+        for free_type in (SQL_CLOSE, SQL_UNBIND):
+            ret = ODBC_API.SQLFreeStmt(self.stmt_h, free_type)
+            check_success(self, ret)
+        self.connection.statement_cache.checkin(PreparedStatement(
+            self.stmt_h, self.statement, self._PARAM_SQL_TYPE_LIST, self._last_param_types, self._ParamBufferList))
+        self.statement = None
+        self._last_param_types = None
+        self._ParamBufferList = []
         self._PARAM_SQL_TYPE_LIST = []
-        self.closed = False      
+
+    def _release_statement(self):
+        """Keep the statement prepared on this cursor's handle for later, and continue on a new handle"""
+        if self.statement is not None and self.connection.statement_cache.maxsize > 0:
+            self._checkin_statement()
+            self._alloc_stmt()
+
+    def _use_prepared_statement(self, query_string):
+        """Switch to a handle already prepared with query_string, returning False if it must be prepared"""
+        cache = self.connection.statement_cache
+        if cache.maxsize <= 0:
+            return False
+        prepared = cache.checkout(query_string)
+        if prepared is None:
+            self._release_statement()
+            return False
+        if self.statement is not None:
+            self._checkin_statement()
+        else:
+            self._reset_block_fetch()
+            ret = ODBC_API.SQLFreeHandle(SQL_HANDLE_STMT, self.stmt_h)
+            check_success(self, ret)
+        self.stmt_h = prepared.stmt_h
+        self.statement = prepared.statement
+        self._PARAM_SQL_TYPE_LIST = prepared.param_sql_type_list
+        self._last_param_types = prepared.last_param_types
+        self._ParamBufferList = prepared.param_buffer_list
+        return True
 
     def set_timeout(self, timeout):
         self.timeout = timeout
@@ -1243,6 +1407,157 @@ class Cursor:
         self.statement = query_string
 
 
+    def _CreateParamBuffer(self, col_num, param_type):
+        """Choose the C type, SQL type, size and value buffer for a parameter of param_type"""
+        dec_num = 0            
+        buf_size = 512
+            
+        if param_type[0] == 'u':
+            sql_c_type = SQL_C_WCHAR
+            sql_type = SQL_WVARCHAR 
+            buf_size = 255                 
+            ParameterBuffer = create_buffer_u(buf_size)                
+                
+        elif param_type[0] == 's':
+            sql_c_type = SQL_C_CHAR
+            sql_type = SQL_VARCHAR
+            buf_size = 255                 
+            ParameterBuffer = create_buffer(buf_size)
+
+
+        elif param_type[0] == 'U':
+            sql_c_type = SQL_C_WCHAR
+            sql_type = SQL_WLONGVARCHAR
+            buf_size = param_type[1]#len(self._inputsizers)>col_num and self._inputsizers[col_num] or 20500
+            ParameterBuffer = create_buffer_u(buf_size)
+
+        elif param_type[0] == 'S':
+            sql_c_type = SQL_C_CHAR
+            sql_type = SQL_LONGVARCHAR
+            buf_size = param_type[1]#len(self._inputsizers)>col_num and self._inputsizers[col_num] or 20500
+            ParameterBuffer = create_buffer(buf_size)
+        
+        # bool subclasses int, thus has to go first
+        elif param_type[0] == 'b':
+            sql_c_type = SQL_C_CHAR
+            sql_type = SQL_BIT
+            buf_size = SQL_data_type_dict[sql_type][4]
+            ParameterBuffer = create_buffer(buf_size)
+            
+        elif param_type[0] == 'i':
+            sql_c_type = SQL_C_CHAR            
+            sql_type = SQL_INTEGER    
+            buf_size = SQL_data_type_dict[sql_type][4]             
+            ParameterBuffer = create_buffer(buf_size)           
+            
+        elif param_type[0] == 'l':
+            sql_c_type = SQL_C_CHAR           
+            sql_type = SQL_BIGINT         
+            buf_size = SQL_data_type_dict[sql_type][4]         
+            ParameterBuffer = create_buffer(buf_size)
+        
+
+        elif param_type[0] == 'D': #Decimal
+            sql_c_type = SQL_C_CHAR
+            sql_type = SQL_NUMERIC
+            digit_num, dec_num = param_type[1]
+            if dec_num > 0:
+                # has decimal
+                buf_size = digit_num 
+                dec_num = dec_num
+            else:
+                # no decimal
+                buf_size = digit_num - dec_num 
+                dec_num = 0
+
+            ParameterBuffer = create_buffer(buf_size + 4)# add extra length for sign and dot
+
+            
+        elif param_type[0] == 'f':
+            sql_c_type = SQL_C_CHAR
+            sql_type = SQL_DOUBLE                
+            buf_size = SQL_data_type_dict[sql_type][4]
+            ParameterBuffer = create_buffer(buf_size)
+            
+            
+        # datetime subclasses date, thus has to go first
+        elif param_type[0] == 'dt':
+            sql_c_type = SQL_C_CHAR
+            sql_type = SQL_TYPE_TIMESTAMP
+            buf_size = self.connection.type_size_dic[SQL_TYPE_TIMESTAMP][0]                
+            ParameterBuffer = create_buffer(buf_size)
+            dec_num = self.connection.type_size_dic[SQL_TYPE_TIMESTAMP][1]
+            
+            
+        elif param_type[0] == 'd':
+            sql_c_type = SQL_C_CHAR
+            if SQL_TYPE_DATE in self.connection.type_size_dic:
+                #if DEBUG:print('conx.type_size_dic.has_key(SQL_TYPE_DATE)')
+                sql_type = SQL_TYPE_DATE
+                buf_size = self.connection.type_size_dic[SQL_TYPE_DATE][0]
+                
+                ParameterBuffer = create_buffer(buf_size)
+                dec_num = self.connection.type_size_dic[SQL_TYPE_DATE][1]
+                
+            else:
+                # SQL Sever <2008 doesn't have a DATE type.
+                sql_type = SQL_TYPE_TIMESTAMP 
+                buf_size = 10                    
+                ParameterBuffer = create_buffer(buf_size)
+                
+
+        elif param_type[0] == 't':
+            sql_c_type = SQL_C_CHAR
+            if SQL_TYPE_TIME in self.connection.type_size_dic:
+                sql_type = SQL_TYPE_TIME
+                buf_size = self.connection.type_size_dic[SQL_TYPE_TIME][0]                    
+                ParameterBuffer = create_buffer(buf_size)
+                dec_num = self.connection.type_size_dic[SQL_TYPE_TIME][1]                   
+            elif SQL_SS_TIME2 in self.connection.type_size_dic:
+                # TIME type added in SQL Server 2008
+                sql_type = SQL_SS_TIME2
+                buf_size = self.connection.type_size_dic[SQL_SS_TIME2][0]
+                ParameterBuffer = create_buffer(buf_size)
+                dec_num = self.connection.type_size_dic[SQL_SS_TIME2][1]
+            else:
+                # SQL Sever <2008 doesn't have a TIME type.
+                sql_type = SQL_TYPE_TIMESTAMP
+                buf_size = self.connection.type_size_dic[SQL_TYPE_TIMESTAMP][0]                    
+                ParameterBuffer = create_buffer(buf_size)
+                dec_num = 3
+                
+        elif param_type[0] == 'BN':
+            sql_c_type = SQL_C_BINARY
+            sql_type = SQL_VARBINARY 
+            buf_size = 1                 
+            ParameterBuffer = create_buffer(buf_size)                
+        
+        elif param_type[0] == 'N':
+            if len(self._PARAM_SQL_TYPE_LIST) > 0:
+                sql_c_type = SQL_C_DEFAULT
+                sql_type = self._PARAM_SQL_TYPE_LIST[col_num][0]
+                buf_size = 1
+                ParameterBuffer = create_buffer(buf_size)
+            else:
+                sql_c_type = SQL_C_CHAR
+                sql_type = SQL_CHAR
+                buf_size = 1                 
+                ParameterBuffer = create_buffer(buf_size) 
+        elif param_type[0] == 'bi':
+            sql_c_type = SQL_C_BINARY
+            sql_type = SQL_LONGVARBINARY 
+            buf_size = param_type[1]#len(self._inputsizers)>col_num and self._inputsizers[col_num] or 20500                
+            ParameterBuffer = create_buffer(buf_size)
+        
+            
+        else:
+            sql_c_type = SQL_C_CHAR
+            sql_type = SQL_LONGVARCHAR
+            buf_size = len(self._inputsizers)>col_num and self._inputsizers[col_num] or 20500                
+            ParameterBuffer = create_buffer(buf_size)
+            
+        return sql_c_type, sql_type, buf_size, dec_num, ParameterBuffer
+
     def _BindParams(self, param_types, pram_io_list = []):
         """Create parameter buffers based on param types, and bind them to the statement"""
         # Clear the old Parameters
@@ -1269,154 +1584,7 @@ class Cursor:
         # calling SQLBindParam.
         temp_holder = []
         for col_num in range(NumParams.value):
-            dec_num = 0            
-            buf_size = 512
-                
-            if param_types[col_num][0] == 'u':
-                sql_c_type = SQL_C_WCHAR
-                sql_type = SQL_WVARCHAR 
-                buf_size = 255                 
-                ParameterBuffer = create_buffer_u(buf_size)                
-                    
-            elif param_types[col_num][0] == 's':
-                sql_c_type = SQL_C_CHAR
-                sql_type = SQL_VARCHAR
-                buf_size = 255                 
-                ParameterBuffer = create_buffer(buf_size)
-
-
-            elif param_types[col_num][0] == 'U':
-                sql_c_type = SQL_C_WCHAR
-                sql_type = SQL_WLONGVARCHAR
-                buf_size = param_types[col_num][1]#len(self._inputsizers)>col_num and self._inputsizers[col_num] or 20500
-                ParameterBuffer = create_buffer_u(buf_size)
-
-            elif param_types[col_num][0] == 'S':
-                sql_c_type = SQL_C_CHAR
-                sql_type = SQL_LONGVARCHAR
-                buf_size = param_types[col_num][1]#len(self._inputsizers)>col_num and self._inputsizers[col_num] or 20500
-                ParameterBuffer = create_buffer(buf_size)
-            
-            # bool subclasses int, thus has to go first
-            elif param_types[col_num][0] == 'b':
-                sql_c_type = SQL_C_CHAR
-                sql_type = SQL_BIT
-                buf_size = SQL_data_type_dict[sql_type][4]
-                ParameterBuffer = create_buffer(buf_size)
-                
-            elif param_types[col_num][0] == 'i':
-                sql_c_type = SQL_C_CHAR            
-                sql_type = SQL_INTEGER    
-                buf_size = SQL_data_type_dict[sql_type][4]             
-                ParameterBuffer = create_buffer(buf_size)           
-                
-            elif param_types[col_num][0] == 'l':
-                sql_c_type = SQL_C_CHAR           
-                sql_type = SQL_BIGINT         
-                buf_size = SQL_data_type_dict[sql_type][4]         
-                ParameterBuffer = create_buffer(buf_size)
-            
-
-            elif param_types[col_num][0] == 'D': #Decimal
-                sql_c_type = SQL_C_CHAR
-                sql_type = SQL_NUMERIC
-                digit_num, dec_num = param_types[col_num][1]
-                if dec_num > 0:
-                    # has decimal
-                    buf_size = digit_num 
-                    dec_num = dec_num
-                else:
-                    # no decimal
-                    buf_size = digit_num - dec_num 
-                    dec_num = 0
-
-                ParameterBuffer = create_buffer(buf_size + 4)# add extra length for sign and dot
-
-                
-            elif param_types[col_num][0] == 'f':
-                sql_c_type = SQL_C_CHAR
-                sql_type = SQL_DOUBLE                
-                buf_size = SQL_data_type_dict[sql_type][4]
-                ParameterBuffer = create_buffer(buf_size)
-                
-                
-            # datetime subclasses date, thus has to go first
-            elif param_types[col_num][0] == 'dt':
-                sql_c_type = SQL_C_CHAR
-                sql_type = SQL_TYPE_TIMESTAMP
-                buf_size = self.connection.type_size_dic[SQL_TYPE_TIMESTAMP][0]                
-                ParameterBuffer = create_buffer(buf_size)
-                dec_num = self.connection.type_size_dic[SQL_TYPE_TIMESTAMP][1]
-                
-                
-            elif param_types[col_num][0] == 'd':
-                sql_c_type = SQL_C_CHAR
-                if SQL_TYPE_DATE in self.connection.type_size_dic:
-                    #if DEBUG:print('conx.type_size_dic.has_key(SQL_TYPE_DATE)')
-                    sql_type = SQL_TYPE_DATE
-                    buf_size = self.connection.type_size_dic[SQL_TYPE_DATE][0]
-                    
-                    ParameterBuffer = create_buffer(buf_size)
-                    dec_num = self.connection.type_size_dic[SQL_TYPE_DATE][1]
-                    
-                else:
-                    # SQL Sever <2008 doesn't have a DATE type.
-                    sql_type = SQL_TYPE_TIMESTAMP 
-                    buf_size = 10                    
-                    ParameterBuffer = create_buffer(buf_size)
-                    
-    
-            elif param_types[col_num][0] == 't':
-                sql_c_type = SQL_C_CHAR
-                if SQL_TYPE_TIME in self.connection.type_size_dic:
-                    sql_type = SQL_TYPE_TIME
-                    buf_size = self.connection.type_size_dic[SQL_TYPE_TIME][0]                    
-                    ParameterBuffer = create_buffer(buf_size)
-                    dec_num = self.connection.type_size_dic[SQL_TYPE_TIME][1]                   
-                elif SQL_SS_TIME2 in self.connection.type_size_dic:
-                    # TIME type added in SQL Server 2008
-                    sql_type = SQL_SS_TIME2
-                    buf_size = self.connection.type_size_dic[SQL_SS_TIME2][0]
-                    ParameterBuffer = create_buffer(buf_size)
-                    dec_num = self.connection.type_size_dic[SQL_SS_TIME2][1]
-                else:
-                    # SQL Sever <2008 doesn't have a TIME type.
-                    sql_type = SQL_TYPE_TIMESTAMP
-                    buf_size = self.connection.type_size_dic[SQL_TYPE_TIMESTAMP][0]                    
-                    ParameterBuffer = create_buffer(buf_size)
-                    dec_num = 3
-                    
-            elif param_types[col_num][0] == 'BN':
-                sql_c_type = SQL_C_BINARY
-                sql_type = SQL_VARBINARY 
-                buf_size = 1                 
-                ParameterBuffer = create_buffer(buf_size)                
-            
-            elif param_types[col_num][0] == 'N':
-                if len(self._PARAM_SQL_TYPE_LIST) > 0:
-                    sql_c_type = SQL_C_DEFAULT
-                    sql_type = self._PARAM_SQL_TYPE_LIST[col_num][0]
-                    buf_size = 1
-                    ParameterBuffer = create_buffer(buf_size)
-                else:
-                    sql_c_type = SQL_C_CHAR
-                    sql_type = SQL_CHAR
-                    buf_size = 1                 
-                    ParameterBuffer = create_buffer(buf_size) 
-            elif param_types[col_num][0] == 'bi':
-                sql_c_type = SQL_C_BINARY
-                sql_type = SQL_LONGVARBINARY 
-                buf_size = param_types[col_num][1]#len(self._inputsizers)>col_num and self._inputsizers[col_num] or 20500                
-                ParameterBuffer = create_buffer(buf_size)
-            
-                
-            else:
-                sql_c_type = SQL_C_CHAR
-                sql_type = SQL_LONGVARCHAR
-                buf_size = len(self._inputsizers)>col_num and self._inputsizers[col_num] or 20500                
-                ParameterBuffer = create_buffer(buf_size)
-                
-            temp_holder.append((sql_c_type, sql_type, buf_size, dec_num, ParameterBuffer))
+            temp_holder.append(self._CreateParamBuffer(col_num, param_types[col_num]))
 
         for col_num, (sql_c_type, sql_type, buf_size, dec_num, ParameterBuffer) in enumerate(temp_holder):
             BufferLen = c_ssize_t(buf_size)
@@ -1438,6 +1606,102 @@ class Cursor:
         self._ParamBufferList = ParamBufferList
 
     
+    def _EncodeParam(self, param_type, param_val):
+        """Convert a parameter value to the bytes put in its buffer, and the length to bind with it"""
+        if param_type[0] in ('N','BN'):
+            return None, SQL_NULL_DATA
+        c_char_buf, c_buf_len = '', 0
+        if param_type[0] in ('i','l','f'):
+            if py_v3:
+                c_char_buf = bytes(str(param_val),'ascii')
+            else:
+                c_char_buf = str(param_val)
+            c_buf_len = len(c_char_buf)
+            
+        elif param_type[0] in ('s','S'):
+            c_char_buf = param_val
+            c_buf_len = len(c_char_buf)
+        elif param_type[0] in ('u','U'):
+            c_char_buf = UCS_buf(param_val)
+            c_buf_len = len(c_char_buf)
+            
+        elif param_type[0] == 'dt':
+            max_len = self.connection.type_size_dic[SQL_TYPE_TIMESTAMP][0]
+            datetime_str = param_val.strftime('%Y-%m-%d %H:%M:%S.%f')
+            c_char_buf = datetime_str[:max_len]
+            if py_v3:
+                c_char_buf = bytes(c_char_buf,'ascii')
+                
+            c_buf_len = len(c_char_buf)
+            # print c_buf_len, c_char_buf
+            
+        elif param_type[0] == 'd':
+            if SQL_TYPE_DATE in self.connection.type_size_dic:
+                max_len = self.connection.type_size_dic[SQL_TYPE_DATE][0]
+            else:
+                max_len = 10
+            c_char_buf = param_val.isoformat()[:max_len]
+            if py_v3:
+                c_char_buf = bytes(c_char_buf,'ascii')
+            c_buf_len = len(c_char_buf)
+            #print c_char_buf
+            
+        elif param_type[0] == 't':
+            if SQL_TYPE_TIME in self.connection.type_size_dic:
+                max_len = self.connection.type_size_dic[SQL_TYPE_TIME][0]
+                c_char_buf = param_val.isoformat()[:max_len]
+                c_buf_len = len(c_char_buf)
+            elif SQL_SS_TIME2 in self.connection.type_size_dic:
+                max_len = self.connection.type_size_dic[SQL_SS_TIME2][0]
+                c_char_buf = param_val.isoformat()[:max_len]
+                c_buf_len = len(c_char_buf)
+            else:
+                c_buf_len = self.connection.type_size_dic[SQL_TYPE_TIMESTAMP][0]
+                time_str = param_val.isoformat()
+                if len(time_str) == 8:
+                    time_str += '.000'
+                c_char_buf = '1900-01-01 '+time_str[0:c_buf_len - 11]
+            if py_v3:
+                c_char_buf = bytes(c_char_buf,'ascii')
+            #print c_buf_len, c_char_buf
+            
+        elif param_type[0] == 'b':
+            if param_val == True:
+                c_char_buf = '1'
+            else:
+                c_char_buf = '0'
+            if py_v3:
+                c_char_buf = bytes(c_char_buf,'ascii')
+            c_buf_len = 1
+            
+        elif param_type[0] == 'D': #Decimal
+            sign = param_val.as_tuple()[0] == 0 and '+' or '-'
+            digit_string = ''.join([str(x) for x in param_val.as_tuple()[1]])
+            digit_num, dec_num = param_type[1]
+            if dec_num > 0:
+                # has decimal
+                left_part = digit_string[:digit_num - dec_num]
+                right_part = digit_string[0-dec_num:]
+            else:
+                # no decimal
+                left_part = digit_string + '0'*(0-dec_num)
+                right_part = ''
+            v = ''.join((sign, left_part,'.', right_part))
+
+            if py_v3:
+                c_char_buf = bytes(v,'ascii')
+            else:
+                c_char_buf = v
+            c_buf_len = len(c_char_buf)
+            
+        elif param_type[0] == 'bi':
+            c_char_buf = str_8b(param_val)
+            c_buf_len = len(c_char_buf)
+            
+        else:
+            c_char_buf = param_val
+        return c_char_buf, c_buf_len
+
     def execute(self, query_string, params=None, many_mode=False, call_mode=False):
         """ Execute the query string, with optional parameters.
         If parameters are provided, the query would first be prepared, then executed with parameters;
@@ -1456,7 +1720,8 @@ class Cursor:
                 
             if query_string != self.statement:
                 # if the query is not same as last query, then it is not prepared  
-                self.prepare(query_string)
+                if not self._use_prepared_statement(query_string):
+                    self.prepare(query_string)
             
     
             param_types = list(map(get_type, params))
@@ -1477,107 +1742,14 @@ class Cursor:
                 
             
             # With query prepared, now put parameters into buffers
-            col_num = 0
-            for param_buffer, param_buffer_len, sql_type in self._ParamBufferList:
-                c_char_buf, c_buf_len = '', 0
-                param_val = params[col_num]
-                if param_types[col_num][0] in ('N','BN'):
+            for col_num, (param_buffer, param_buffer_len, sql_type) in enumerate(self._ParamBufferList):
+                c_char_buf, c_buf_len = self._EncodeParam(param_types[col_num], params[col_num])
+                if c_buf_len == SQL_NULL_DATA:
                     param_buffer_len.value = SQL_NULL_DATA
-                    col_num += 1
                     continue
-                elif param_types[col_num][0] in ('i','l','f'):
-                    if py_v3:
-                        c_char_buf = bytes(str(param_val),'ascii')
-                    else:
-                        c_char_buf = str(param_val)
-                    c_buf_len = len(c_char_buf)
-                    
-                elif param_types[col_num][0] in ('s','S'):
-                    c_char_buf = param_val
-                    c_buf_len = len(c_char_buf)
-                elif param_types[col_num][0] in ('u','U'):
-                    c_char_buf = UCS_buf(param_val)
-                    c_buf_len = len(c_char_buf)
-                    
-                elif param_types[col_num][0] == 'dt':
-                    max_len = self.connection.type_size_dic[SQL_TYPE_TIMESTAMP][0]
-                    datetime_str = param_val.strftime('%Y-%m-%d %H:%M:%S.%f')
-                    c_char_buf = datetime_str[:max_len]
-                    if py_v3:
-                        c_char_buf = bytes(c_char_buf,'ascii')
-                        
-                    c_buf_len = len(c_char_buf)
-                    # print c_buf_len, c_char_buf
-                    
-                elif param_types[col_num][0] == 'd':
-                    if SQL_TYPE_DATE in self.connection.type_size_dic:
-                        max_len = self.connection.type_size_dic[SQL_TYPE_DATE][0]
-                    else:
-                        max_len = 10
-                    c_char_buf = param_val.isoformat()[:max_len]
-                    if py_v3:
-                        c_char_buf = bytes(c_char_buf,'ascii')
-                    c_buf_len = len(c_char_buf)
-                    #print c_char_buf
-                    
-                elif param_types[col_num][0] == 't':
-                    if SQL_TYPE_TIME in self.connection.type_size_dic:
-                        max_len = self.connection.type_size_dic[SQL_TYPE_TIME][0]
-                        c_char_buf = param_val.isoformat()[:max_len]
-                        c_buf_len = len(c_char_buf)
-                    elif SQL_SS_TIME2 in self.connection.type_size_dic:
-                        max_len = self.connection.type_size_dic[SQL_SS_TIME2][0]
-                        c_char_buf = param_val.isoformat()[:max_len]
-                        c_buf_len = len(c_char_buf)
-                    else:
-                        c_buf_len = self.connection.type_size_dic[SQL_TYPE_TIMESTAMP][0]
-                        time_str = param_val.isoformat()
-                        if len(time_str) == 8:
-                            time_str += '.000'
-                        c_char_buf = '1900-01-01 '+time_str[0:c_buf_len - 11]
-                    if py_v3:
-                        c_char_buf = bytes(c_char_buf,'ascii')
-                    #print c_buf_len, c_char_buf
-                    
-                elif param_types[col_num][0] == 'b':
-                    if param_val == True:
-                        c_char_buf = '1'
-                    else:
-                        c_char_buf = '0'
-                    if py_v3:
-                        c_char_buf = bytes(c_char_buf,'ascii')
-                    c_buf_len = 1
-                    
-                elif param_types[col_num][0] == 'D': #Decimal
-                    sign = param_val.as_tuple()[0] == 0 and '+' or '-'
-                    digit_string = ''.join([str(x) for x in param_val.as_tuple()[1]])
-                    digit_num, dec_num = param_types[col_num][1]
-                    if dec_num > 0:
-                        # has decimal
-                        left_part = digit_string[:digit_num - dec_num]
-                        right_part = digit_string[0-dec_num:]
-                    else:
-                        # no decimal
-                        left_part = digit_string + '0'*(0-dec_num)
-                        right_part = ''
-                    v = ''.join((sign, left_part,'.', right_part))
-
-                    if py_v3:
-                        c_char_buf = bytes(v,'ascii')
-                    else:
-                        c_char_buf = v
-                    c_buf_len = len(c_char_buf)
-                    
-                elif param_types[col_num][0] == 'bi':
-                    c_char_buf = str_8b(param_val)
-                    c_buf_len = len(c_char_buf)
-                    
-                else:
-                    c_char_buf = param_val
-            
     
                 if param_types[col_num][0] == 'bi':
-                    param_buffer.raw = str_8b(param_val)
+                    param_buffer.raw = c_char_buf
                     
                 else:
                     #print (type(param_val),param_buffer, param_buffer.value)
@@ -1589,7 +1761,6 @@ class Cursor:
                 else:
                     param_buffer_len.value = c_buf_len
     
-                col_num += 1
             ret = SQLExecute(self.stmt_h)
             if ret != SQL_SUCCESS:
                 #print param_valparam_buffer, param_buffer.value
@@ -1604,11 +1775,33 @@ class Cursor:
                     self._NoData()
                 #self._BindCols()
             
+        elif self._prepare_without_params(query_string):
+            ret = SQLExecute(self.stmt_h)
+            if ret != SQL_SUCCESS:
+                check_success(self, ret)
+            if ret != SQL_NO_DATA:
+                self._NumOfRows()
+                self._UpdateDesc()
+            else:
+                self._NoData()
         else:
             self.execdirect(query_string)
         return self
     
     
+    def _prepare_without_params(self, query_string):
+        """Decide whether a query without parameters runs as a prepared statement,
+        which it does once it is cached or is being run for the second time"""
+        cache = self.connection.statement_cache
+        if cache.maxsize <= 0:
+            return False
+        if query_string != self.statement and not self._use_prepared_statement(query_string):
+            if not cache.repeated(query_string):
+                return False
+            self.prepare(query_string)
+        # parameters bound for an earlier execute() must not be reused silently
+        return not self._ParamBufferList
+
     def _SQLExecute(self):
         if not self.connection:
             self.close()
@@ -1669,20 +1862,151 @@ class Cursor:
 
                 
     
+    def _reset_param_array(self):
+        for attribute, value in ((SQL_ATTR_PARAMSET_SIZE, 1), (SQL_ATTR_PARAM_STATUS_PTR, None), (SQL_ATTR_PARAMS_PROCESSED_PTR, None)):
+            ret = ODBC_API.SQLSetStmtAttr(self.stmt_h, attribute, ctypes.c_void_p(value), 0)
+            check_success(self, ret)
+        # the next execute() binds its own buffers again
+        self._free_stmt(SQL_RESET_PARAMS)
+        self._last_param_types = None
+
+    def _execute_each(self, query_string, batch):
+        rowcount = 0
+        for params, param_types in batch:
+            try:
+                self.execute(query_string, params, many_mode = True)
+            except Error:
+                self.param_status.append(SQL_PARAM_ERROR)
+                raise
+            self.param_status.append(SQL_PARAM_SUCCESS)
+            rows = self._NumOfRows()
+            rowcount = -1 if rows < 0 or rowcount < 0 else rowcount + rows
+        return rowcount
+
+    def _execute_param_array(self, query_string, batch, merged_types):
+        """Bind every parameter to a column-wise array holding the values of all the tuples in batch,
+        and execute the statement once for the whole batch"""
+        if len(batch) < 2 or any(not isinstance(t, tuple) for t in merged_types):
+            return self._execute_each(query_string, batch)
+        if create_buffer_u is not create_buffer and any(t[0] in ('u','U') for t in merged_types):
+            return self._execute_each(query_string, batch)
+
+        if query_string != self.statement:
+            if not self._use_prepared_statement(query_string):
+                self.prepare(query_string)
+        self._free_stmt(SQL_CLOSE)
+        self._free_stmt(SQL_RESET_PARAMS)
+        self._last_param_types = None
+
+        NumParams = c_short()
+        ret = ODBC_API.SQLNumParams(self.stmt_h, ADDR(NumParams))
+        if ret != SQL_SUCCESS:
+            check_success(self, ret)
+        if len(merged_types) != NumParams.value:
+            error_desc = "The SQL contains %d parameter markers, but %d parameters were supplied" \
+                        %(NumParams.value,len(merged_types))
+            raise ProgrammingError('HY000',error_desc)
+
+        n = len(batch)
+        ParamArrayList = []
+        for col_num, merged_type in enumerate(merged_types):
+            sql_c_type, sql_type, buf_size, dec_num, ParameterBuffer = self._CreateParamBuffer(col_num, merged_type)
+            values = [self._EncodeParam(param_types[col_num], params[col_num]) for params, param_types in batch]
+            # room for the longest value and its terminator
+            terminator_len = ucs_length if sql_c_type == SQL_C_WCHAR else 1
+            element_len = max([ctypes.sizeof(ParameterBuffer)] +
+                              [len(c_char_buf) + terminator_len for c_char_buf, c_buf_len in values if c_buf_len != SQL_NULL_DATA])
+            ParameterArray = create_buffer(element_len * n)
+            LenOrIndArray = (c_ssize_t * n)()
+            address = ctypes.addressof(ParameterArray)
+            for i, (c_char_buf, c_buf_len) in enumerate(values):
+                if c_buf_len == SQL_NULL_DATA:
+                    LenOrIndArray[i] = SQL_NULL_DATA
+                    continue
+                ctypes.memmove(address + i * element_len, c_char_buf, len(c_char_buf))
+                if batch[i][1][col_num][0] in ('U','u','S','s'):
+                    LenOrIndArray[i] = len(c_char_buf)
+                else:
+                    LenOrIndArray[i] = c_buf_len
+            ret = SQLBindParameter(self.stmt_h, col_num + 1, SQL_PARAM_INPUT, sql_c_type, sql_type, buf_size,\
+                    dec_num, ADDR(ParameterArray), c_ssize_t(element_len), LenOrIndArray)
+            if ret != SQL_SUCCESS:
+                check_success(self, ret)
+            # the arrays must stay alive until the statement has executed
+            ParamArrayList.append((ParameterArray, LenOrIndArray))
+
+        ParamStatusArray = (ctypes.c_ushort * n)()
+        ParamsProcessed = ctypes.c_size_t()
+        for attribute, value in ((SQL_ATTR_PARAM_BIND_TYPE, ctypes.c_void_p(SQL_PARAM_BIND_BY_COLUMN)),
+                                 (SQL_ATTR_PARAMSET_SIZE, ctypes.c_void_p(n)),
+                                 (SQL_ATTR_PARAM_STATUS_PTR, ADDR(ParamStatusArray)),
+                                 (SQL_ATTR_PARAMS_PROCESSED_PTR, ADDR(ParamsProcessed))):
+            ret = ODBC_API.SQLSetStmtAttr(self.stmt_h, attribute, value, 0)
+            if ret not in (SQL_SUCCESS, SQL_SUCCESS_WITH_INFO):
+                # the driver does not support parameter arrays
+                self._reset_param_array()
+                return self._execute_each(query_string, batch)
+
+        try:
+            ret = SQLExecute(self.stmt_h)
+            self.param_status.extend(ParamStatusArray[i] if i < ParamsProcessed.value else SQL_PARAM_UNUSED for i in range(n))
+            if ret != SQL_SUCCESS:
+                check_success(self, ret)
+            if SQL_PARAM_ERROR in self.param_status[-n:]:
+                # some drivers report failed rows only through the status array
+                ctrl_err(SQL_HANDLE_STMT, self.stmt_h, SQL_ERROR, self.ansi)
+            rowcount = 0
+            if ret != SQL_NO_DATA:
+                rowcount = self._NumOfRows()
+        finally:
+            self._reset_param_array()
+        return rowcount
+
     def executemany(self, query_string, params_list = [None]):
+        """Execute the query once for each parameter tuple in params_list.
+        Consecutive tuples whose types can share buffers are sent as parameter arrays,
+        up to param_array_size tuples per round trip. Afterwards param_status holds
+        a SQL_PARAM_* status for each tuple, and rowcount the total affected rows."""
         if not self.connection:
             self.close()
             
+        self.param_status = []
+        rowcount = 0
+        executed = False
+        batch = []
+        merged_types = None
+        def flush(rowcount):
+            rows = self._execute_param_array(query_string, batch, merged_types)
+            return -1 if rows < 0 or rowcount < 0 else rowcount + rows
+
         for params in params_list:
-            self.execute(query_string, params, many_mode = True)
-        if ret != SQL_NO_DATA:
+            executed = True
+            if not params:
+                # no parameters to bind, executed directly
+                if batch:
+                    rowcount = flush(rowcount)
+                    batch, merged_types = [], None
+                rows = self._execute_each(query_string, [(params, None)])
+                rowcount = -1 if rows < 0 or rowcount < 0 else rowcount + rows
+                continue
+            if not isinstance(params, (tuple, list)):
+                raise TypeError("Params must be in a list, tuple, or Row")
+            param_types = list(map(get_type, params))
+            merged = merge_param_types(merged_types, param_types) if batch else param_types
+            if merged is None or len(batch) >= param_array_size:
+                rowcount = flush(rowcount)
+                batch, merged = [], param_types
+            batch.append((params, param_types))
+            merged_types = merged
+        if batch:
+            rowcount = flush(rowcount)
+
+        if executed and self._NumOfCols() > 0:
             self._NumOfRows()
-            self.rowcount = -1
             self._UpdateDesc()
-        else:
+        elif executed:
             self._NoData()
-            self.rowcount = -1
-        #self._BindCols()
+        self.rowcount = rowcount if executed else -1
         
     
 
@@ -1690,6 +2014,7 @@ class Cursor:
         if not self.connection:
             self.close()
         self._free_stmt(SQL_UNBIND)
+        self._reset_block_fetch()
         NOC = self._NumOfCols()
         self._ColBufferList = []
         bind_data = True
@@ -1826,12 +2151,131 @@ class Cursor:
         self._ColTypeCodeList = []
         self.description = []
         self._free_stmt(SQL_UNBIND)
+        self._reset_block_fetch()
         self._ColBufferList = []
 
+    def _reset_block_fetch(self):
+        if self._fetch_mode == 'block':
+            for attribute, value in ((SQL_ATTR_ROW_ARRAY_SIZE, 1), (SQL_ATTR_ROW_STATUS_PTR, None), (SQL_ATTR_ROWS_FETCHED_PTR, None)):
+                ret = ODBC_API.SQLSetStmtAttr(self.stmt_h, attribute, ctypes.c_void_p(value), 0)
+                check_success(self, ret)
+        self._fetch_mode = None
+        self._BlockBufferList = []
+        self._block_row_status = None
+        self._rowset = []
+        self._rowset_index = 0
+
+    def _BindBlockCols(self):
+        """Bind an array of block_size values to every column, so that each SQLFetchScroll
+        fills a whole rowset. Returns False where a column can only be read with SQLGetData."""
+        if not self.block_fetch or not self._ColBufferList:
+            return False
+        columns = []
+        row_len = 0
+        for col_num, col_buf in enumerate(self._ColBufferList):
+            target_type, total_buf_len = col_buf[1], col_buf[6]
+            col_size = self.description[col_num][2]
+            col_sql_data_type = self._ColTypeCodeList[col_num]
+            if SQL_data_type_dict[col_sql_data_type][5]:
+                return False
+            if target_type == SQL_C_WCHAR:
+                # the rowset is sliced as bytes, which only matches the buffers used by fetchone
+                # when those are byte buffers decoded with odbc_decoding
+                if create_buffer_u is not create_buffer:
+                    return False
+                if col_size > 0:
+                    total_buf_len = max(total_buf_len, (col_size + 1) * ucs_length)
+            elif target_type == SQL_C_CHAR:
+                if col_size > 0:
+                    # room for the longest utf-8 encoding of col_size characters
+                    total_buf_len = max(total_buf_len, col_size * 4 + 1)
+            else:
+                return False
+            total_buf_len = self._outputsize.get(col_num, total_buf_len)
+            columns.append((target_type, total_buf_len, col_buf[7]))
+            row_len += total_buf_len + ctypes.sizeof(ctypes.c_ssize_t)
+
+        block_size = self.arraysize if self.arraysize > 1 else block_fetch_size
+        block_size = min(block_size, block_fetch_buffer_limit // row_len)
+        if block_size <= 1:
+            return False
+
+        self._free_stmt(SQL_UNBIND)
+        self._BlockBufferList = []
+        for col_num, (target_type, total_buf_len, buf_cvt_func) in enumerate(columns):
+            alloc_buffer = create_buffer(total_buf_len * block_size)
+            used_buf_lens = (ctypes.c_ssize_t * block_size)()
+            ret = ODBC_API.SQLBindCol(self.stmt_h, col_num + 1, target_type, ADDR(alloc_buffer), total_buf_len, ADDR(used_buf_lens))
+            if ret != SQL_SUCCESS:
+                check_success(self, ret)
+            self._BlockBufferList.append((target_type, alloc_buffer, used_buf_lens, total_buf_len, buf_cvt_func))
+        self._block_row_status = (ctypes.c_ushort * block_size)()
+        self._fetch_mode = 'block'
+        for attribute, value in ((SQL_ATTR_ROW_BIND_TYPE, ctypes.c_void_p(SQL_BIND_BY_COLUMN)),
+                                 (SQL_ATTR_ROW_ARRAY_SIZE, ctypes.c_void_p(block_size)),
+                                 (SQL_ATTR_ROW_STATUS_PTR, ADDR(self._block_row_status)),
+                                 (SQL_ATTR_ROWS_FETCHED_PTR, ADDR(self._block_rows_fetched))):
+            ret = ODBC_API.SQLSetStmtAttr(self.stmt_h, attribute, value, 0)
+            check_success(self, ret)
+        return True
+
+    def _use_block_fetch(self):
+        if self._fetch_mode is None:
+            if not self._BindBlockCols():
+                self._fetch_mode = 'row'
+        return self._fetch_mode == 'block'
+
+    def _fetch_rowset(self):
+        ret = ODBC_API.SQLFetchScroll(self.stmt_h, SQL_FETCH_NEXT, 0)
+        if ret == SQL_NO_DATA_FOUND:
+            return []
+        if ret not in (SQL_SUCCESS, SQL_SUCCESS_WITH_INFO):
+            check_success(self, ret)
+        rows_fetched = self._block_rows_fetched.value
+        row_status = self._block_row_status
+        columns = []
+        for target_type, alloc_buffer, used_buf_lens, total_buf_len, buf_cvt_func in self._BlockBufferList:
+            # one copy of the filled part of each column array, sliced per row below
+            raw = ctypes.string_at(alloc_buffer, total_buf_len * rows_fetched)
+            columns.append((target_type, raw, used_buf_lens, total_buf_len, buf_cvt_func))
+        rows = []
+        for i in range(rows_fetched):
+            if row_status[i] == SQL_ROW_NOROW:
+                continue
+            if row_status[i] == SQL_ROW_ERROR:
+                ctrl_err(SQL_HANDLE_STMT, self.stmt_h, SQL_ERROR, self.ansi)
+            value_list = []
+            for target_type, raw, used_buf_lens, total_buf_len, buf_cvt_func in columns:
+                used_buf_len = used_buf_lens[i]
+                if used_buf_len == SQL_NULL_DATA:
+                    value_list.append(None)
+                    continue
+                if used_buf_len == SQL_NO_TOTAL or used_buf_len > total_buf_len - (ucs_length if target_type == SQL_C_WCHAR else 1):
+                    raise DataError('01004', '[01004] String data, right truncated; '
+                                    'set cursor.block_fetch = False to read this result one row at a time')
+                start = i * total_buf_len
+                if target_type == SQL_C_WCHAR:
+                    value_list.append(buf_cvt_func(raw[start:start + used_buf_len].decode(odbc_decoding)))
+                else:
+                    value_list.append(buf_cvt_func(raw[start:start + used_buf_len]))
+            rows.append(self._row_type(value_list))
+        return rows
+
     def fetchall(self):
         if not self.connection:
             self.close()
             
+        if self._use_block_fetch():
+            rows = self._rowset[self._rowset_index:]
+            self._rowset = []
+            self._rowset_index = 0
+            while True:
+                rowset = self._fetch_rowset()
+                if not rowset:
+                    break
+                rows.extend(rowset)
+            return rows
+
         rows = []
         while True:
             row = self.fetchone()
@@ -1849,6 +2293,18 @@ class Cursor:
             num = self.arraysize
         rows = []
         
+        if self._use_block_fetch():
+            while len(rows) < num:
+                if self._rowset_index >= len(self._rowset):
+                    self._rowset = self._fetch_rowset()
+                    self._rowset_index = 0
+                    if not self._rowset:
+                        break
+                taken = self._rowset[self._rowset_index:self._rowset_index + num - len(rows)]
+                self._rowset_index += len(taken)
+                rows.extend(taken)
+            return rows
+
         while len(rows) < num:
             row = self.fetchone()
             if row is None:
@@ -1861,6 +2317,16 @@ class Cursor:
         if not self.connection:
             self.close()
             
+        if self._use_block_fetch():
+            if self._rowset_index >= len(self._rowset):
+                self._rowset = self._fetch_rowset()
+                self._rowset_index = 0
+                if not self._rowset:
+                    return None
+            row = self._rowset[self._rowset_index]
+            self._rowset_index += 1
+            return row
+
         ret = SQLFetch(self.stmt_h)
         
         if ret in (SQL_SUCCESS,SQL_SUCCESS_WITH_INFO):            
@@ -1948,6 +2414,9 @@ class Cursor:
         if not self.connection:
             self.close()
             
+        if self._use_block_fetch():
+            self.fetchmany(count)
+            return None
         for i in range(count):
             ret = ODBC_API.SQLFetchScroll(self.stmt_h, SQL_FETCH_NEXT, 0)
             if ret != SQL_SUCCESS:
@@ -1981,6 +2450,9 @@ class Cursor:
         if not self.connection.connected:
             raise ProgrammingError('HY000','Attempt to use a closed connection.')
         
+        if free_type is None:
+            # the handle is about to be reused for something else
+            self._release_statement()
         #self.description = None
         #self.rowcount = -1
         if free_type in (SQL_CLOSE, None):
@@ -2362,7 +2834,9 @@ class Cursor:
 #        ret = ODBC_API.SQLCloseCursor(self.stmt_h)
 #        check_success(self, ret)
 #        
-        if self.connection.connected:
+        if self.connection.connected and self.statement is not None and self.connection.statement_cache.maxsize > 0:
+            self._checkin_statement()
+        elif self.connection.connected:
             ret = ODBC_API.SQLFreeStmt(self.stmt_h, SQL_CLOSE)
             check_success(self, ret)
 
@@ -2407,6 +2881,8 @@ class Cursor:
 #
 #
 connection_timeout = 0
+# prepared statements kept per connection, see StatementCache
+statement_cache_size = 32
 
 class Connection:
     def __init__(self, connectString = '', autocommit = False, ansi = False, timeout = 0, unicode_results = use_unicode, readonly = False, **kargs):
@@ -2421,6 +2897,7 @@ class Connection:
         # the query timeout value
         self.timeout = 0
         # self._cursors = []
+        self.statement_cache = StatementCache(statement_cache_size)
         for key, value in list(kargs.items()):
             connectString = connectString + key + '=' + value + ';'
         self.connectString = connectString
@@ -2530,6 +3007,12 @@ class Connection:
         
     def add_output_converter(self, sqltype, func):
         self.output_converter[sqltype] = func
+
+    def set_statement_cache_size(self, size):
+        self.statement_cache.resize(size)
+
+    def statement_cache_info(self):
+        return self.statement_cache.info()
     
         
 
@@ -2674,6 +3157,7 @@ class Connection:
             #if DEBUG:print 'disconnect'
             if not self.autocommit:
                 self.rollback()
+            self.statement_cache.clear()
             ret = ODBC_API.SQLDisconnect(self.dbc_h)
             check_success(self, ret)
         #if DEBUG:print 'free dbc'
@@ -0,0 +1,122 @@
+from __future__ import print_function
+import itertools
+import logging
+import os
+import re
+
+from . import lib
+from . import paths
+from . import process_index
+
+RE_CACHE_SEGMENT_PATTERN = re.compile(r'irods_re_cache.*pid(\d+)_')
+
+class SharedMemorySegment(object):
+    __slots__ = ('path', 'pid', 'size')
+
+    def __init__(self, path, pid, size):
+        self.path = path
+        self.pid = pid
+        self.size = size
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+def shared_memory_directories():
+    directories = []
+    seen = set()
+    for directory in [
+            os.path.join(paths.root_directory(), 'var', 'run', 'shm'),
+            os.path.join(paths.root_directory(), 'dev', 'shm')]:
+        real_directory = os.path.realpath(directory)
+        if real_directory not in seen and os.path.isdir(directory):
+            seen.add(real_directory)
+            directories.append(directory)
+    return directories
+
+def list_shared_memory_entries():
+    for directory in shared_memory_directories():
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            continue
+        for name in names:
+            yield directory, name
+
+def scan_re_cache_segments():
+    segments = []
+    for directory, name in list_shared_memory_entries():
+        m = RE_CACHE_SEGMENT_PATTERN.search(name)
+        if not m:
+            continue
+        path = os.path.join(directory, name)
+        try:
+            size = os.stat(path).st_size
+        except OSError:
+            continue
+        segments.append(SharedMemorySegment(path, int(m.group(1)), size))
+    return segments
+
+def index_segments_by_pid(segments):
+    d = {}
+    for segment in segments:
+        d.setdefault(segment.pid, []).append(segment)
+    return d
+
+def get_segment_report(segments=None, owner_binaries=None):
+    if segments is None:
+        segments = scan_re_cache_segments()
+    if owner_binaries is None:
+        owner_binaries = [paths.server_executable()]
+    owner_pids = set(itertools.chain.from_iterable(process_index.get_binary_to_pids_dict(owner_binaries, refresh=True).values()))
+    rows = []
+    for segment in sorted(segments, key=lambda s: (s.pid, s.name)):
+        alive = process_index.pid_exists(segment.pid)
+        rows.append({
+            'path': segment.path,
+            'size': segment.size,
+            'pid': segment.pid,
+            'pid_alive': alive,
+            'orphaned': segment.pid not in owner_pids})
+    return {
+        'segments': rows,
+        'segment_count': len(rows),
+        'total_size': sum(r['size'] for r in rows),
+        'orphaned_count': len([r for r in rows if r['orphaned']]),
+        'orphaned_size': sum(r['size'] for r in rows if r['orphaned'])}
+
+def format_segment_report(report):
+    lines = ['{0:>8} {1:>6} {2:>12}  {3}'.format('PID', 'ALIVE', 'SIZE', 'SEGMENT')]
+    for row in report['segments']:
+        lines.append('{0:>8} {1:>6} {2:>12}  {3}{4}'.format(
+            row['pid'],
+            'yes' if row['pid_alive'] else 'no',
+            row['size'],
+            row['path'],
+            ' (orphaned)' if row['orphaned'] else ''))
+    lines.append('Total: {0} segments, {1} bytes ({2} orphaned segments, {3} bytes)'.format(
+        report['segment_count'], report['total_size'],
+        report['orphaned_count'], report['orphaned_size']))
+    return '\n'.join(lines)
+
+def delete_segments(paths_to_delete):
+    l = logging.getLogger(__name__)
+    deleted = []
+    for path in paths_to_delete:
+        try:
+            l.debug('Deleting %s', path)
+            os.unlink(path)
+        except (IOError, OSError):
+            l.warning(lib.indent('Error deleting cache file: %s'), path)
+        else:
+            deleted.append(path)
+    return deleted
+
+def delete_segments_by_pid(*pids):
+    segments_by_pid = index_segments_by_pid(scan_re_cache_segments())
+    return delete_segments([s.path for pid in pids for s in segments_by_pid.get(pid, [])])
+
+def reclaim_orphaned_segments(report=None):
+    if report is None:
+        report = get_segment_report()
+    return delete_segments([r['path'] for r in report['segments'] if r['orphaned']])
@@ -0,0 +1,162 @@
+from __future__ import print_function
+import logging
+import os
+import re
+import threading
+
+from . import execute
+
+LD_SO_CACHE_PATH = '/etc/ld.so.cache'
+LDCONFIG_ENTRY_PATTERN = re.compile(r'=>\s*(\S.*)$')
+
+ELF_MAGIC = b'\x7fELF'
+ELF_CLASSES = {1: 32, 2: 64}
+
+def get_elf_class(path):
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(5)
+    except (IOError, OSError):
+        return None
+    if len(header) < 5 or header[:4] != ELF_MAGIC:
+        return None
+    return ELF_CLASSES.get(bytearray(header)[4])
+
+def get_mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+def scan_directory(directory):
+    if hasattr(os, 'scandir'):
+        # avoids a stat per entry where the file system reports the entry type
+        for entry in os.scandir(directory):
+            try:
+                yield (entry.name, entry.is_dir(), entry.is_symlink())
+            except OSError:
+                yield (entry.name, False, False)
+    else:
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            yield (name, os.path.isdir(path), os.path.islink(path))
+
+class SharedObjectIndex(object):
+    def __init__(self):
+        self._ldconfig = None
+        self._listings = {}
+        self._walks = {}
+        self._lock = threading.RLock()
+
+    def invalidate(self):
+        with self._lock:
+            self._ldconfig = None
+            self._listings = {}
+            self._walks = {}
+
+    def list_directory(self, directory):
+        mtime = get_mtime(directory)
+        with self._lock:
+            cached = self._listings.get(directory)
+            if cached is not None and cached[0] == mtime:
+                return cached[1], cached[2]
+        files = []
+        subdirectories = []
+        if mtime is not None:
+            try:
+                entries = sorted(scan_directory(directory))
+            except OSError:
+                entries = []
+            # classified as os.walk does, so symlinks to directories are not descended into
+            for name, is_dir, is_link in entries:
+                if is_dir:
+                    if not is_link:
+                        subdirectories.append(name)
+                else:
+                    files.append(name)
+        with self._lock:
+            self._listings[directory] = (mtime, files, subdirectories)
+        return files, subdirectories
+
+    def walk(self, root):
+        with self._lock:
+            cached = self._walks.get(root)
+        if cached is not None and all(get_mtime(d) == mtime for d, mtime in cached):
+            return [d for d, _ in cached]
+        walked = []
+        pending = [root]
+        while pending:
+            directory = pending.pop(0)
+            if not os.path.isdir(directory):
+                continue
+            walked.append((directory, get_mtime(directory)))
+            _, subdirectories = self.list_directory(directory)
+            pending[0:0] = [os.path.join(directory, d) for d in subdirectories]
+        with self._lock:
+            self._walks[root] = walked
+        return [d for d, _ in walked]
+
+    def ldconfig_directories(self):
+        mtime = get_mtime(LD_SO_CACHE_PATH)
+        with self._lock:
+            if self._ldconfig is not None and self._ldconfig[0] == mtime:
+                return self._ldconfig[1]
+        env = os.environ.copy()
+        env['PATH'] = ':'.join([env['PATH'], '/sbin'])
+        out, _, returncode = execute.execute_command_permissive(['ldconfig', '-p'], env=env)
+        directories = []
+        if returncode == 0:
+            for line in out.splitlines():
+                m = LDCONFIG_ENTRY_PATTERN.search(line)
+                if m:
+                    directory = os.path.dirname(m.group(1))
+                    if directory not in directories:
+                        directories.append(directory)
+        else:
+            logging.getLogger(__name__).debug('ldconfig -p failed, shared object search limited to walked directories')
+        with self._lock:
+            self._ldconfig = (mtime, directories)
+        return directories
+
+    def find(self, so_name, regex=False, additional_directories=[]):
+        if regex:
+            so_regex = re.compile(so_name)
+            matches = lambda name: so_regex.match(name)
+        else:
+            matches = lambda name: name == so_name
+
+        paths = []
+        def add(path):
+            if path not in paths:
+                paths.append(path)
+
+        if 'LD_PRELOAD' in os.environ:
+            for path in os.environ['LD_PRELOAD'].split(':'):
+                if os.path.exists(path) and matches(os.path.basename(path)):
+                    add(path)
+
+        directories = []
+        if 'LD_LIBRARY_PATH' in os.environ:
+            directories.extend(d for d in os.environ['LD_LIBRARY_PATH'].split(':') if d)
+        directories.extend(self.ldconfig_directories())
+        for root in list(additional_directories) + ['/usr/lib/']:
+            directories.extend(self.walk(root))
+
+        scanned = set()
+        for directory in directories:
+            if os.path.normpath(directory) in scanned:
+                continue
+            scanned.add(os.path.normpath(directory))
+            files, _ = self.list_directory(directory)
+            for name in files:
+                if matches(name):
+                    add(os.path.join(directory, name))
+        return paths
+
+default_shared_object_index = SharedObjectIndex()
+
+def find_shared_object(so_name, regex=False, additional_directories=[]):
+    return default_shared_object_index.find(so_name, regex, additional_directories)
+
+def invalidate():
+    default_shared_object_index.invalidate()
@@ -0,0 +1,88 @@
+from __future__ import print_function
+import logging
+import signal
+import time
+
+import psutil
+
+class ProcessExit(object):
+    __slots__ = ('pid', 'label', 'signal', 'latency', 'status')
+
+    def __init__(self, pid, label, signal=None, latency=None, status='running'):
+        self.pid = pid
+        self.label = label
+        self.signal = signal
+        self.latency = latency
+        self.status = status
+
+    def __repr__(self):
+        return 'ProcessExit(pid={0}, label={1!r}, signal={2}, latency={3}, status={4!r})'.format(
+            self.pid, self.label, self.signal, self.latency, self.status)
+
+def get_processes(pids):
+    processes = []
+    for pid in pids:
+        try:
+            processes.append(psutil.Process(pid))
+        except psutil.NoSuchProcess:
+            pass
+    return processes
+
+def wait_for_pids(pids, timeout):
+    _, alive = psutil.wait_procs(get_processes(pids), timeout=timeout)
+    return [p.pid for p in alive]
+
+def send_signal_to_all(processes, signum, results):
+    signalled = []
+    for p in processes:
+        try:
+            p.send_signal(signum)
+        except psutil.NoSuchProcess:
+            results[p.pid].status = 'exited'
+            results[p.pid].latency = 0.0
+        except psutil.AccessDenied:
+            results[p.pid].status = 'access denied'
+        else:
+            results[p.pid].signal = signum
+            signalled.append(p)
+    return signalled
+
+def terminate_processes(pid_to_label_dict, grace_period=10, kill_timeout=5):
+    l = logging.getLogger(__name__)
+    results = dict((pid, ProcessExit(pid, label)) for pid, label in pid_to_label_dict.items())
+    start_time = time.time()
+
+    def on_exit(process):
+        results[process.pid].status = 'exited'
+        results[process.pid].latency = time.time() - start_time
+
+    processes = get_processes(pid_to_label_dict.keys())
+    for pid in set(pid_to_label_dict.keys()) - set(p.pid for p in processes):
+        results[pid].status = 'exited'
+        results[pid].latency = 0.0
+
+    l.debug('Sending SIGTERM to %s processes', len(processes))
+    signalled = send_signal_to_all(processes, signal.SIGTERM, results)
+    _, alive = psutil.wait_procs(signalled, timeout=grace_period, callback=on_exit)
+
+    if alive:
+        l.warning('%s processes did not exit within %s seconds of SIGTERM, sending SIGKILL',
+                  len(alive), grace_period)
+        signalled = send_signal_to_all(alive, signal.SIGKILL, results)
+        _, alive = psutil.wait_procs(signalled, timeout=kill_timeout, callback=on_exit)
+        for p in alive:
+            results[p.pid].status = 'survived'
+
+    return sorted(results.values(), key=lambda r: r.pid)
+
+def format_process_exits(process_exits):
+    signal_names = {signal.SIGTERM: 'SIGTERM', signal.SIGKILL: 'SIGKILL'}
+    lines = []
+    for r in process_exits:
+        lines.append('{0} (pid {1}): {2}{3}{4}'.format(
+            r.label,
+            r.pid,
+            r.status,
+            ' after {0}'.format(signal_names.get(r.signal, r.signal)) if r.signal is not None else '',
+            ' in {0:.3f}s'.format(r.latency) if r.latency is not None else ''))
+    return '\n'.join(lines)
@@ -35,3 +35,31 @@ def add_options(parser):
     parser.add_option('--test',
                       dest='test_mode', action='store_true',
                       help='Additionally write log messages to IRODS_HOME/log/test_mode_output.log')
+
+    parser.add_option('--full-preflight',
+                      dest='full_preflight', action='store_true', default=False,
+                      help='Run the upgrade, validation and catalog schema checks even if the installation is unchanged since the last start')
+
+    parser.add_option('--timeline',
+                      dest='print_timeline', action='store_true', default=False,
+                      help='Print the duration of each startup phase')
+
+    parser.add_option('--timeline-json',
+                      dest='timeline_json_path', metavar='PATH',
+                      help='Write the duration of each startup phase to PATH as JSON')
+
+    parser.add_option('--reclaim-orphaned-segments',
+                      dest='reclaim_orphaned_segments', action='store_true', default=False,
+                      help='With the shm operation, delete rule engine cache segments whose server is no longer running')
+
+    parser.add_option('--agent-threshold',
+                      dest='agent_threshold', type='int', default=0, metavar='INT',
+                      help='With graceful_restart, restart once at most this many agents remain')
+
+    parser.add_option('--drain-timeout',
+                      dest='drain_timeout', type='int', default=300, metavar='SECONDS',
+                      help='With graceful_restart, the maximum number of seconds to wait for agents to finish')
+
+    parser.add_option('--json',
+                      dest='json_output', action='store_true', default=False,
+                      help='With the status operation, print per-process metrics as JSON')
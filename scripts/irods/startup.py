@@ -0,0 +1,88 @@
+from __future__ import print_function
+import contextlib
+import json
+import logging
+import socket
+import time
+
+from .exceptions import IrodsError
+
+HEARTBEAT_REQUEST = b'\x00\x00\x00\x33<MsgHeader_PI><type>HEARTBEAT</type></MsgHeader_PI>'
+HEARTBEAT_RESPONSE = b'HEARTBEAT'
+
+class StartupTimeline(object):
+    def __init__(self):
+        self.phases = []
+        self.start_time = time.time()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.time()
+        entry = {'phase': name, 'offset': start - self.start_time, 'status': 'running'}
+        self.phases.append(entry)
+        try:
+            yield entry
+        except BaseException:
+            entry['status'] = 'failed'
+            raise
+        else:
+            entry['status'] = 'ok'
+        finally:
+            entry['duration'] = time.time() - start
+
+    def skip(self, name, reason=None):
+        entry = {'phase': name, 'offset': time.time() - self.start_time, 'duration': 0.0, 'status': 'skipped'}
+        if reason is not None:
+            entry['reason'] = reason
+        self.phases.append(entry)
+
+    @property
+    def total_duration(self):
+        if not self.phases:
+            return 0.0
+        return max(p['offset'] + p.get('duration', 0.0) for p in self.phases)
+
+    def as_dict(self):
+        return {'phases': self.phases, 'total_duration': self.total_duration}
+
+    def format(self):
+        lines = ['{0:<24} {1:>10} {2:>10}  {3}'.format('Phase', 'Offset(s)', 'Time(s)', 'Status')]
+        for p in self.phases:
+            lines.append('{0:<24} {1:>10.3f} {2:>10.3f}  {3}'.format(
+                p['phase'], p['offset'], p.get('duration', 0.0), p['status']))
+        lines.append('{0:<24} {1:>10} {2:>10.3f}'.format('total', '', self.total_duration))
+        return '\n'.join(lines)
+
+    def write_json(self, path):
+        with open(path, 'wt') as f:
+            json.dump(self.as_dict(), f, indent=4, sort_keys=True)
+
+def wait_for_server_ready(port, server_is_running, timeout=100,
+        initial_interval=0.01, maximum_interval=0.5, backoff_factor=2, heartbeat_timeout=5):
+    l = logging.getLogger(__name__)
+    deadline = time.time() + timeout
+    interval = initial_interval
+    attempt = 1
+    while True:
+        l.debug('Attempting to connect to iRODS server on port %s. Attempt #%s', port, attempt)
+        with contextlib.closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as s:
+            if s.connect_ex(('127.0.0.1', port)) == 0:
+                l.debug('Successfully connected to port %s.', port)
+                if not server_is_running():
+                    raise IrodsError('iRODS port is bound, but server is not started.')
+                s.settimeout(heartbeat_timeout)
+                try:
+                    s.sendall(HEARTBEAT_REQUEST)
+                    message = s.recv(256)
+                except socket.error as e:
+                    raise IrodsError('iRODS port did not answer the heartbeat message:\n{0}'.format(e))
+                if message != HEARTBEAT_RESPONSE:
+                    raise IrodsError('iRODS port returned non-heartbeat message:\n{0}'.format(message))
+                return attempt
+        if not server_is_running():
+            raise IrodsError('iRODS server process exited before accepting connections on port {0}.'.format(port))
+        if time.time() + interval > deadline:
+            raise IrodsError('iRODS server failed to start within {0} seconds.'.format(timeout))
+        time.sleep(interval)
+        interval = min(interval * backoff_factor, maximum_interval)
+        attempt += 1
@@ -0,0 +1,23 @@
+import contextlib
+
+@contextlib.contextmanager
+def replaced(owner, name, replacement):
+    original = getattr(owner, name)
+    setattr(owner, name, replacement)
+    try:
+        yield
+    finally:
+        setattr(owner, name, original)
+
+@contextlib.contextmanager
+def counting_calls(owner, name):
+    original = getattr(owner, name)
+    calls = []
+    def counted(*args, **kwargs):
+        calls.append(args)
+        return original(*args, **kwargs)
+    with replaced(owner, name, counted):
+        yield calls
+
+def fail_if_called(*args, **kwargs):
+    raise AssertionError('unexpected call with {0}'.format(args))
@@ -68,8 +68,9 @@ class ResourceBase(session.make_sessions_mixin([('otherrods', 'rods')], [('alice
         super(ResourceBase, self).tearDown()
         with session.make_session_for_existing_admin() as admin_session:
             admin_session.run_icommand('irmtrash -M')
-            admin_session.run_icommand(['iadmin', 'rmresc', self.testresc])
-            admin_session.run_icommand(['iadmin', 'rmresc', self.anotherresc])
+            admin_session.run_icommands_parallel([
+                ['iadmin', 'rmresc', self.testresc],
+                ['iadmin', 'rmresc', self.anotherresc]])
             print("run_resource_teardown - END")
 
 
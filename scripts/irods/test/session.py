@@ -36,22 +36,42 @@ def make_session_for_existing_admin():
         username, test.settings.ICAT_HOSTNAME, zone_name, use_ssl=test.settings.USE_SSL)
     return IrodsSession(env_dict, test.settings.PREEXISTING_ADMIN_PASSWORD, False)
 
-def mkuser_and_return_session(user_type, username, password, hostname):
+def get_client_zone_name():
     irods_config = IrodsConfig()
     if irods_config.version_tuple < (4, 1, 0):
         client_environment = open_and_load_pre410_env_file(os.path.join(irods_config.home_directory, '.irods', '.irodsEnv'))
     else:
         client_environment = irods_config.client_environment
-    zone_name = client_environment['irods_zone_name']
+    return client_environment['irods_zone_name']
+
+def make_session_for_new_user(username, password, hostname, zone_name):
+    manage_data = password != None
+    env_dict = lib.make_environment_dict(username, hostname, zone_name, use_ssl=test.settings.USE_SSL)
+    return IrodsSession(env_dict, password, manage_data)
+
+def mkuser_and_return_session(user_type, username, password, hostname):
+    zone_name = get_client_zone_name()
     with make_session_for_existing_admin() as admin_session:
         admin_session.assert_icommand(
             ['iadmin', 'mkuser', username, user_type])
         if password is not None:
             admin_session.assert_icommand(
                 ['iadmin', 'moduser', username, 'password', password])
-        manage_data = password != None
-        env_dict = lib.make_environment_dict(username, hostname, zone_name, use_ssl=test.settings.USE_SSL)
-        return IrodsSession(env_dict, password, manage_data)
+        return make_session_for_new_user(username, password, hostname, zone_name)
+
+def mkusers_and_return_sessions(user_type_name_password_list, hostname):
+    zone_name = get_client_zone_name()
+    commands = []
+    dependencies = {}
+    for user_type, username, password in user_type_name_password_list:
+        commands.append(['iadmin', 'mkuser', username, user_type])
+        if password is not None:
+            dependencies[len(commands)] = [len(commands) - 1]
+            commands.append(['iadmin', 'moduser', username, 'password', password])
+    with make_session_for_existing_admin() as admin_session:
+        admin_session.assert_icommands_parallel(commands, dependencies)
+    return [make_session_for_new_user(username, password, hostname, zone_name)
+            for _, username, password in user_type_name_password_list]
 
 def mkgroup_and_add_users(group_name, usernames):
     with make_session_for_existing_admin() as admin_session:
@@ -71,19 +91,21 @@ def get_data_id(session, collection_name, data_name):
 def make_sessions_mixin(rodsadmin_name_password_list, rodsuser_name_password_list):
     class SessionsMixin(object):
         def setUp(self):
-            with make_session_for_existing_admin() as admin_session:
-                self.admin_sessions = [mkuser_and_return_session('rodsadmin', name, password, lib.get_hostname())
-                                       for name, password in rodsadmin_name_password_list]
-                self.user_sessions = [mkuser_and_return_session('rodsuser', name, password, lib.get_hostname())
-                                      for name, password in rodsuser_name_password_list]
+            sessions = mkusers_and_return_sessions(
+                [('rodsadmin', name, password) for name, password in rodsadmin_name_password_list] +
+                [('rodsuser', name, password) for name, password in rodsuser_name_password_list],
+                lib.get_hostname())
+            self.admin_sessions = sessions[:len(rodsadmin_name_password_list)]
+            self.user_sessions = sessions[len(rodsadmin_name_password_list):]
             super(SessionsMixin, self).setUp()
 
         def tearDown(self):
             with make_session_for_existing_admin() as admin_session:
                 for session in itertools.chain(self.admin_sessions, self.user_sessions):
                     session.__exit__()
-                    admin_session.assert_icommand(
-                        ['iadmin', 'rmuser', session.username])
+                admin_session.assert_icommands_parallel(
+                    [['iadmin', 'rmuser', session.username]
+                     for session in itertools.chain(self.admin_sessions, self.user_sessions)])
             super(SessionsMixin, self).tearDown()
     return SessionsMixin
 
@@ -154,6 +176,18 @@ class IrodsSession(object):
         self._prepare_run_icommand(args[0], kwargs)
         return lib.execute_command_permissive(*args, **kwargs)
 
+    def run_icommands_parallel(self, commands, dependencies=None, **kwargs):
+        for command in commands:
+            self._log_run_icommand(command)
+        self._prepare_run_icommand_environment(kwargs)
+        return lib.execute_commands_parallel(commands, dependencies, **kwargs)
+
+    def assert_icommands_parallel(self, commands, dependencies=None, **kwargs):
+        results = self.run_icommands_parallel(commands, dependencies, **kwargs)
+        failures = [r for r in results if not r.succeeded]
+        assert not failures, '\n'.join('{0}:\n{1}'.format(r, r.err) for r in failures)
+        return results
+
     def assert_icommand(self, *args, **kwargs):
         self._prepare_run_icommand(args[0], kwargs)
         return assert_command(*args, **kwargs)
@@ -170,6 +204,9 @@ class IrodsSession(object):
 
     def _prepare_run_icommand(self, arg, kwargs):
         self._log_run_icommand(arg)
+        self._prepare_run_icommand_environment(kwargs)
+
+    def _prepare_run_icommand_environment(self, kwargs):
         self._write_environment_file()
         if 'env' not in kwargs:
             kwargs['env'] = os.environ.copy()
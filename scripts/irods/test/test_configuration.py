@@ -0,0 +1,170 @@
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+from .. import configuration
+from .. import paths
+from ..configuration import IrodsConfig, JsonConfigCache
+from .patching import counting_calls, replaced
+
+
+class Test_Json_Config_Cache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'server_config.json')
+        self.cache = JsonConfigCache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, value, path=None, mtime=None):
+        path = path or self.path
+        with open(path, 'wt') as f:
+            json.dump(value, f)
+        # older than the racy interval unless a test wants otherwise
+        mtime = mtime or time.time() - 60
+        os.utime(path, (mtime, mtime))
+
+    def load(self):
+        with counting_calls(configuration, 'load_json_file') as calls:
+            value = self.cache.load(self.path, configuration.load_json_file)
+        return value, len(calls)
+
+    def test_unchanged_file_is_loaded_once(self):
+        self.write({'a': 1})
+        self.assertEqual(self.load(), ({'a': 1}, 1))
+        self.assertEqual(self.load(), ({'a': 1}, 0))
+        self.assertEqual(self.cache.stats(), {'hits': 1, 'misses': 1, 'entries': 1})
+
+    def test_mtime_change_is_a_miss(self):
+        mtime = time.time() - 60
+        self.write({'a': 1}, mtime=mtime)
+        self.load()
+        os.utime(self.path, (mtime - 10, mtime - 10))
+        self.assertEqual(self.load(), ({'a': 1}, 1))
+
+    def test_size_change_is_a_miss(self):
+        mtime = time.time() - 60
+        self.write({'a': 1}, mtime=mtime)
+        self.load()
+        self.write({'a': 10}, mtime=mtime)
+        self.assertEqual(self.load(), ({'a': 10}, 1))
+
+    def test_inode_change_is_a_miss(self):
+        mtime = time.time() - 60
+        self.write({'a': 1}, mtime=mtime)
+        self.load()
+        replacement = os.path.join(self.directory, 'replacement.json')
+        self.write({'a': 2}, path=replacement, mtime=mtime)
+        os.rename(replacement, self.path)
+        self.assertEqual(self.load(), ({'a': 2}, 1))
+
+    def test_recently_modified_file_is_not_cached(self):
+        self.write({'a': 1}, mtime=time.time())
+        self.assertEqual(self.load(), ({'a': 1}, 1))
+        self.assertEqual(self.load(), ({'a': 1}, 1))
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+    def test_callers_receive_copies(self):
+        self.write({'a': {'b': [1, 2]}})
+        first, _ = self.load()
+        first['a']['b'].append(3)
+        first['c'] = 4
+        second, loads = self.load()
+        self.assertEqual(second, {'a': {'b': [1, 2]}})
+        self.assertEqual(loads, 0)
+
+    def test_invalidate_matches_aliases(self):
+        self.write({'a': 1})
+        alias = os.path.join(self.directory, 'alias.json')
+        os.symlink(self.path, alias)
+        self.load()
+        self.cache.invalidate(alias)
+        self.assertEqual(self.load(), ({'a': 1}, 1))
+
+    def test_invalidate_drops_entries(self):
+        self.write({'a': 1})
+        self.load()
+        self.cache.invalidate(self.path)
+        self.assertEqual(self.load(), ({'a': 1}, 1))
+        self.cache.invalidate()
+        self.assertEqual(self.load(), ({'a': 1}, 1))
+
+class Test_Irods_Config_Caching(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.directory, 'subdirectory'))
+        self.server_config_path = os.path.join(self.directory, 'server_config.json')
+        self.hosts_config_path = os.path.join(self.directory, 'hosts_config.json')
+        self.write(self.server_config_path, {'zone_name': 'tempZone'})
+        self.write(self.hosts_config_path, {'host_entries': []})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, path, value):
+        with open(path, 'wt') as f:
+            json.dump(value, f)
+        mtime = time.time() - 60
+        os.utime(path, (mtime, mtime))
+
+    @contextlib.contextmanager
+    def configuration_files(self):
+        with replaced(configuration, 'json_config_cache', JsonConfigCache()), \
+                replaced(paths, 'server_config_path', lambda: self.server_config_path), \
+                replaced(paths, 'hosts_config_path', lambda: self.hosts_config_path):
+            yield
+
+    def test_instances_share_parsed_files(self):
+        with self.configuration_files(), counting_calls(configuration, 'load_json_file') as calls:
+            self.assertEqual(IrodsConfig().server_config['zone_name'], 'tempZone')
+            self.assertEqual(IrodsConfig().server_config['zone_name'], 'tempZone')
+        self.assertEqual(len(calls), 1)
+
+    def test_commit_reloads_only_dependent_properties(self):
+        with self.configuration_files():
+            irods_config = IrodsConfig()
+            irods_config.server_config
+            irods_config.hosts_config
+            irods_config.execution_environment
+            irods_config.commit({'host_entries': [{}]}, self.hosts_config_path)
+            self.assertEqual(irods_config.hosts_config, {'host_entries': [{}]})
+            irods_config.server_config
+            irods_config.execution_environment
+        self.assertEqual(irods_config.reload_counts['hosts_config'], 2)
+        self.assertEqual(irods_config.reload_counts['server_config'], 1)
+        self.assertEqual(irods_config.reload_counts['execution_environment'], 1)
+
+    def test_commit_through_another_spelling_of_the_path(self):
+        with self.configuration_files():
+            irods_config = IrodsConfig()
+            irods_config.server_config
+            irods_config.execution_environment
+            irods_config.commit({'zone_name': 'otherZone'},
+                                os.path.join(self.directory, 'subdirectory', '..', 'server_config.json'))
+            self.assertEqual(irods_config.server_config['zone_name'], 'otherZone')
+            irods_config.execution_environment
+        self.assertEqual(irods_config.reload_counts['server_config'], 2)
+        self.assertEqual(irods_config.reload_counts['execution_environment'], 2)
+
+    def test_commit_of_an_unknown_path_reloads_every_file(self):
+        with self.configuration_files():
+            irods_config = IrodsConfig()
+            irods_config.server_config
+            irods_config.hosts_config
+            irods_config.commit({}, os.path.join(self.directory, 'unknown.json'))
+            irods_config.server_config
+            irods_config.hosts_config
+        self.assertEqual(irods_config.reload_counts['server_config'], 2)
+        self.assertEqual(irods_config.reload_counts['hosts_config'], 2)
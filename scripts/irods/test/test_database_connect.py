@@ -0,0 +1,173 @@
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+from .. import database_connect
+from .. import lib
+from .. import pypyodbc
+from .. import test
+from ..configuration import IrodsConfig
+from .patching import counting_calls
+
+
+@unittest.skipIf(test.settings.RUN_IN_TOPOLOGY, 'Connects to the local catalog')
+class Test_Database_Connect(unittest.TestCase):
+    # a cross join of the token table spans several rowsets on every database type
+    query = 'select t1.token_namespace, t1.token_name, t2.token_id from R_TOKN_MAIN t1, R_TOKN_MAIN t2 ' \
+            'order by t1.token_id, t2.token_id'
+
+    def setUp(self):
+        self.irods_config = IrodsConfig()
+        self.connection = database_connect.get_database_connection(self.irods_config)
+
+    def tearDown(self):
+        self.connection.rollback()
+        self.connection.close()
+
+    def fetch(self, statement, block_fetch, consume=lambda cursor: cursor.fetchall()):
+        with contextlib.closing(self.connection.cursor()) as cursor:
+            cursor.block_fetch = block_fetch
+            cursor.execute(statement)
+            return [tuple(r) for r in consume(cursor)]
+
+    def test_block_fetch_returns_the_rows_of_the_per_row_path(self):
+        rows = self.fetch(self.query, False)
+        self.assertGreater(len(rows), pypyodbc.block_fetch_size)
+        self.assertEqual(self.fetch(self.query, True), rows)
+
+    def test_block_fetch_mixes_fetchone_and_fetchmany(self):
+        def consume(cursor):
+            rows = [cursor.fetchone()]
+            rows.extend(cursor.fetchmany(pypyodbc.block_fetch_size + 3))
+            rows.append(cursor.fetchone())
+            rows.extend(cursor.fetchall())
+            self.assertIsNone(cursor.fetchone())
+            return rows
+        self.assertEqual(self.fetch(self.query, True, consume), self.fetch(self.query, False))
+
+    def test_truncated_block_fetch_raises_data_error(self):
+        statement = "select token_name from R_TOKN_MAIN where token_namespace = 'data_type' and token_name = 'generic'"
+        with contextlib.closing(self.connection.cursor()) as cursor:
+            # leaves no room in the bound column array for the value
+            cursor.setoutputsize(4, 0)
+            cursor.execute(statement)
+            with self.assertRaises(pypyodbc.DataError) as context:
+                cursor.fetchall()
+            self.assertIn('block_fetch = False', str(context.exception))
+        with contextlib.closing(self.connection.cursor()) as cursor:
+            cursor.block_fetch = False
+            cursor.setoutputsize(4, 0)
+            cursor.execute(statement)
+            self.assertEqual([tuple(r) for r in cursor.fetchall()], [('generic',)])
+
+    def test_executemany_reports_each_parameter_set(self):
+        # spans several parameter arrays, and matches no rows
+        params_list = [(-i,) for i in range(1, 2 * pypyodbc.param_array_size + 6)]
+        with contextlib.closing(self.connection.cursor()) as cursor:
+            database_connect.execute_sql_statement_many(cursor,
+                    'update R_TOKN_MAIN set token_value3 = token_value3 where token_id = ?', params_list)
+            self.assertEqual(cursor.rowcount, 0)
+            self.assertEqual(cursor.param_status, [pypyodbc.SQL_PARAM_SUCCESS] * len(params_list))
+
+    def test_executemany_counts_the_affected_rows(self):
+        with contextlib.closing(self.connection.cursor()) as cursor:
+            token_ids = [r[0] for r in cursor.execute(
+                "select token_id from R_TOKN_MAIN where token_name = 'generic'").fetchall()]
+            self.assertGreater(len(token_ids), 1)
+            self.connection.autocommit = False
+            database_connect.execute_sql_statement_many(cursor,
+                    "update R_TOKN_MAIN set token_value3 = 'executemany' where token_id = ?",
+                    [(token_id,) for token_id in token_ids] + [(-1,)])
+            self.assertEqual(cursor.rowcount, len(token_ids))
+            self.assertEqual(len(cursor.param_status), len(token_ids) + 1)
+            self.assertEqual(cursor.execute(
+                "select count(*) from R_TOKN_MAIN where token_value3 = 'executemany'").fetchone()[0], len(token_ids))
+
+    def run_statements(self, statements, count):
+        with contextlib.closing(self.connection.cursor()) as cursor:
+            return [cursor.execute(statements[i % len(statements)], (i,)).fetchall()[0][0] for i in range(count)]
+
+    def cache_delta(self, before):
+        after = self.connection.statement_cache_info()
+        return dict((k, after[k] - before[k]) for k in ('hits', 'misses', 'evictions'))
+
+    def test_alternating_statements_reuse_prepared_statements(self):
+        statements = ['select count(*) from R_TOKN_MAIN where token_id > ?',
+                      'select count(*) from R_RESC_MAIN where resc_id > ?']
+        before = self.connection.statement_cache_info()
+        cached = self.run_statements(statements, 200)
+        self.assertEqual(self.cache_delta(before), {'hits': 198, 'misses': 2, 'evictions': 0})
+        self.connection.set_statement_cache_size(0)
+        self.assertEqual(self.connection.statement_cache_info()['currsize'], 0)
+        self.assertEqual(self.run_statements(statements, 200), cached)
+
+    def test_statement_cache_evicts_beyond_its_size(self):
+        statements = ['select count(*) from R_TOKN_MAIN where token_id > ?',
+                      'select count(*) from R_RESC_MAIN where resc_id > ?',
+                      'select count(*) from R_USER_MAIN where user_id > ?']
+        uncached = self.run_statements(statements, 9)
+        self.connection.set_statement_cache_size(1)
+        before = self.connection.statement_cache_info()
+        self.assertEqual(self.run_statements(statements, 9), uncached)
+        delta = self.cache_delta(before)
+        self.assertEqual(delta['hits'], 0)
+        self.assertGreater(delta['evictions'], 0)
+        self.assertLessEqual(self.connection.statement_cache_info()['currsize'], 1)
+
+    def test_streamed_batches_hold_the_rows_of_fetchall(self):
+        expected = self.fetch(self.query, True)
+        batch_size = 100
+        with contextlib.closing(database_connect.get_database_connection(self.irods_config, streaming=True)) as connection:
+            # postgres only declares a server side cursor inside a transaction
+            for autocommit in [True, False]:
+                connection.autocommit = autocommit
+                with contextlib.closing(connection.cursor()) as cursor:
+                    batches = [[tuple(r) for r in rows] for rows in database_connect.stream_sql_statement_batches(
+                        cursor, self.query, database_type=self.irods_config.catalog_database_type, batch_size=batch_size)]
+                connection.rollback()
+                self.assertEqual([len(rows) for rows in batches[:-1]], [batch_size] * (len(batches) - 1))
+                self.assertLessEqual(len(batches[-1]), batch_size)
+                self.assertEqual([row for rows in batches for row in rows], expected)
+
+    def test_sync_odbc_ini_skips_odbcinst_when_unchanged(self):
+        directory = tempfile.mkdtemp()
+        try:
+            self.irods_config.execution_environment['ODBCINI'] = os.path.join(directory, '.odbc.ini')
+            with counting_calls(lib, 'execute_command') as calls:
+                self.assertTrue(database_connect.sync_odbc_ini(self.irods_config))
+                self.assertEqual(len(calls), 1)
+                self.assertFalse(database_connect.sync_odbc_ini(self.irods_config))
+                self.assertEqual(len(calls), 1)
+            with open(self.irods_config.odbc_ini_path) as f:
+                self.assertEqual(database_connect.load_odbc_ini(f)['iRODS Catalog'],
+                                 database_connect.get_odbc_entry(self.irods_config.database_config,
+                                                                 self.irods_config.catalog_database_type))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_pooled_connection_is_reused(self):
+        database_connect.close_pooled_database_connection()
+        try:
+            with database_connect.pooled_database_connection(self.irods_config) as connection:
+                autocommit = connection.autocommit
+                connection.autocommit = not autocommit
+                with database_connect.pooled_database_connection(self.irods_config) as nested_connection:
+                    # the pooled connection is checked out, so a nested caller gets its own
+                    self.assertIsNot(nested_connection, connection)
+            with database_connect.pooled_database_connection(self.irods_config) as reused_connection:
+                self.assertIs(reused_connection, connection)
+                self.assertEqual(reused_connection.autocommit, autocommit)
+                self.assertTrue(database_connect.irods_tables_in_database(self.irods_config, reused_connection.cursor()))
+            database_connect.close_pooled_database_connection()
+            self.assertFalse(connection.connected)
+            with database_connect.pooled_database_connection(self.irods_config) as new_connection:
+                self.assertIsNot(new_connection, connection)
+        finally:
+            database_connect.close_pooled_database_connection()
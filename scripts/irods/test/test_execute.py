@@ -0,0 +1,88 @@
+import subprocess
+import sys
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+from .. import execute
+from .. import six
+from ..exceptions import IrodsError
+from .patching import replaced
+
+
+class Test_Execute(unittest.TestCase):
+
+    def test_execute_command_timeout_drains_large_output(self):
+        size = 4 * 1024 * 1024
+        out, err = execute.execute_command_timeout([sys.executable, '-c',
+            'import sys; sys.stdout.write("o" * {0}); sys.stderr.write("e" * {0})'.format(size)], timeout=60)
+        self.assertEqual(len(out), size)
+        self.assertEqual(len(err), size)
+
+    def test_execute_command_timeout_kills_slow_commands(self):
+        processes = []
+        def execute_command_nonblocking(*args, **kwargs):
+            processes.append(nonblocking(*args, **kwargs))
+            return processes[-1]
+        nonblocking = execute.execute_command_nonblocking
+        with replaced(execute, 'execute_command_nonblocking', execute_command_nonblocking):
+            self.assertRaises(IrodsError, execute.execute_command_timeout, ['sleep', '60'], timeout=0.2)
+        self.assertIsNotNone(processes[0].returncode)
+
+    def test_wait_for_process_reaps_the_child(self):
+        p = execute.execute_command_nonblocking([sys.executable, '-c', 'import sys; sys.stdout.write("out"); sys.exit(3)'])
+        out, err, rusage = execute.wait_for_process(p)
+        self.assertEqual((out, err), (b'out', b''))
+        self.assertEqual(p.returncode, 3)
+        self.assertGreater(rusage.ru_utime + rusage.ru_stime, 0)
+
+    def test_wait_for_process_writes_input(self):
+        data = b'x' * (1024 * 1024)
+        p = execute.execute_command_nonblocking(['cat'], stdin=subprocess.PIPE)
+        out, err, _ = execute.wait_for_process(p, input=data)
+        self.assertEqual(out, data)
+        self.assertEqual(p.returncode, 0)
+
+class Test_Streaming_Command(unittest.TestCase):
+
+    def test_output_window_keeps_head_and_tail(self):
+        window = execute.OutputWindow(head_lines=2, tail_lines=2)
+        window.write('1\n2\n3\n4')
+        window.write('\n5\n6')
+        window.close()
+        self.assertEqual(window.line_count, 6)
+        self.assertEqual(six.text_type(window), u'1\n2\n[... 2 lines omitted ...]\n5\n6')
+
+    def test_stream_command_keeps_bounded_output_window(self):
+        command = execute.stream_command([sys.executable, '-c', 'for i in range(100000): print(i)'],
+                                         head_lines=10, tail_lines=10)
+        lines = [line for _, line in command]
+        self.assertEqual(len(lines), 100000)
+        self.assertEqual(lines[-1], '99999\n')
+        self.assertEqual(command.windows['stdout'].line_count, 100000)
+        self.assertEqual(command.windows['stdout'].omitted_line_count, 100000 - 20)
+        self.assertEqual(command.out.splitlines()[-1], '99999')
+        self.assertEqual(command.returncode, 0)
+
+    def test_stream_command_returns_non_ascii_output_as_text(self):
+        out, err, returncode = execute.stream_command([sys.executable, '-c',
+            'import os; os.write(1, b"caf\\xc3\\xa9\\n")']).run()
+        self.assertEqual(out, u'caf\xe9')
+        self.assertIsInstance(out, six.text_type)
+        self.assertEqual(returncode, 0)
+
+    def test_stream_command_bounds_output_without_newlines(self):
+        size = 8 * execute.MAX_PARTIAL_LINE_LENGTH
+        command = execute.stream_command([sys.executable, '-c', 'import sys; sys.stdout.write("o" * {0})'.format(size)],
+                                         head_lines=1, tail_lines=1)
+        pieces = [text for _, text in command]
+        self.assertEqual(sum(len(p) for p in pieces), size)
+        self.assertTrue(all(len(p) <= execute.MAX_PARTIAL_LINE_LENGTH for p in pieces))
+        self.assertEqual(command.windows['stdout'].line_count, 8)
+
+    def test_stream_command_checks_the_return_code(self):
+        command = execute.stream_command([sys.executable, '-c', 'import sys; sys.exit(2)'])
+        self.assertRaises(IrodsError, command.run)
+        self.assertEqual(command.returncode, 2)
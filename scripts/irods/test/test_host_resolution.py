@@ -0,0 +1,73 @@
+import socket
+import sys
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+from .. import host_resolution
+from .patching import counting_calls
+
+
+class Configuration(object):
+    def __init__(self, server_config, hosts_config):
+        self.server_config = server_config
+        self.hosts_config = hosts_config
+
+class Test_Host_Resolver(unittest.TestCase):
+
+    def setUp(self):
+        self.resolver = host_resolution.HostResolver()
+
+    def test_local_hostnames(self):
+        self.assertTrue(self.resolver.resolves_to_local_address('localhost'))
+        self.assertTrue(self.resolver.resolves_to_local_address('127.0.0.1'))
+        self.assertTrue(self.resolver.resolves_to_local_address(self.resolver.get_hostname()))
+        self.assertFalse(self.resolver.resolves_to_local_address('192.0.2.1'))
+
+    def test_lookups_are_cached_until_refreshed(self):
+        with counting_calls(socket, 'getaddrinfo') as calls:
+            for _ in range(10):
+                self.resolver.get_hostname()
+                self.resolver.resolves_to_local_address('localhost')
+            self.assertEqual(len(calls), 2)
+            self.resolver.get_hostname(refresh=True)
+            self.resolver.resolves_to_local_address('localhost', refresh=True)
+            self.assertEqual(len(calls), 4)
+            self.resolver.invalidate()
+            self.resolver.resolves_to_local_address('localhost')
+            self.assertEqual(len(calls), 5)
+
+    def test_expired_entries_are_looked_up_again(self):
+        self.resolver.ttl = 0
+        with counting_calls(socket, 'getaddrinfo') as calls:
+            self.resolver.resolves_to_local_address('localhost')
+            self.resolver.resolves_to_local_address('localhost')
+        self.assertEqual(len(calls), 2)
+
+    def test_resolve_all_loads_local_addresses_once(self):
+        hostnames = ['localhost', '127.0.0.1', '192.0.2.1', 'localhost']
+        with counting_calls(host_resolution, 'get_local_addresses_with_psutil') as local_address_loads, \
+                counting_calls(socket, 'getaddrinfo') as lookups:
+            results = self.resolver.resolve_all(hostnames, refresh=True)
+        self.assertEqual(results, {
+            'localhost': {'local': True},
+            '127.0.0.1': {'local': True},
+            '192.0.2.1': {'local': False}})
+        self.assertEqual(len(local_address_loads), 1)
+        self.assertEqual(len(lookups), 3)
+
+    def test_resolve_all_reports_unresolvable_hosts(self):
+        results = self.resolver.resolve_all(['localhost', 'unresolvable.invalid'])
+        self.assertEqual(results['localhost'], {'local': True})
+        self.assertIn('unresolvable.invalid', results['unresolvable.invalid']['error'])
+
+    def test_configured_hostnames(self):
+        irods_config = Configuration(
+            {'catalog_provider_hosts': ['provider.example.org']},
+            {'host_entries': [
+                {'address_type': 'local', 'addresses': [{'address': 'localhost'}, {'address': '127.0.0.1'}]},
+                {'address_type': 'remote', 'addresses': [{'address': '192.0.2.1'}]}]})
+        self.assertEqual(host_resolution.get_configured_hostnames(irods_config),
+                         ['provider.example.org', 'localhost', '127.0.0.1', '192.0.2.1'])
@@ -29,6 +29,27 @@ class Test_Irodsctl(unittest.TestCase):
         assert not lib.re_shm_exists(), lib.re_shm_exists()
         IrodsController().start()
 
+    def test_shm_reports_rule_engine_cache_segments(self):
+        irodsctl_fullpath = os.path.join(IrodsConfig().irods_directory, 'irodsctl')
+        if 'irods_rule_engine_plugin-irods_rule_language' in IrodsConfig().configured_rule_engine_plugins:
+            assert_command([irodsctl_fullpath, 'shm'], 'STDOUT_SINGLELINE', ['Total:', '0 orphaned segments'])
+        else:
+            assert_command([irodsctl_fullpath, 'shm'], 'STDOUT_SINGLELINE', 'Total:')
+
+    def test_graceful_restart_drains_agents(self):
+        irodsctl_fullpath = os.path.join(IrodsConfig().irods_directory, 'irodsctl')
+        assert_command([irodsctl_fullpath, 'graceful_restart', '--drain-timeout=30'], 'STDOUT_SINGLELINE', 'proceeding with restart')
+        assert IrodsController().get_binary_to_pids_dict(refresh=True)
+
+    def test_status_json_reports_process_metrics(self):
+        irodsctl_fullpath = os.path.join(IrodsConfig().irods_directory, 'irodsctl')
+        _, out, _ = assert_command([irodsctl_fullpath, 'status', '--json'], 'STDOUT_SINGLELINE', 'aggregates')
+        status = json.loads(out)
+        roles = [p['role'] for p in status['processes']]
+        assert 'server' in roles, roles
+        assert status['aggregates']['agent_count'] == roles.count('agent')
+        assert status['aggregates']['total_rss'] == sum(p['rss'] for p in status['processes'])
+
     def test_configuration_schema_validation_from_file(self):
         with lib.file_backed_up(IrodsConfig().server_config_path) as server_config_filename:
             server_config = lib.open_and_load_json(server_config_filename)
@@ -0,0 +1,43 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+from .. import json_validation
+
+
+class Test_Schema_Store(unittest.TestCase):
+    schema = {'type': 'object', 'properties': {'zone_name': {'type': 'string'}}}
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.seed_directory = os.path.join(self.directory, 'configuration_schemas')
+        self.cache_directory = os.path.join(self.directory, 'schema_cache')
+        os.makedirs(os.path.join(self.seed_directory, 'v3'))
+        with open(os.path.join(self.seed_directory, 'v3', 'server_config.json'), 'wt') as f:
+            json.dump(self.schema, f)
+        self.store = json_validation.SchemaStore(cache_directory=self.cache_directory,
+                                                 seed_directory=self.seed_directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_official_schemas_are_seeded_without_a_download(self):
+        schema_uri = json_validation.OFFICIAL_SCHEMA_BASE_URIS[0] + '/v3/server_config.json'
+        self.assertEqual(self.store.get(schema_uri + '#'), self.schema)
+        self.assertEqual(self.store.load_cache_entry(schema_uri)['schema'], self.schema)
+
+    def test_custom_base_uri_is_not_seeded(self):
+        schema_uri = 'https://schemas.example.org/irods/v3/server_config.json'
+        self.assertIsNone(self.store.load_seed_entry(schema_uri))
+        self.assertIsNone(self.store.load_cache_entry(schema_uri))
+
+    def test_prefix_of_official_base_uri_is_not_seeded(self):
+        schema_uri = json_validation.OFFICIAL_SCHEMA_BASE_URIS[0] + '_mirror/v3/server_config.json'
+        self.assertIsNone(self.store.load_seed_entry(schema_uri))
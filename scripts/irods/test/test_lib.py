@@ -0,0 +1,53 @@
+import sys
+import threading
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+from .. import lib
+from ..exceptions import IrodsError
+from .patching import counting_calls
+
+
+def max_concurrency(results):
+    events = sorted([(r.start_time, 1) for r in results] + [(r.end_time, -1) for r in results])
+    running = peak = 0
+    for _, change in events:
+        running += change
+        peak = max(peak, running)
+    return peak
+
+class Test_Execute_Commands_Parallel(unittest.TestCase):
+
+    def test_independent_commands_overlap_and_dependents_wait(self):
+        commands = [['sleep', '0.2'] for _ in range(4)] + [['true']]
+        results = lib.execute_commands_parallel(commands, {4: range(4)}, max_workers=4)
+        self.assertTrue(all(r.succeeded for r in results))
+        self.assertLess(max(r.start_time for r in results[:4]), min(r.end_time for r in results[:4]))
+        self.assertGreaterEqual(results[4].start_time, max(r.end_time for r in results[:4]))
+
+    def test_fixed_number_of_workers(self):
+        commands = [['sleep', '0.05'] for _ in range(12)]
+        with counting_calls(threading.Thread, 'start') as starts:
+            results = lib.execute_commands_parallel(commands, max_workers=3)
+        self.assertEqual(len(starts), 3)
+        self.assertTrue(all(r.succeeded for r in results))
+        self.assertLessEqual(max_concurrency(results), 3)
+
+    def test_failures_skip_dependents(self):
+        commands = [['false'], ['true'], ['true'], ['true']]
+        results = lib.execute_commands_parallel(commands, {1: [0], 2: [1], 3: []})
+        self.assertEqual([r.skipped for r in results], [False, True, True, False])
+        self.assertEqual([r.returncode for r in results], [1, None, None, 0])
+        results = lib.execute_commands_parallel(commands, {1: [0], 2: [1]}, skip_dependents_of_failures=False)
+        self.assertEqual([r.returncode for r in results], [1, 0, 0, 0])
+
+    def test_no_commands(self):
+        self.assertEqual(lib.execute_commands_parallel([]), [])
+
+    def test_invalid_arguments_are_rejected(self):
+        self.assertRaises(IrodsError, lib.execute_commands_parallel, [['true']], max_workers=0)
+        self.assertRaises(IrodsError, lib.execute_commands_parallel, [['true'], ['true']], {0: [1], 1: [0]})
+        self.assertRaises(IrodsError, lib.execute_commands_parallel, [['true']], {0: [1]})
@@ -0,0 +1,105 @@
+import json
+import logging
+import sys
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+from .. import log as irods_log
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        super(RecordingHandler, self).__init__()
+        self.records = []
+        self.messages = []
+
+    def emit(self, record):
+        self.records.append(record)
+        self.messages.append(self.format(record))
+
+class Test_Asynchronous_Handler(unittest.TestCase):
+
+    def setUp(self):
+        self.recording_handler = RecordingHandler()
+        self.handler = irods_log.AsynchronousHandler(self.recording_handler)
+        self.logger = logging.getLogger('irods.test.test_log.{0}'.format(id(self)))
+        self.logger.propagate = False
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.addHandler(self.handler)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        self.handler.close()
+
+    def test_arguments_are_rendered_when_logged(self):
+        command = ['iput', 'a']
+        options = {'cwd': '/tmp'}
+        self.logger.debug('Calling %s with options:\n%s', command, irods_log.deferred_pformat(options))
+        self.logger.debug('%(count)s files', {'count': [1]})
+        command.append('b')
+        options['cwd'] = '/var/tmp'
+        self.handler.flush()
+        self.assertEqual(self.recording_handler.messages, [
+            "Calling ['iput', 'a'] with options:\n{'cwd': '/tmp'}",
+            '[1] files'])
+
+    def test_mutable_extras_are_copied_when_logged(self):
+        command = ['iput', 'a']
+        self.logger.debug('done', extra={'command': command, 'returncode': 0})
+        command.append('b')
+        self.handler.flush()
+        record = self.recording_handler.records[0]
+        self.assertEqual((record.command, record.returncode), (['iput', 'a'], 0))
+
+    def test_exceptions_are_rendered_when_logged(self):
+        try:
+            raise ValueError('bad value')
+        except ValueError:
+            self.logger.error('failed', exc_info=True)
+        self.handler.flush()
+        record = self.recording_handler.records[0]
+        self.assertIsNone(record.exc_info)
+        self.assertIn('ValueError: bad value', record.exc_text)
+        self.assertIn('ValueError: bad value', self.recording_handler.messages[0])
+
+    def test_close_writes_queued_records(self):
+        for i in range(100):
+            self.logger.info('record %d', i)
+        self.logger.removeHandler(self.handler)
+        self.handler.close()
+        self.assertEqual(self.recording_handler.messages, ['record {0}'.format(i) for i in range(100)])
+
+class Test_Json_Lines_Formatter(unittest.TestCase):
+
+    def make_record(self, msg, args, exc_info=None, **extra):
+        record = logging.LogRecord('irods.test', logging.WARNING, '/path/to/execute.py', 42, msg, args, exc_info)
+        record.__dict__.update(extra)
+        return record
+
+    def test_fields(self):
+        line = irods_log.JsonLinesFormatter().format(self.make_record(
+            'Called %s', (['true'],), command=['true'], returncode=0, duration=0.5, unrelated='x'))
+        d = json.loads(line)
+        self.assertEqual(d['message'], "Called ['true']")
+        self.assertEqual((d['level'], d['logger'], d['filename'], d['lineno']), ('WARNING', 'irods.test', 'execute.py', 42))
+        self.assertEqual((d['command'], d['returncode'], d['duration']), (['true'], 0, 0.5))
+        self.assertNotIn('unrelated', d)
+        self.assertTrue(d['time'].endswith('Z'))
+        self.assertNotIn('\n', line)
+
+    def test_exceptions(self):
+        try:
+            raise ValueError('bad value')
+        except ValueError:
+            record = self.make_record('failed', None, sys.exc_info())
+        self.assertIn('ValueError: bad value', json.loads(irods_log.JsonLinesFormatter().format(record))['exception'])
+        record = self.make_record('failed', None)
+        record.exc_text = 'rendered on another thread'
+        self.assertEqual(json.loads(irods_log.JsonLinesFormatter().format(record))['exception'], 'rendered on another thread')
+
+    def test_values_that_are_not_json_are_written_as_text(self):
+        d = json.loads(irods_log.JsonLinesFormatter().format(self.make_record('m', None, command=('a', object))))
+        self.assertEqual(d['command'], ['a', str(object)])
@@ -0,0 +1,118 @@
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+from .. import log_tailer
+from .patching import replaced
+
+
+class Test_Log_Tailer(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'tailed.log')
+        self.write(b'', 'wb')
+
+    def tearDown(self):
+        log_tailer.clear_tailers()
+        shutil.rmtree(self.directory)
+
+    def write(self, data, mode='ab', path=None):
+        with open(path or self.path, mode) as f:
+            f.write(data)
+
+    def assert_matches_whole_log_search(self, tailer, pattern, start_index=0):
+        # what searching the whole log from start_index finds, as the log helpers did before tailing
+        with open(self.path, 'rb') as f:
+            expected = [(m.span(), m.group(0), m.groups()) for m in pattern.finditer(f.read()[start_index:])]
+        self.assertEqual([(m.span(), m.group(0), m.groups()) for m in tailer.matches(pattern)], expected)
+
+    def test_counts_only_read_appended_data(self):
+        tailer = log_tailer.LogTailer(self.path, [log_tailer.StringPattern('MARKER')])
+        self.write(b'filler line\n' * 1000 + b'MARKER\n')
+        self.assertEqual(tailer.count('MARKER'), 1)
+        self.write(b'MAR')
+        self.assertEqual(tailer.count('MARKER'), 1)
+        self.write(b'KER MARKER\n')
+        self.assertEqual(tailer.count('MARKER'), 3)
+        self.assertEqual(tailer.update(), 0)
+        self.write(b'filler\n')
+        self.assertEqual(tailer.update(), len(b'filler\n'))
+
+    def test_string_occurrences_spanning_reads_and_overlapping(self):
+        self.write(b'aaaa MARKER MARKER aaaa')
+        with replaced(log_tailer, 'READ_SIZE', 3):
+            tailer = log_tailer.LogTailer(self.path, [log_tailer.StringPattern('MARKER'), log_tailer.StringPattern('aa')])
+            self.assertEqual(tailer.count('MARKER'), 2)
+            self.assertEqual(tailer.count('aa'), 6)
+
+    def test_start_index(self):
+        self.write(b'MARKER\nMARKER\n')
+        tailer = log_tailer.LogTailer(self.path, [log_tailer.StringPattern('MARKER')], start_index=len(b'MARKER\n'))
+        self.assertEqual(tailer.count('MARKER'), 1)
+
+    def test_regexp_matches_equal_a_whole_log_search(self):
+        patterns = [
+            re.compile(br'id \[(\d+)\]'),
+            re.compile(br'^line'),
+            re.compile(br'^line', re.MULTILINE),
+            re.compile(br'last$'),
+            re.compile(br'BEGIN.*?END', re.DOTALL),
+            re.compile(br'\d+\n\w+')]
+        self.write(b'line id [1]\nline id [22]\nBEGIN\nspans\nreads END\nline 3\nline 44\nid [5] last')
+        with replaced(log_tailer, 'READ_SIZE', 5):
+            for start_index in [0, 5]:
+                tailer = log_tailer.LogTailer(self.path, [log_tailer.RegexpPattern(p) for p in patterns], start_index)
+                for pattern in patterns:
+                    self.assert_matches_whole_log_search(tailer, pattern, start_index)
+                self.write(b'\nline id [6] last')
+                for pattern in patterns:
+                    self.assert_matches_whole_log_search(tailer, pattern, start_index)
+
+    def test_regexp_pattern_forms(self):
+        self.write(b'Value: 1\nvalue: 2\n')
+        self.assertEqual(len(log_tailer.find_occurrences_of_regexp(self.path, 'value: (\\d)')), 1)
+        self.assertEqual(len(log_tailer.find_occurrences_of_regexp(self.path, ('value: (\\d)', re.IGNORECASE))), 2)
+        self.assertEqual([m.group(1) for m in log_tailer.find_occurrences_of_regexp(self.path, re.compile(u'alue: (\\d)'))],
+                         [b'1', b'2'])
+
+    def test_counts_follow_truncation_and_rotation(self):
+        self.write(b'RESET_MARKER\n' * 2)
+        self.assertEqual(log_tailer.count_occurrences_of_string(self.path, 'RESET_MARKER'), 2)
+        # truncated, then regrown past the previous offset before the next count
+        self.write(b'filler line\n' * 10 + b'RESET_MARKER\n', 'wb')
+        self.assertEqual(log_tailer.count_occurrences_of_string(self.path, 'RESET_MARKER'), 1)
+        os.rename(self.path, self.path + '.1')
+        self.write(b'filler line\n', 'wb')
+        self.assertEqual(log_tailer.count_occurrences_of_string(self.path, 'RESET_MARKER'), 0)
+
+    def test_rewrite_in_place_of_the_same_length_is_detected(self):
+        self.write(b'MARKER\n')
+        self.assertEqual(log_tailer.count_occurrences_of_string(self.path, 'MARKER'), 1)
+        with open(self.path, 'r+b') as f:
+            f.write(b'filler\n' + b'MARKER\n')
+        self.assertEqual(log_tailer.count_occurrences_of_string(self.path, 'MARKER'), 1)
+        self.assertEqual(len(log_tailer.find_occurrences_of_regexp(self.path, '^filler')), 1)
+
+    def test_missing_log(self):
+        os.unlink(self.path)
+        self.assertEqual(log_tailer.count_occurrences_of_string(self.path, 'MARKER'), 0)
+        self.write(b'MARKER\n')
+        self.assertEqual(log_tailer.count_occurrences_of_string(self.path, 'MARKER'), 1)
+
+    def test_wait_returns_when_message_is_written(self):
+        timer = threading.Timer(0.2, self.write, [b'WAIT_MARKER\n'])
+        timer.start()
+        try:
+            self.assertTrue(log_tailer.wait_for_occurrences_of_string(self.path, 'WAIT_MARKER', timeout=30))
+        finally:
+            timer.join()
+        self.assertFalse(log_tailer.wait_for_occurrences_of_string(self.path, 'WAIT_MARKER', count=2, timeout=0.2))
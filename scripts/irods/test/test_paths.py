@@ -0,0 +1,81 @@
+import grp
+import inspect
+import os
+import pwd
+import shutil
+import sys
+import tempfile
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+from .. import paths
+from .patching import counting_calls, fail_if_called, replaced
+
+
+class Test_Paths(unittest.TestCase):
+
+    def setUp(self):
+        paths.invalidate()
+        self.directory = tempfile.mkdtemp()
+        self.service_account_file = os.path.join(self.directory, 'service_account.config')
+        self.user = pwd.getpwuid(os.getuid())
+        self.group = grp.getgrgid(os.getgid())
+        self.write_service_account_file()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        paths.invalidate()
+
+    def write_service_account_file(self, extra=''):
+        with open(self.service_account_file, 'wt') as f:
+            f.write('IRODS_SERVICE_ACCOUNT_NAME={0}\nIRODS_SERVICE_GROUP_NAME={1}\n{2}'.format(
+                self.user.pw_name, self.group.gr_name, extra))
+
+    def test_scripts_directory_does_not_inspect_the_stack(self):
+        with replaced(inspect, 'stack', fail_if_called):
+            self.assertEqual(paths.scripts_directory(),
+                             os.path.dirname(os.path.dirname(os.path.abspath(paths.__file__))))
+
+    def test_derived_paths_are_resolved_once(self):
+        expected = paths.server_config_path()
+        with counting_calls(os.path, 'abspath') as calls:
+            for _ in range(100):
+                self.assertEqual(paths.server_config_path(), expected)
+                paths.scripts_directory()
+                paths.root_directory()
+        self.assertEqual(len(calls), 0)
+
+    def test_invalidate_resolves_again(self):
+        paths.scripts_directory()
+        paths.invalidate()
+        with counting_calls(os.path, 'abspath') as calls:
+            paths.scripts_directory()
+            paths.scripts_directory()
+        self.assertEqual(len(calls), 1)
+
+    def test_service_account_entries_are_looked_up_once(self):
+        with replaced(paths, 'service_account_file_path', lambda: self.service_account_file), \
+                counting_calls(pwd, 'getpwnam') as user_lookups, \
+                counting_calls(grp, 'getgrnam') as group_lookups:
+            for _ in range(100):
+                self.assertEqual(paths.irods_user(), self.user.pw_name)
+                self.assertEqual(paths.irods_group(), self.group.gr_name)
+                self.assertEqual(paths.home_directory(), self.user.pw_dir)
+                self.assertEqual(paths.irods_uid(), self.user.pw_uid)
+                self.assertEqual(paths.irods_gid(), self.group.gr_gid)
+        self.assertEqual(len(user_lookups), 1)
+        self.assertEqual(len(group_lookups), 1)
+
+    def test_service_account_entries_follow_file_changes(self):
+        with replaced(paths, 'service_account_file_path', lambda: self.service_account_file), \
+                counting_calls(pwd, 'getpwnam') as user_lookups, \
+                counting_calls(grp, 'getgrnam') as group_lookups:
+            paths.irods_user()
+            self.write_service_account_file(extra='# edited\n')
+            paths.irods_user()
+            paths.irods_user()
+        self.assertEqual(len(user_lookups), 2)
+        self.assertEqual(len(group_lookups), 2)
@@ -0,0 +1,101 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+from .. import configuration
+from .. import paths
+from .. import preflight
+from .. import startup
+from ..configuration import IrodsConfig, JsonConfigCache
+from ..controller import IrodsController
+from ..exceptions import IrodsWarning
+from .patching import fail_if_called, replaced
+
+
+class Test_Preflight(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.fingerprint_path = os.path.join(self.directory, '.preflight_fingerprint.json')
+        self.files = {}
+        for name in ['server_config', 'version', 'hosts_config', 'host_access_control_config']:
+            self.files[name] = os.path.join(self.directory, name + '.json')
+            self.write(name, {})
+        self.write('server_config', {'catalog_service_role': 'consumer', 'log_level': {'server': 'info'}})
+        self.patches = [
+            replaced(configuration, 'json_config_cache', JsonConfigCache()),
+            replaced(paths, 'preflight_fingerprint_path', lambda: self.fingerprint_path)]
+        for name, path in self.files.items():
+            self.patches.append(replaced(paths, name + '_path', lambda path=path: path))
+        for patch in self.patches:
+            patch.__enter__()
+        self.irods_config = IrodsConfig(injected_environment={
+            'IRODS_ENVIRONMENT_FILE': os.path.join(self.directory, 'irods_environment.json')})
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.__exit__(None, None, None)
+        shutil.rmtree(self.directory)
+
+    def write(self, name, value):
+        with open(self.files[name], 'wt') as f:
+            json.dump(value, f)
+
+    def test_fingerprint_follows_file_changes(self):
+        self.assertFalse(preflight.fingerprint_unchanged(self.irods_config))
+        preflight.save_fingerprint(self.irods_config)
+        self.assertTrue(preflight.fingerprint_unchanged(self.irods_config))
+        self.write('hosts_config', {'host_entries': []})
+        self.assertFalse(preflight.fingerprint_unchanged(self.irods_config))
+
+    def test_snapshot_describes_the_files_when_it_was_taken(self):
+        fingerprint = preflight.compute_fingerprint(self.irods_config)
+        self.write('hosts_config', {'host_entries': []})
+        preflight.write_fingerprint(fingerprint)
+        self.assertFalse(preflight.fingerprint_unchanged(self.irods_config))
+
+    def test_invalidate_tolerates_missing_and_unremovable_fingerprints(self):
+        preflight.invalidate_fingerprint()
+        preflight.save_fingerprint(self.irods_config)
+        preflight.invalidate_fingerprint()
+        self.assertFalse(os.path.exists(self.fingerprint_path))
+        os.mkdir(self.fingerprint_path)
+        preflight.invalidate_fingerprint()
+
+    def test_unchanged_installation_skips_checks(self):
+        preflight.save_fingerprint(self.irods_config)
+        controller = IrodsController(self.irods_config)
+        timeline = startup.StartupTimeline()
+        with replaced(controller, 'upgrade_if_required', fail_if_called), \
+                replaced(self.irods_config, 'validate_configuration', fail_if_called):
+            self.assertEqual(controller.run_preflight_checks(timeline), (True, False))
+        self.assertEqual([(p['phase'], p['status']) for p in timeline.phases],
+                         [('preflight_fingerprint', 'ok'), ('upgrade_check', 'skipped'), ('validation', 'skipped')])
+        self.assertTrue(os.path.exists(self.fingerprint_path))
+
+    def test_full_preflight_ignores_the_fingerprint(self):
+        preflight.save_fingerprint(self.irods_config)
+        controller = IrodsController(self.irods_config)
+        timeline = startup.StartupTimeline()
+        calls = []
+        with replaced(preflight, 'fingerprint_unchanged', fail_if_called), \
+                replaced(controller, 'upgrade_if_required', lambda: calls.append('upgrade_check')), \
+                replaced(self.irods_config, 'validate_configuration', lambda: calls.append('validation')):
+            self.assertEqual(controller.run_preflight_checks(timeline, full_preflight=True), (False, True))
+        self.assertEqual(calls, ['upgrade_check', 'validation'])
+        self.assertFalse(os.path.exists(self.fingerprint_path))
+
+    def test_validation_warning_is_not_fingerprinted(self):
+        def warn():
+            raise IrodsWarning('skipped validation')
+        controller = IrodsController(self.irods_config)
+        with replaced(controller, 'upgrade_if_required', lambda: None), \
+                replaced(self.irods_config, 'validate_configuration', warn):
+            self.assertEqual(controller.run_preflight_checks(startup.StartupTimeline()), (False, False))
@@ -0,0 +1,35 @@
+import argparse
+import optparse
+import sys
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+from .. import profiling
+
+
+class Test_Profiling_Options(unittest.TestCase):
+    argv = ['--profile', 'cpu', '--profile-threshold=0.5']
+
+    def test_optparse_entry_points_accept_profiling_options(self):
+        parser = optparse.OptionParser()
+        profiling.add_options(parser)
+        options, _ = parser.parse_args(self.argv)
+        self.assertEqual((options.profile, options.profile_threshold), ('cpu', 0.5))
+
+    def test_argparse_entry_points_accept_profiling_options(self):
+        parser = argparse.ArgumentParser()
+        parser.add_argument('-d', '--dry-run', action='store_true', dest='dry_run')
+        profiling.add_arguments(parser)
+        args = parser.parse_args(['-d'] + self.argv)
+        self.assertEqual((args.dry_run, args.profile, args.profile_threshold), (True, 'cpu', 0.5))
+
+    def test_settings_are_read_before_the_entry_point_parses_its_options(self):
+        self.assertEqual(profiling.get_profile_settings(['-d'] + self.argv, {}),
+                         {'profile': 'cpu', 'profile_threshold': 0.5})
+        self.assertEqual(profiling.get_profile_settings([], {profiling.PROFILE_ENVIRONMENT_VARIABLE: 'memory'}),
+                         {'profile': 'memory', 'profile_threshold': None})
+        self.assertEqual(profiling.get_profile_settings(['--profile', 'disk'], {}),
+                         {'profile': None, 'profile_threshold': None})
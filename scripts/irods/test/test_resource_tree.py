@@ -3,7 +3,6 @@ from __future__ import print_function
 import json
 import random
 import socket
-import subprocess
 import sys
 if sys.version_info >= (2, 7):
     import unittest
@@ -38,27 +37,25 @@ def cleanup_resource_tree(filename):
     # load tree from file
     tree = lib.open_and_load_json(filename)
 
+    commands = []
+    dependencies = {}
+
     # REMOVE PARENT-CHILD RELATIONSHIPS
+    relationship_indices = {}
     for name, (_, _, children) in tree.items():
         for child in children:
-            # test
             print("iadmin rmchildfromresc {0} {1}".format(name, child))
+            for resource in [name, child]:
+                relationship_indices.setdefault(resource, []).append(len(commands))
+            commands.append(['iadmin', 'rmchildfromresc', name, child])
 
-            args = ['iadmin', 'rmchildfromresc', name, child]
-            # print(args)
-
-            # run command
-            subprocess.Popen(args).communicate()
-
-    # REMOVE RESOURCES
+    # REMOVE RESOURCES, each after the relationships it is part of
     for name in tree:
-        # test
         print("iadmin rmresc {0}".format(name))
+        dependencies[len(commands)] = relationship_indices.get(name, [])
+        commands.append(['iadmin', 'rmresc', name])
 
-        args = ['iadmin', 'rmresc', name]
-
-        # run command
-        subprocess.Popen(args).communicate()
+    lib.execute_commands_parallel(commands, dependencies, skip_dependents_of_failures=False)
 
     # DONE
     return 0
@@ -135,29 +132,25 @@ def make_resource_tree(width, max_depth):
     for name in tree.keys():
         print(name, tree[name])
 
+    commands = []
+    dependencies = {}
+
     # MAKE RESOURCES
+    mkresc_indices = {}
     for name in tree.keys():
-        # test
         print("iadmin mkresc {0} {1} {2}:/tmp/{0} {3}".format(name, tree[name][0], hostname, EMPTY_CTXT_STR))
-        args = ['iadmin', 'mkresc', name, tree[name][0],
-                "{0}:/tmp/{1}".format(hostname, name), EMPTY_CTXT_STR]
-        # print(args)
-
-        # run command
-        subprocess.Popen(args, stdout=subprocess.PIPE).communicate()
+        mkresc_indices[name] = len(commands)
+        commands.append(['iadmin', 'mkresc', name, tree[name][0],
+                         "{0}:/tmp/{1}".format(hostname, name), EMPTY_CTXT_STR])
 
-    # ADD PARENT-CHILD RELATIONSHIPS
+    # ADD PARENT-CHILD RELATIONSHIPS, each after both resources exist
     for name in tree.keys():
-        children = tree[name][2]
-        if len(children):
-            for child in children:
-                # test
-                print("iadmin addchildtoresc {0} {1}".format(name, child))
-                args = ['iadmin', 'addchildtoresc', name, child]
-                # print(args)
-
-                # run command
-                subprocess.Popen(args).communicate()
+        for child in tree[name][2]:
+            print("iadmin addchildtoresc {0} {1}".format(name, child))
+            dependencies[len(commands)] = [mkresc_indices[name], mkresc_indices[child]]
+            commands.append(['iadmin', 'addchildtoresc', name, child])
+
+    lib.execute_commands_parallel(commands, dependencies)
 
     # store in file for later teardown
     with open('resourcetree.json', 'wt') as f:
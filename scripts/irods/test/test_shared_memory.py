@@ -0,0 +1,47 @@
+import os
+import shutil
+import sys
+import tempfile
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+from .. import lib
+from .. import shared_memory
+from .patching import replaced
+
+
+class Test_Shared_Memory(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def make_entry(self, name):
+        path = os.path.join(self.directory, name)
+        with open(path, 'wb') as f:
+            f.write(b'\0' * 16)
+        return path
+
+    def test_segments_are_indexed_by_pid(self):
+        first = self.make_entry('irods_re_cache_shared_memory_irods_ruleset_pid123_salt')
+        second = self.make_entry('irods_re_cache_mutex_pid123_salt')
+        third = self.make_entry('irods_re_cache_shared_memory_irods_ruleset_pid456_salt')
+        self.make_entry('unrelated_irods_segment')
+        with replaced(shared_memory, 'shared_memory_directories', lambda: [self.directory]):
+            segments_by_pid = shared_memory.index_segments_by_pid(shared_memory.scan_re_cache_segments())
+        self.assertEqual(sorted(segments_by_pid), [123, 456])
+        self.assertEqual(sorted(s.path for s in segments_by_pid[123]), sorted([first, second]))
+        self.assertEqual([s.path for s in segments_by_pid[456]], [third])
+        self.assertEqual(segments_by_pid[456][0].size, 16)
+
+    def test_re_shm_exists_ignores_unrelated_entries(self):
+        self.make_entry('unrelated_irods_segment')
+        with replaced(shared_memory, 'shared_memory_directories', lambda: [self.directory]):
+            self.assertFalse(lib.re_shm_exists())
+            path = self.make_entry('irods_re_cache_shared_memory_irods_ruleset_pid123_salt')
+            self.assertEqual(lib.re_shm_exists(), path)
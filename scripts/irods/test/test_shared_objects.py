@@ -0,0 +1,68 @@
+import os
+import shutil
+import sys
+import tempfile
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+from .. import execute
+from .. import shared_objects
+from .patching import counting_calls
+
+
+class Test_Shared_Object_Index(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.lib_directory = os.path.join(self.directory, 'lib')
+        self.nested_directory = os.path.join(self.lib_directory, 'nested')
+        os.makedirs(self.nested_directory)
+        self.make_file(self.lib_directory, 'libirods_test_index.so.1')
+        self.make_file(self.nested_directory, 'libirods_test_index.so.2')
+        # os.walk does not descend into symlinks to directories, and neither does the index
+        os.symlink(self.nested_directory, os.path.join(self.lib_directory, 'linked'))
+        self.index = shared_objects.SharedObjectIndex()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def make_file(self, directory, name):
+        with open(os.path.join(directory, name), 'wb'):
+            pass
+        # a distinct mtime, so the change is seen even on file systems with coarse timestamps
+        mtime = os.stat(directory).st_mtime + 10
+        os.utime(directory, (mtime, mtime))
+
+    def find(self):
+        return self.index.find(r'libirods_test_index\.so.*', regex=True, additional_directories=[self.lib_directory])
+
+    def test_finds_matches_in_additional_directories(self):
+        self.assertEqual(sorted(self.find()), [
+            os.path.join(self.lib_directory, 'libirods_test_index.so.1'),
+            os.path.join(self.nested_directory, 'libirods_test_index.so.2')])
+        self.assertEqual(self.index.find('libirods_test_index.so.1', additional_directories=[self.lib_directory]),
+                         [os.path.join(self.lib_directory, 'libirods_test_index.so.1')])
+
+    def test_repeated_lookups_do_not_rescan(self):
+        first = self.find()
+        with counting_calls(shared_objects, 'scan_directory') as scans, \
+                counting_calls(execute, 'execute_command_permissive') as commands:
+            for _ in range(5):
+                self.assertEqual(self.find(), first)
+        self.assertEqual(len(scans), 0)
+        self.assertEqual(len(commands), 0)
+
+    def test_changed_directories_are_rescanned(self):
+        self.find()
+        self.make_file(self.nested_directory, 'libirods_test_index.so.3')
+        with counting_calls(shared_objects, 'scan_directory') as scans:
+            self.assertIn(os.path.join(self.nested_directory, 'libirods_test_index.so.3'), self.find())
+        self.assertEqual([args[0] for args in scans], [self.nested_directory])
+
+    def test_elf_class_is_read_from_header(self):
+        self.assertIn(shared_objects.get_elf_class(os.path.realpath(sys.executable)), [32, 64])
+        self.assertIsNone(shared_objects.get_elf_class(os.path.abspath(__file__)))
+        self.assertIsNone(shared_objects.get_elf_class(os.path.join(self.directory, 'missing')))
@@ -1,9 +1,13 @@
 from __future__ import print_function
 
+import contextlib
+import inspect
 import os
 import shutil
 import subprocess
 import sys
+import tempfile
+import timeit
 from threading import Timer
 import ustrings
 
@@ -13,11 +17,18 @@ else:
     import unittest
 
 from ..configuration import IrodsConfig
+from ..exceptions import IrodsError
 from .. import test
 from .. import lib
+from .. import paths
+from .. import six
 from .resource_suite import ResourceBase
 from . import session
 
+def benchmark(f):
+    # benchmarks report durations instead of asserting on them, so they only run on request
+    return unittest.skipUnless(os.environ.get('IRODS_RUN_BENCHMARKS') == '1',
+                               'set IRODS_RUN_BENCHMARKS=1 to run benchmarks')(f)
 
 class Test_Resource_Replication_Timing(ResourceBase, unittest.TestCase):
     plugin_name = IrodsConfig().default_rule_engine_plugin
@@ -135,3 +146,312 @@ class Test_Resource_Replication_Timing(ResourceBase, unittest.TestCase):
             self.admin.assert_icommand(['iput', '-R', replica_0_resc, '-f', '-n', str(repl_num), filename, data_obj_name])
         # restore to replication hierarchy
         self.admin.assert_icommand(['iadmin', 'addchildtoresc', 'demoResc', replica_0_resc])
+
+
+class Test_Path_Resolution_Timing(unittest.TestCase):
+    iterations = 10000
+
+    def per_call_microseconds(self, f):
+        return timeit.timeit(f, number=self.iterations) / self.iterations * 1e6
+
+    @benchmark
+    def test_path_registry_per_call_cost(self):
+        def uncached_server_config_path():
+            scripts_directory = os.path.dirname(os.path.dirname(os.path.abspath(inspect.stack()[0][1])))
+            root_directory = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(scripts_directory))))
+            return os.path.join(root_directory, 'etc', 'irods', 'server_config.json')
+
+        def cold_server_config_path():
+            paths.invalidate()
+            return paths.server_config_path()
+
+        before = self.per_call_microseconds(uncached_server_config_path)
+        cold = self.per_call_microseconds(cold_server_config_path)
+        after = self.per_call_microseconds(paths.server_config_path)
+        print('server_config_path: inspect.stack() {0:.2f}us, registry cold {1:.2f}us, registry warm {2:.2f}us'.format(before, cold, after))
+
+    @benchmark
+    def test_service_account_lookup_per_call_cost(self):
+        def uncached_irods_user():
+            paths.invalidate()
+            return paths.irods_user()
+
+        before = self.per_call_microseconds(uncached_irods_user)
+        after = self.per_call_microseconds(paths.irods_user)
+        print('irods_user: uncached {0:.2f}us, registry {1:.2f}us'.format(before, after))
+
+class Test_Host_Resolution_Timing(unittest.TestCase):
+
+    @benchmark
+    def test_get_hostname_per_call_cost(self):
+        start_time = timeit.default_timer()
+        lib.get_hostname(refresh=True)
+        uncached = timeit.default_timer() - start_time
+        cached = timeit.timeit(lib.get_hostname, number=1000) / 1000
+        print('get_hostname: uncached {0:.6f}s, cached {1:.6f}s'.format(uncached, cached))
+
+    @benchmark
+    def test_resolve_configured_hosts(self):
+        from .. import host_resolution
+        irods_config = IrodsConfig()
+        hostnames = host_resolution.get_configured_hostnames(irods_config)
+        start_time = timeit.default_timer()
+        for hostname in set(hostnames):
+            try:
+                lib.hostname_resolves_to_local_address(hostname, refresh=True)
+            except IrodsError:
+                pass
+        serial_duration = timeit.default_timer() - start_time
+        start_time = timeit.default_timer()
+        host_resolution.resolve_configured_hosts(irods_config, refresh=True)
+        print('{0} configured hosts: one at a time {1:.3f}s, resolve_all {2:.3f}s'.format(
+            len(set(hostnames)), serial_duration, timeit.default_timer() - start_time))
+
+class Test_Shared_Object_Index_Timing(unittest.TestCase):
+
+    @benchmark
+    def test_repeated_lookups_reuse_index(self):
+        from .. import shared_objects
+        shared_objects.invalidate()
+        start_time = timeit.default_timer()
+        lib.find_shared_object(r'libc\.so.*', regex=True)
+        cold_duration = timeit.default_timer() - start_time
+        start_time = timeit.default_timer()
+        lib.find_shared_object(r'libc\.so.*', regex=True)
+        warm_duration = timeit.default_timer() - start_time
+        print('find_shared_object: cold {0:.3f}s, warm {1:.3f}s'.format(cold_duration, warm_duration))
+
+class Test_Log_Tailer_Timing(unittest.TestCase):
+
+    @benchmark
+    def test_repeated_counts_scan_only_appended_data(self):
+        with tempfile.NamedTemporaryFile(mode='wt', suffix='.log') as f:
+            f.write('filler line\n' * 2000000)
+            f.flush()
+            start_time = timeit.default_timer()
+            lib.count_occurrences_of_string_in_log(f.name, 'TAILER_MARKER')
+            cold_duration = timeit.default_timer() - start_time
+            f.write('TAILER_MARKER\n')
+            f.flush()
+            start_time = timeit.default_timer()
+            lib.count_occurrences_of_string_in_log(f.name, 'TAILER_MARKER')
+            warm_duration = timeit.default_timer() - start_time
+            print('count_occurrences_of_string_in_log: cold {0:.3f}s, warm {1:.3f}s'.format(cold_duration, warm_duration))
+
+class Test_Execute_Timing(unittest.TestCase):
+
+    @benchmark
+    def test_execute_command_timeout_latency(self):
+        iterations = 50
+        duration = timeit.timeit(lambda: lib.execute_command_timeout(['true'], timeout=10), number=iterations)
+        print('execute_command_timeout([\'true\']): {0:.1f}ms per call'.format(duration / iterations * 1000))
+
+    @benchmark
+    def test_execute_command_timeout_large_output(self):
+        size = 4 * 1024 * 1024
+        start_time = timeit.default_timer()
+        lib.execute_command_timeout([sys.executable, '-c',
+            'import sys; sys.stdout.write("o" * {0}); sys.stderr.write("e" * {0})'.format(size)], timeout=60)
+        print('execute_command_timeout with {0} bytes on each pipe: {1:.3f}s'.format(size, timeit.default_timer() - start_time))
+
+    @benchmark
+    def test_execute_commands_parallel(self):
+        commands = [['sleep', '0.5'] for _ in range(8)] + [['true']]
+        for max_workers in [1, 8]:
+            start_time = timeit.default_timer()
+            lib.execute_commands_parallel(commands, {8: range(8)}, max_workers=max_workers)
+            print('{0} commands with {1} workers: {2:.3f}s'.format(len(commands), max_workers, timeit.default_timer() - start_time))
+
+@unittest.skipIf(test.settings.RUN_IN_TOPOLOGY, 'Connects to the catalog database')
+class Test_Catalog_Database_Timing(unittest.TestCase):
+    # a cross join of the token table is large enough to show the per-row cost on every database type
+    query = 'select t1.token_namespace, t1.token_name, t2.token_id from R_TOKN_MAIN t1, R_TOKN_MAIN t2'
+
+    def fetch_all(self, block_fetch):
+        from .. import database_connect
+        with contextlib.closing(database_connect.get_database_connection(IrodsConfig())) as connection:
+            with contextlib.closing(connection.cursor()) as cursor:
+                cursor.block_fetch = block_fetch
+                cursor.execute(self.query)
+                start_time = timeit.default_timer()
+                rows = [tuple(r) for r in cursor.fetchall()]
+                return rows, timeit.default_timer() - start_time
+
+    @benchmark
+    def test_block_fetch_against_per_row_fetch(self):
+        per_row_rows, per_row_duration = self.fetch_all(False)
+        block_rows, block_duration = self.fetch_all(True)
+        print('fetchall of {0} rows: per row {1:.3f}s, block {2:.3f}s'.format(
+            len(block_rows), per_row_duration, block_duration))
+
+    @benchmark
+    def test_executemany_against_per_row_execute(self):
+        from .. import database_connect
+        # matches no rows, so the catalog is left untouched
+        statement = 'update R_TOKN_MAIN set token_value3 = token_value3 where token_id = ?'
+        params_list = [(-i,) for i in range(1, 5001)]
+        with contextlib.closing(database_connect.get_database_connection(IrodsConfig())) as connection:
+            with contextlib.closing(connection.cursor()) as cursor:
+                start_time = timeit.default_timer()
+                for params in params_list:
+                    cursor.execute(statement, params)
+                per_row_duration = timeit.default_timer() - start_time
+                start_time = timeit.default_timer()
+                cursor.executemany(statement, params_list)
+                array_duration = timeit.default_timer() - start_time
+                connection.rollback()
+                print('{0} updates: per row {1:.3f}s, parameter arrays {2:.3f}s'.format(
+                    len(params_list), per_row_duration, array_duration))
+
+    @benchmark
+    def test_alternating_statements_with_and_without_statement_cache(self):
+        from .. import database_connect
+        statements = ['select count(*) from R_TOKN_MAIN where token_id > ?',
+                      'select count(*) from R_RESC_MAIN where resc_id > ?']
+        def run(connection):
+            with contextlib.closing(connection.cursor()) as cursor:
+                start_time = timeit.default_timer()
+                for i in range(200):
+                    cursor.execute(statements[i % 2], (i,)).fetchall()
+                return timeit.default_timer() - start_time
+        with contextlib.closing(database_connect.get_database_connection(IrodsConfig())) as connection:
+            cached_duration = run(connection)
+            info = connection.statement_cache_info()
+            connection.set_statement_cache_size(0)
+            uncached_duration = run(connection)
+        print('alternating statements: cached {0:.3f}s, uncached {1:.3f}s, {2}'.format(
+            cached_duration, uncached_duration, info))
+
+    @benchmark
+    def test_streaming_against_fetchall_memory(self):
+        try:
+            import tracemalloc
+        except ImportError:
+            self.skipTest('tracemalloc requires Python 3.4 or later')
+        from .. import database_connect
+        irods_config = IrodsConfig()
+        def peak(consume):
+            with contextlib.closing(database_connect.get_database_connection(irods_config, streaming=True)) as connection:
+                with contextlib.closing(connection.cursor()) as cursor:
+                    tracemalloc.start()
+                    try:
+                        start_time = timeit.default_timer()
+                        count = consume(cursor)
+                        return count, tracemalloc.get_traced_memory()[1], timeit.default_timer() - start_time
+                    finally:
+                        tracemalloc.stop()
+                        connection.rollback()
+        fetchall_count, fetchall_peak, fetchall_duration = peak(
+            lambda cursor: len(cursor.execute(self.query).fetchall()))
+        stream_count, stream_peak, stream_duration = peak(
+            lambda cursor: sum(1 for _ in database_connect.stream_sql_statement(cursor, self.query,
+                database_type=irods_config.catalog_database_type, batch_size=100)))
+        print('{0} rows: fetchall peak {1} bytes in {2:.3f}s, streamed peak {3} bytes in {4:.3f}s'.format(
+            stream_count, fetchall_peak, fetchall_duration, stream_peak, stream_duration))
+
+    @benchmark
+    def test_sync_odbc_ini_with_and_without_odbcinst(self):
+        from .. import database_connect
+        irods_config = IrodsConfig()
+        directory = tempfile.mkdtemp()
+        try:
+            irods_config.execution_environment['ODBCINI'] = os.path.join(directory, '.odbc.ini')
+            start_time = timeit.default_timer()
+            self.assertTrue(database_connect.sync_odbc_ini(irods_config))
+            odbcinst_duration = timeit.default_timer() - start_time
+            start_time = timeit.default_timer()
+            self.assertFalse(database_connect.sync_odbc_ini(irods_config))
+            skipped_duration = timeit.default_timer() - start_time
+        finally:
+            shutil.rmtree(directory)
+        print('sync_odbc_ini: odbcinst {0:.3f}s, unchanged {1:.3f}s'.format(odbcinst_duration, skipped_duration))
+
+    @benchmark
+    def test_pooled_against_unpooled_connections(self):
+        from .. import database_connect
+        irods_config = IrodsConfig()
+        # the database_interface calls made by one setup_irods.py run
+        calls = 4
+        start_time = timeit.default_timer()
+        for _ in range(calls):
+            with contextlib.closing(database_connect.get_database_connection(irods_config)) as connection:
+                database_connect.irods_tables_in_database(irods_config, connection.cursor())
+        unpooled_duration = timeit.default_timer() - start_time
+        database_connect.close_pooled_database_connection()
+        start_time = timeit.default_timer()
+        for _ in range(calls):
+            with database_connect.pooled_database_connection(irods_config) as connection:
+                database_connect.irods_tables_in_database(irods_config, connection.cursor())
+        pooled_duration = timeit.default_timer() - start_time
+        database_connect.close_pooled_database_connection()
+        print('{0} connections: unpooled {1:.3f}s, pooled {2:.3f}s'.format(calls, unpooled_duration, pooled_duration))
+
+    @benchmark
+    def test_setup_and_start_catalog_calls(self):
+        from .. import database_connect
+        from .. import database_interface
+        irods_config = IrodsConfig()
+        def setup_and_start():
+            # the catalog calls of one setup_irods.py run followed by a server start
+            start_time = timeit.default_timer()
+            database_interface.database_already_in_use_by_irods(irods_config)
+            database_interface.database_already_in_use_by_irods(irods_config)
+            database_interface.get_catalog_schema_version(irods_config)
+            database_interface.server_launch_hook(irods_config)
+            return timeit.default_timer() - start_time
+        directory = tempfile.mkdtemp()
+        try:
+            # a missing odbc.ini and no pooled connection, as on the first run
+            irods_config.execution_environment['ODBCINI'] = os.path.join(directory, '.odbc.ini')
+            database_connect.close_pooled_database_connection()
+            cold_duration = setup_and_start()
+            warm_duration = setup_and_start()
+        finally:
+            database_connect.close_pooled_database_connection()
+            shutil.rmtree(directory)
+        print('setup and start catalog calls: first run {0:.3f}s, odbc.ini unchanged and pooled {1:.3f}s'.format(
+            cold_duration, warm_duration))
+
+class Test_Import_Timing(unittest.TestCase):
+    # irodsctl status runs in health check loops, so its imports must stay cheap. The irods modules it imports took
+    # about 0.06s in total under -X importtime on a development host; the budget leaves about 8x headroom for slow
+    # or loaded test hosts while still catching an eagerly imported heavy dependency.
+    budget = 0.5
+    irodsctl_status_modules = ['irods.start_options', 'irods.paths', 'irods.profiling', 'irods.configuration',
+                               'irods.controller', 'irods.lib', 'irods.log', 'irods.exceptions']
+    heavy_modules = ['psutil', 'jsonschema', 'requests', 'irods.pyparsing',
+                     'irods.json_validation', 'irods.upgrade_configuration', 'irods.pypyodbc']
+
+    def import_in_subprocess(self, module_names):
+        script = '\n'.join([
+            'import sys, time',
+            'start = time.time()',
+            'import {0}'.format(', '.join(module_names)),
+            'print(time.time() - start)',
+            'print(" ".join(sorted(sys.modules)))'])
+        args = [sys.executable]
+        if sys.version_info >= (3, 7):
+            args.extend(['-X', 'importtime'])
+        out, err = lib.execute_command(args + ['-c', script], cwd=paths.scripts_directory())
+        elapsed, modules = out.splitlines()[:2]
+        return float(elapsed), modules.split(), err
+
+    def cumulative_import_time(self, importtime, package):
+        # the cumulative microseconds of each top level import of the package, as reported by -X importtime
+        total = 0
+        for line in importtime.splitlines():
+            fields = line.split('|')
+            if len(fields) == 3 and fields[2].startswith(' ' + package) and fields[0].startswith('import time:'):
+                try:
+                    total += int(fields[1])
+                except ValueError:
+                    continue
+        return total / 1e6
+
+    def test_irodsctl_status_imports(self):
+        elapsed, modules, importtime = self.import_in_subprocess(self.irodsctl_status_modules)
+        self.assertEqual([m for m in self.heavy_modules if m in modules], [])
+        if sys.version_info >= (3, 7):
+            elapsed = self.cumulative_import_time(importtime, 'irods')
+        print('irodsctl status imports: {0:.3f}s (budget {1:.3f}s)'.format(elapsed, self.budget))
+        self.assertLess(elapsed, self.budget, importtime)
@@ -301,7 +301,7 @@ def convert_legacy_configuration_to_json(irods_config):
 
     config_dicts[paths.server_config_path()] = server_config_v2
 
-    if hostname_resolves_to_local_address(server_config_v2['icat_host']):
+    if lib.hostname_resolves_to_local_address(server_config_v2['icat_host']):
         #Build database_config.json
         database_config_v2 = {
                 'schema_name': 'database_config',
@@ -6,17 +6,23 @@ import json
 
 import irods.start_options
 import irods.paths
+import irods.profiling
 
 def parse_options():
     parser = optparse.OptionParser()
     irods.start_options.add_options(parser)
+    irods.profiling.add_options(parser)
 
     return parser.parse_args()
 
+# operations that may load the database libraries into this process, whose
+# dynamic loader only sees LD_LIBRARY_PATH as it was at interpreter startup
+LIBRARY_LOADING_OPERATIONS = ['start', 'graceful_start', 'restart', 'graceful_restart']
+
 #wrapper to set up ld_library_path
 def wrap_if_necessary():
 
-    (options, _) = parse_options()
+    (options, arguments) = parse_options()
 
     with open(irods.paths.server_config_path()) as server_config_path:
         server_config = json.load(server_config_path)
@@ -36,19 +42,17 @@ def wrap_if_necessary():
     current_ld_library_path_list = [p for p in os.environ.get('LD_LIBRARY_PATH', '').split(':') if p]
     if ld_library_path_list != current_ld_library_path_list[0:len(ld_library_path_list)]:
         os.environ['LD_LIBRARY_PATH'] = ':'.join(ld_library_path_list + current_ld_library_path_list)
-        argv = [sys.executable] + sys.argv
-        os.execve(argv[0], argv, os.environ)
+        # child processes inherit the updated environment, so only re-exec when
+        # this process itself may need to load the libraries
+        if server_config.get('catalog_service_role') == 'provider' and arguments[:1] and arguments[0] in LIBRARY_LOADING_OPERATIONS:
+            argv = [sys.executable] + sys.argv
+            os.execve(argv[0], argv, os.environ)
 
 wrap_if_necessary()
 
 
 import logging
-import tempfile
-import time
 
-import psutil
-
-import irods.configuration
 from irods.configuration import IrodsConfig
 from irods.controller import IrodsController
 import irods.lib
@@ -67,12 +71,15 @@ def main():
         return 1
 
     operations_dict = {}
-    operations_dict['start'] = lambda: irods_controller.start(write_to_stdout=options.write_to_stdout, test_mode=options.test_mode)
-    operations_dict['graceful_start'] = lambda: irods_controller.start(write_to_stdout=options.write_to_stdout, test_mode=options.test_mode)
+    operations_dict['start'] = lambda: irods_controller.start(write_to_stdout=options.write_to_stdout, test_mode=options.test_mode, full_preflight=options.full_preflight)
+    operations_dict['graceful_start'] = lambda: irods_controller.start(write_to_stdout=options.write_to_stdout, test_mode=options.test_mode, full_preflight=options.full_preflight)
     operations_dict['stop'] = lambda: irods_controller.stop()
-    operations_dict['restart'] = lambda: irods_controller.restart(write_to_stdout=options.write_to_stdout, test_mode=options.test_mode)
-    operations_dict['graceful_restart'] = lambda: irods_controller.restart(write_to_stdout=options.write_to_stdout, test_mode=options.test_mode)
-    operations_dict['status'] = lambda: irods_controller.status()
+    operations_dict['restart'] = lambda: irods_controller.restart(write_to_stdout=options.write_to_stdout, test_mode=options.test_mode, full_preflight=options.full_preflight)
+    operations_dict['graceful_restart'] = lambda: irods_controller.graceful_restart(write_to_stdout=options.write_to_stdout, test_mode=options.test_mode,
+            agent_threshold=options.agent_threshold, drain_timeout=options.drain_timeout,
+            full_preflight=options.full_preflight)
+    operations_dict['status'] = lambda: irods_controller.status(json_output=options.json_output)
+    operations_dict['shm'] = lambda: irods_controller.shared_memory_status(reclaim_orphaned=options.reclaim_orphaned_segments)
     operations_dict['get_environment'] = lambda: irods_config.print_execution_environment()
 
     (options, arguments) = parse_options()
@@ -119,9 +126,20 @@ def main():
                 % (operation), exc_info=True)
         l.info('Exiting...')
         return 1
+    finally:
+        report_startup_timeline(irods_controller, options)
     return 0
 
+def report_startup_timeline(irods_controller, options):
+    timeline = irods_controller.startup_timeline
+    if timeline is None:
+        return
+    if options.print_timeline:
+        print(timeline.format())
+    if options.timeline_json_path:
+        timeline.write_json(options.timeline_json_path)
+
 
 logging.getLogger(__name__).addHandler(irods.log.NullHandler())
 if __name__ == '__main__':
-    sys.exit(main())
+    sys.exit(irods.profiling.profile_main(main, 'irodsctl'))
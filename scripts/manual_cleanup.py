@@ -21,31 +21,50 @@ sess = session.IrodsSession(env_dict, settings.PREEXISTING_ADMIN_PASSWORD, False
 sess.run_icommand('irmtrash -M')
 
 # remove test stuff
-for user_name in test_user_list:
-    # get permission on user's collection
-    sess.run_icommand('ichmod -rM own {admin_name} /{zone_name}/home/{user_name}'.format(**locals()))
+# get permission on users' collections
+sess.run_icommands_parallel([
+    ['ichmod', '-rM', 'own', admin_name, '/{zone_name}/home/{user_name}'.format(**locals())]
+    for user_name in test_user_list])
 
+# list users' home collections
+listings = sess.run_icommands_parallel([
+    ['ils', '/{zone_name}/home/{user_name}'.format(**locals())]
+    for user_name in test_user_list])
+
+commands = []
+dependencies = {}
+for user_name, listing in zip(test_user_list, listings):
     # remove test data in user's home collection
-    out, _, _ = sess.run_icommand('ils /{zone_name}/home/{user_name}'.format(**locals()))
-    entries = out.split()
+    removals = []
+    entries = (listing.out or '').split()
     if len(entries) > 1:
         for entry in entries[1:]:
             # collection
             if entry.startswith('/'):
-                sess.run_icommand('irm -rf {entry}'.format(**locals()))
+                removals.append(len(commands))
+                commands.append(['irm', '-rf', entry])
             # data object
             elif entry != 'C-':
-                sess.run_icommand('irm -f /{zone_name}/home/{user_name}/{entry}'.format(**locals()))
+                removals.append(len(commands))
+                commands.append(['irm', '-f', '/{zone_name}/home/{user_name}/{entry}'.format(**locals())])
 
     # remove user
-    sess.run_icommand('iadmin rmuser {user_name}'.format(**locals()))
+    dependencies[len(commands)] = removals
+    commands.append(['iadmin', 'rmuser', user_name])
+
+# resources can only be removed once the data on them is gone
+user_removal_indices = list(range(len(commands)))
 
 # remove parent-child relationships
-sess.run_icommand('iadmin rmchildfromresc pt leaf')
+rmchild_index = len(commands)
+commands.append(['iadmin', 'rmchildfromresc', 'pt', 'leaf'])
 
 # remove resources
 for resource in test_resc_list:
-    sess.run_icommand('iadmin rmresc {resource}'.format(**locals()))
+    dependencies[len(commands)] = user_removal_indices + [rmchild_index]
+    commands.append(['iadmin', 'rmresc', resource])
+
+sess.run_icommands_parallel(commands, dependencies, skip_dependents_of_failures=False)
 
 # remove local files
 shutil.rmtree('/tmp/federation_test_stuff', ignore_errors=True)
@@ -24,6 +24,7 @@ from irods.controller import IrodsController
 import irods.test
 import irods.test.settings
 import irods.log
+import irods.profiling
 import irods.paths
 
 def run_irodsctl_with_arg(arg):
@@ -145,7 +146,7 @@ class RegisteredTestResult(unittest.TextTestResult):
         print('{0} ... '.format(test.id()), end='', file=self.stream)
         unittest.TestResult.startTest(self, test)
 
-if __name__ == '__main__':
+def main():
     logging.getLogger().setLevel(logging.NOTSET)
     l = logging.getLogger(__name__)
 
@@ -167,6 +168,7 @@ if __name__ == '__main__':
     parser.add_option('--no_buffer', action='store_false', dest='buffer_test_output', default=True)
     parser.add_option('--xml_output', action='store_true', dest='xml_output', default=False)
     parser.add_option('--federation', type='str', nargs=3, action='callback', callback=optparse_callback_federation, metavar='<remote irods version, remote zone, remote host>')
+    irods.profiling.add_options(parser)
     options, _ = parser.parse_args()
 
     if len(sys.argv) == 1:
@@ -206,3 +208,6 @@ if __name__ == '__main__':
 
     if options.run_devtesty:
         run_devtesty()
+
+if __name__ == '__main__':
+    sys.exit(irods.profiling.profile_main(main, 'run_tests'))
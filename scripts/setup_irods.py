@@ -3,10 +3,12 @@ from __future__ import print_function
 
 import os, sys, optparse
 import irods.setup_options
+import irods.profiling
 
 def parse_options():
     parser = optparse.OptionParser()
     irods.setup_options.add_options(parser)
+    irods.profiling.add_options(parser)
 
     return parser.parse_args()
 
@@ -121,6 +123,8 @@ def setup_server(irods_config, json_configuration_file=None, test_mode=False):
         setup_client_environment(irods_config)
         default_resource_directory = get_and_create_default_vault(irods_config)
 
+    check_configured_hosts(irods_config)
+
     if irods_config.is_catalog:
         l.info(irods.lib.get_header('Setting up the database'))
         database_interface.setup_catalog(irods_config, default_resource_directory=default_resource_directory)
@@ -165,6 +169,17 @@ def check_hostname():
     if not irods.lib.hostname_resolves_to_local_address(hostname):
         raise IrodsError('The hostname (%s) must resolve to the local machine.' % (hostname))
 
+def check_configured_hosts(irods_config):
+    l = logging.getLogger(__name__)
+    from irods import host_resolution
+    for hostname, result in sorted(host_resolution.resolve_configured_hosts(irods_config).items()):
+        if 'error' in result:
+            l.warning('Warning: %s', result['error'])
+        elif hostname in irods_config.server_config.get('catalog_provider_hosts', []) and result['local'] != irods_config.is_catalog:
+            l.warning('Warning: The catalog provider host (%s) %s to the local machine, but this server is a catalog %s.',
+                      hostname, 'resolves' if result['local'] else 'does not resolve',
+                      irods_config.server_config['catalog_service_role'])
+
 def determine_server_role(irods_config):
     catalog_service_roles = set(['provider', 'consumer'])
     default_catalog_service_role = irods_config.server_config.get('catalog_service_role', 'provider')
@@ -449,4 +464,4 @@ def main():
 
 
 if __name__ == '__main__':
-    sys.exit(main())
+    sys.exit(irods.profiling.profile_main(main, 'setup_irods'))
@@ -2,6 +2,7 @@ import argparse
 import contextlib
 
 import irods.lib
+import irods.profiling
 from irods import database_connect, database_interface
 from irods.configuration import IrodsConfig
 
@@ -118,6 +119,7 @@ row to be updated. This script must be run on the catalog provider.
 '''.format('\n'.join(['\t{}\t\t{}'.format(key, update_columns[key]) for key in update_columns.keys()])))
     parser.add_argument('-d', '--dry-run', action='store_true', dest='dry_run', help='Count rows to be overwritten (no changes made to database)')
     parser.add_argument('-b', '--batch-size', action='store', dest='batch_size', type=int, default=500, help='Number of records to update per database commit (default: 500)')
+    irods.profiling.add_arguments(parser)
     args = parser.parse_args()
 
     try:
@@ -131,4 +133,4 @@ row to be updated. This script must be run on the catalog provider.
         print('Failed getting database connection. Note: This script should be run on the iRODS catalog provider.')
 
 if __name__ == "__main__":
-    scrub_main()
+    irods.profiling.profile_main(scrub_main, 'update_deprecated_database_columns')